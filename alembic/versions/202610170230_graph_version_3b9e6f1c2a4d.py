@@ -0,0 +1,27 @@
+"""Graph version and hard-coded agents inheriting Agent
+
+Revision ID: 3b9e6f1c2a4d
+Create Date: 2026-10-17 02:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e6f1c2a4d'
+down_revision: Union[str, None] = '7d1725c0f14a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('Graph', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_foreign_key('HardCodeAgent_id_fkey', 'HardCodeAgent', 'Agent', ['id'], ['id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('HardCodeAgent_id_fkey', 'HardCodeAgent', type_='foreignkey')
+    op.drop_column('Graph', 'version')
@@ -0,0 +1,34 @@
+"""Running leases of workers
+
+Revision ID: 9c2e5a7b1f3d
+Revises: 3b9e6f1c2a4d
+Create Date: 2026-10-17 04:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e5a7b1f3d'
+down_revision: Union[str, None] = '3b9e6f1c2a4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('Running', sa.Column('input_documents', sa.JSON(), nullable=True))
+    op.add_column('Running', sa.Column('worker_id', sa.String(), nullable=True))
+    op.add_column('Running', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.add_column('Running', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('Running_status_worker_id_idx', 'Running', ['status', 'worker_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('Running_status_worker_id_idx', table_name='Running')
+    op.drop_column('Running', 'attempts')
+    op.drop_column('Running', 'heartbeat_at')
+    op.drop_column('Running', 'worker_id')
+    op.drop_column('Running', 'input_documents')
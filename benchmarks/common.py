@@ -0,0 +1,58 @@
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+def environment() -> dict[str, Any]:
+    """Description of the environment to store with results."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Percentile by nearest rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def summary(values: list[float]) -> dict[str, float]:
+    """Mean and percentiles of values."""
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+
+
+def save_report(report: dict[str, Any], output: str | None) -> None:
+    """Print report as JSON or save it to file."""
+    data = json.dumps(report, indent=2, ensure_ascii=False)
+    if output is None:
+        print(data)
+        return
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(data, encoding="utf-8")
@@ -0,0 +1,232 @@
+"""
+Load test of many concurrent system analyst pipelines with scripted users.
+
+By default the fake OpenAI server is started in the same process, so its work
+is counted in event loop lag. Start it separately with `python -m src.fake_openai`
+and pass `--base-url` to measure the engine alone, or replay a recorded run
+with `--cassette`.
+
+Usage:
+    python -m benchmarks.load_test --max-concurrency 64 --output data/benchmarks/load.json
+"""
+
+import argparse
+import asyncio
+import time
+
+from openai import AsyncOpenAI
+
+from benchmarks.common import environment, save_report, summary
+from src.core.clients.cassette import ReplayingClient, ReplayMode
+from src.core.prompts import english_prompts
+from src.core.system_analyst import create_system_analyst
+from src.fake_openai.config import (
+    Distribution,
+    FakeServerConfig,
+    Latency,
+    ModelBehaviour,
+    ScriptedResponse,
+)
+from src.fake_openai.server import FakeOpenAIServer
+
+DEFAULT_ANSWERS = [
+    "I need an online bookshop.",
+    "Customers buy books, managers edit the catalog and see orders.",
+    "About a thousand customers a day. That's all, please write the REPORT.",
+]
+
+
+class ScriptedUser:
+    """User answering interviewer from a script, the last answer is repeated."""
+
+    def __init__(self, answers: list[str], think_time: float = 0.0):
+        self._answers: list[str] = answers
+        self._think_time: float = think_time
+        self._index: int = 0
+
+    async def __call__(self, message: str) -> str:
+        if self._think_time:
+            await asyncio.sleep(self._think_time)
+        answer = self._answers[min(self._index, len(self._answers) - 1)]
+        self._index += 1
+        return answer
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes up a sleeping task."""
+
+    def __init__(self, interval: float = 0.01):
+        self._interval: float = interval
+        self._task: asyncio.Task | None = None
+        self.lags: list[float] = []
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _monitor(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self._interval)
+            self.lags.append(time.monotonic() - start - self._interval)
+
+
+def fake_config(latency: float, tokens_per_second: float) -> FakeServerConfig:
+    """Fake models that echo inputs and approve everything at critics."""
+    critic_prompts = [
+        english_prompts.critic_for_interviewer,
+        english_prompts.critic_for_use_case_writer,
+        english_prompts.critic_for_domain_modeller,
+    ]
+    return FakeServerConfig(
+        default=ModelBehaviour(
+            latency=Latency(Distribution.lognormal, median=latency, sigma=0.5),
+            tokens_per_second=tokens_per_second,
+            responses=[
+                ScriptedResponse(match=prompt.strip()[:100], text="OK")
+                for prompt in critic_prompts
+            ],
+        ),
+        seed=0,
+    )
+
+
+async def run_level(
+    client, concurrency: int, runs: int, think_time: float, speculative: bool
+) -> dict:
+    """Run `runs` pipelines keeping `concurrency` of them in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    agents: dict[str, dict[str, list[float]]] = {}
+    speculation = {"hits": 0, "misses": 0, "restarts": 0, "wasted_tokens": 0}
+    failures = 0
+
+    async def run_one() -> None:
+        nonlocal failures
+        async with semaphore:
+            pipeline = create_system_analyst(
+                client,
+                ScriptedUser(DEFAULT_ANSWERS, think_time),
+                directory=None,
+                speculative=speculative,
+            )
+            start = time.monotonic()
+            try:
+                await pipeline.run()
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.monotonic() - start)
+            for name, stats in pipeline.stats.items():
+                timings = agents.setdefault(name, {"wait": [], "work": []})
+                timings["wait"].append(stats.wait_time)
+                timings["work"].append(stats.work_time)
+            for key in speculation:
+                speculation[key] += getattr(pipeline.speculation_stats, key)
+
+    monitor = EventLoopLagMonitor()
+    monitor.start()
+    start = time.monotonic()
+    await asyncio.gather(*(run_one() for _ in range(runs)))
+    elapsed = time.monotonic() - start
+    await monitor.stop()
+
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "failures": failures,
+        "runs_per_second": len(latencies) / elapsed,
+        "latency": summary(latencies),
+        "event_loop_lag": summary(monitor.lags),
+        "agents": {
+            name: {"wait": summary(t["wait"]), "work": summary(t["work"])}
+            for name, t in agents.items()
+        },
+        "speculation": {
+            **speculation,
+            "hit_rate": (
+                speculation["hits"] / (speculation["hits"] + speculation["misses"])
+                if speculation["hits"] + speculation["misses"]
+                else 0.0
+            ),
+        },
+    }
+
+
+def saturation_level(levels: list[dict], min_gain: float) -> int | None:
+    """Lowest concurrency after which throughput grows less than `min_gain`."""
+    for previous, current in zip(levels, levels[1:]):
+        if current["runs_per_second"] < previous["runs_per_second"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    server = None
+    if args.cassette:
+        client = ReplayingClient(args.cassette, ReplayMode.realtime)
+    else:
+        base_url = args.base_url
+        if base_url is None:
+            server = FakeOpenAIServer(fake_config(args.latency, args.tokens_per_second))
+            port = (await server.start(port=0)).sockets[0].getsockname()[1]
+            base_url = f"http://127.0.0.1:{port}/v1"
+        client = AsyncOpenAI(api_key="fake", base_url=base_url, max_retries=0)
+
+    levels = []
+    concurrency = 1
+    try:
+        while concurrency <= args.max_concurrency:
+            level = await run_level(
+                client,
+                concurrency,
+                concurrency * args.runs_per_slot,
+                args.think_time,
+                args.speculative,
+            )
+            levels.append(level)
+            print(
+                f"concurrency={concurrency}: {level['runs_per_second']:.2f} runs/s, "
+                f"p95={level['latency']['p95']:.2f}s, "
+                f"loop lag p99={level['event_loop_lag']['p99'] * 1000:.1f}ms"
+            )
+            concurrency *= 2
+    finally:
+        if isinstance(client, AsyncOpenAI):
+            await client.close()
+        if server is not None:
+            await server.stop()
+
+    return {
+        "environment": environment(),
+        "levels": levels,
+        "saturation_concurrency": saturation_level(levels, args.min_gain),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of system analyst runs")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--runs-per-slot", type=int, default=2)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--min-gain", type=float, default=0.1)
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="start agents waiting for critics on drafts",
+    )
+    parser.add_argument("--base-url", help="URL of already running fake server")
+    parser.add_argument("--cassette", help="replay recorded run instead of server")
+    parser.add_argument("--output", help="JSON file for results, stdout if omitted")
+    args = parser.parse_args()
+
+    save_report(asyncio.run(main_async(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
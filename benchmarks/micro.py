@@ -0,0 +1,245 @@
+"""
+Micro-benchmarks of the engine hot paths.
+
+Usage:
+    python -m benchmarks.micro --output data/benchmarks/micro.json
+    python -m benchmarks.micro --compare data/benchmarks/micro_1.1.0.json
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks.common import environment, save_report, summary
+from src.core.agents.agent_types.chat_agent import ChatAgent
+from src.core.agents.agent_typings import (
+    Document,
+    DocumentsStore,
+    GenerationSettings,
+    Message,
+    ModelName,
+    Role,
+)
+from src.core.consts import DATA_DIR
+from src.core.document_writer import document_writer
+
+BENCHMARKS_DIR = "benchmarks_tmp"
+
+
+@dataclass
+class Benchmark:
+    """
+    Benchmark of one function.
+    Parameters:
+    - name - name of the benchmark
+    - size - size of the input data
+    - setup - function creating the measured callable for the size
+    """
+
+    name: str
+    size: int
+    setup: Callable[[int], Callable[[], object]]
+
+
+def _store(size: int) -> DocumentsStore:
+    return DocumentsStore(
+        {f"document_{i}": Document(f"document_{i}", "content") for i in range(size)}
+    )
+
+
+def _chat(size: int) -> list[Message]:
+    return [
+        Message(Role.user if i % 2 else Role.assistant, "Some message. " * 40)
+        for i in range(size)
+    ]
+
+
+def _chat_agent(size: int) -> ChatAgent:
+    agent = ChatAgent(
+        client=None,
+        name="interviewer",
+        system_prompt="You are interviewer",
+        settings=GenerationSettings(model=ModelName.gpt_4o),
+        documents_store=DocumentsStore(),
+        required_documents=[],
+        request_user_message=None,
+        chat_name="interviewer_chat",
+        last_message_name="interviewer_report",
+        stop_words=["REPORT", "ОТЧЕТ", "ИТОГ"],
+    )
+    agent._chat.extend(_chat(size))
+    return agent
+
+
+def store_contains(size: int) -> Callable[[], object]:
+    store = _store(size)
+    names = [f"document_{i}" for i in range(0, size, max(1, size // 5))]
+    return lambda: store.contains(names)
+
+
+def store_update(size: int) -> Callable[[], object]:
+    store = _store(size)
+    update = {
+        f"document_{i}": Document(f"document_{i}", "new content")
+        for i in range(0, size, max(1, size // 5))
+    }
+    return lambda: store.update(update)
+
+
+def store_get_documents(size: int) -> Callable[[], object]:
+    store = _store(size)
+    names = [f"document_{i}" for i in range(0, size, max(1, size // 5))]
+    return lambda: store.get_documents(names)
+
+
+def messages_to_dict(size: int) -> Callable[[], object]:
+    chat = _chat(size)
+    return lambda: [message.to_dict() for message in chat]
+
+
+def chat_agent_stop_me(size: int) -> Callable[[], object]:
+    agent = _chat_agent(size)
+    return agent.stop_me
+
+
+def chat_agent_save_documents(size: int) -> Callable[[], object]:
+    """
+    Saving after every new message while the chat grows from `size` to `2 * size`
+    messages, then it is cut back and the transcript is rendered again.
+    """
+    agent = _chat_agent(size)
+    message = Message(Role.user, "New message. " * 40)
+
+    def save_new_message() -> DocumentsStore:
+        if len(agent._chat) >= 2 * size:
+            del agent._chat[size:]
+        agent._chat.append(message)
+        return agent.save_documents()
+
+    return save_new_message
+
+
+def document_file_write(size: int) -> Callable[[], object]:
+    content = "x" * size
+    filename = f"{BENCHMARKS_DIR}/document.md"
+    return lambda: Document("document", content, filename)
+
+
+BENCHMARKS = [
+    *(
+        Benchmark(name, size, setup)
+        for name, setup in [
+            ("documents_store.contains", store_contains),
+            ("documents_store.update", store_update),
+            ("documents_store.get_documents", store_get_documents),
+        ]
+        for size in (10, 1_000, 100_000)
+    ),
+    *(
+        Benchmark("message.to_dict", size, messages_to_dict)
+        for size in (10, 100, 1000)
+    ),
+    *(
+        Benchmark("chat_agent.stop_me", size, chat_agent_stop_me)
+        for size in (10, 100, 1000)
+    ),
+    *(
+        Benchmark("chat_agent.save_documents", size, chat_agent_save_documents)
+        for size in (10, 100, 1000)
+    ),
+    *(
+        Benchmark("document.file_write", size, document_file_write)
+        for size in (1_000, 100_000, 1_000_000)
+    ),
+]
+
+
+def measure(function: Callable[[], object], repeats: int, min_time: float) -> dict:
+    """Calibrate number of calls to take `min_time` and measure `repeats` times."""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or calls >= 1_000_000:
+            break
+        calls *= 10
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append((time.perf_counter() - start) / calls * 1e9)
+
+    return {"calls": calls, "repeats": repeats, "ns_per_call": summary(timings)}
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> bool:
+    """Print slowdown against baseline. Returns False if some benchmark regressed."""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {
+            (result["name"], result["size"]): result
+            for result in json.load(file)["results"]
+        }
+
+    ok = True
+    for result in results:
+        previous = baseline.get((result["name"], result["size"]))
+        if previous is None:
+            continue
+        ratio = result["ns_per_call"]["p50"] / previous["ns_per_call"]["p50"]
+        regressed = ratio > threshold
+        ok = ok and not regressed
+        mark = "REGRESSION" if regressed else "ok"
+        print(
+            f"{result['name']}[{result['size']}]: x{ratio:.2f} {mark}",
+            file=sys.stderr,
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the engine")
+    parser.add_argument("--output", help="JSON file for results, stdout if omitted")
+    parser.add_argument("--filter", default="", help="run benchmarks containing it")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--compare", help="JSON file with baseline results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown ratio treated as regression",
+    )
+    args = parser.parse_args()
+
+    results = []
+    try:
+        for benchmark in BENCHMARKS:
+            if args.filter not in benchmark.name:
+                continue
+            function = benchmark.setup(benchmark.size)
+            results.append(
+                {
+                    "name": benchmark.name,
+                    "size": benchmark.size,
+                    **measure(function, args.repeats, args.min_time),
+                }
+            )
+    finally:
+        document_writer.flush()
+        shutil.rmtree(DATA_DIR / BENCHMARKS_DIR, ignore_errors=True)
+
+    save_report({"environment": environment(), "results": results}, args.output)
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import json
+from typing import Any, Awaitable, Callable, Coroutine
+
+from aiohttp import web
+
+from src.api.runs import RunManager, RunQueueFullError, RunState
+from src.core.pipeline_graph import PipelineCompilationError
+from src.db.graph_loader import GraphLoadingError
+
+Authenticator = Callable[[str], Coroutine[Any, Any, int | None]]
+
+RUN_MANAGER = web.AppKey("run_manager", RunManager)
+AUTHENTICATOR = web.AppKey("authenticator", Authenticator)
+USER_ID = "user_id"
+HEARTBEAT_INTERVAL = 15.0
+
+
+@web.middleware
+async def authenticate(
+    request: web.Request,
+    handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+) -> web.StreamResponse:
+    """Require `Authorization: Bearer <token>` with a token of a user."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user_id = (
+        await request.app[AUTHENTICATOR](token.strip())
+        if scheme.lower() == "bearer" and token.strip()
+        else None
+    )
+    if user_id is None:
+        raise web.HTTPUnauthorized(
+            text=json.dumps({"error": "Valid bearer token is required"}),
+            content_type="application/json",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    request[USER_ID] = user_id
+    return await handler(request)
+
+
+async def submit_run(request: web.Request) -> web.Response:
+    """
+    Queue a run of the user's graph.
+    Body: {"documents": {name: content}, "version": latest graph version},
+    both optional.
+    """
+    body = await _json(request)
+    documents = body.get("documents")
+    if documents is not None and not (
+        isinstance(documents, dict)
+        and all(isinstance(content, str) for content in documents.values())
+    ):
+        raise web.HTTPBadRequest(text="Field 'documents' must map names to strings")
+    version = body.get("version")
+    if version is not None and (
+        not isinstance(version, int) or isinstance(version, bool)
+    ):
+        raise web.HTTPBadRequest(text="Field 'version' must be an integer")
+    try:
+        state = await request.app[RUN_MANAGER].submit(
+            int(request.match_info["graph_id"]),
+            documents,
+            version,
+            request[USER_ID],
+        )
+    except RunQueueFullError as error:
+        raise web.HTTPTooManyRequests(
+            text=json.dumps({"error": str(error)}),
+            content_type="application/json",
+            headers={"Retry-After": "5"},
+        )
+    except GraphLoadingError as error:
+        raise web.HTTPNotFound(
+            text=json.dumps({"error": str(error)}), content_type="application/json"
+        )
+    except PipelineCompilationError as error:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": str(error)}), content_type="application/json"
+        )
+    return web.json_response(state.to_dict(), status=202)
+
+
+async def get_run(request: web.Request) -> web.Response:
+    return web.json_response(_state(request).to_dict())
+
+
+async def cancel_run(request: web.Request) -> web.Response:
+    state = _state(request)
+    request.app[RUN_MANAGER].cancel(state)
+    return web.json_response(state.to_dict(), status=202)
+
+
+async def get_document(request: web.Request) -> web.Response:
+    state = _state(request)
+    name = request.match_info["name"]
+    if state.documents_store is None or name not in state.documents_store.documents:
+        raise web.HTTPNotFound()
+    document = state.documents_store.documents[name]
+    return web.json_response(
+        {"name": name, "content": document.content, "complete": document.complete}
+    )
+
+
+async def stream_events(request: web.Request) -> web.StreamResponse:
+    """
+    Events of the run as server-sent events until the run is done.
+    Reconnecting clients continue after `Last-Event-ID`.
+    """
+    state = _state(request)
+    try:
+        cursor = int(request.headers.get("Last-Event-ID", -1)) + 1
+    except ValueError:
+        raise web.HTTPBadRequest(text="Header 'Last-Event-ID' must be an integer")
+    response = web.StreamResponse(
+        headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+    await response.prepare(request)
+    async for event in state.stream(cursor, HEARTBEAT_INTERVAL):
+        if event is None:
+            await response.write(b": heartbeat\n\n")
+            continue
+        data = json.dumps(event["data"], ensure_ascii=False)
+        await response.write(
+            f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+        )
+    await response.write_eof()
+    return response
+
+
+async def reply(request: web.Request) -> web.Response:
+    """
+    Answer a question of a chat agent.
+    Body: {"text": reply, "question_id": id}, the oldest question without id.
+    """
+    state = _state(request)
+    body = await _json(request)
+    if not isinstance(body.get("text"), str):
+        raise web.HTTPBadRequest(text="Field 'text' is required")
+    if not state.reply(body["text"], body.get("question_id")):
+        raise web.HTTPConflict(text="Run has no such question")
+    return web.json_response(state.to_dict())
+
+
+def create_app(manager: RunManager, authenticator: Authenticator) -> web.Application:
+    """
+    Application serving runs of the manager. Requests are authenticated
+    by `authenticator` returning the user id of a bearer token, users see
+    only runs of their own graphs.
+    """
+    app = web.Application(middlewares=[authenticate])
+    app[RUN_MANAGER] = manager
+    app[AUTHENTICATOR] = authenticator
+
+    async def lifespan(app: web.Application):
+        await manager.start()
+        yield
+        await manager.close()
+
+    app.cleanup_ctx.append(lifespan)
+    app.add_routes(
+        [
+            web.post("/graphs/{graph_id:\\d+}/runs", submit_run),
+            web.get("/runs/{run_id}", get_run),
+            web.delete("/runs/{run_id}", cancel_run),
+            web.get("/runs/{run_id}/events", stream_events),
+            web.get("/runs/{run_id}/documents/{name}", get_document),
+            web.post("/runs/{run_id}/replies", reply),
+        ]
+    )
+    return app
+
+
+def _state(request: web.Request) -> RunState:
+    state = request.app[RUN_MANAGER].get(request.match_info["run_id"])
+    if state is None or state.plan.user_id != request[USER_ID]:
+        raise web.HTTPNotFound()
+    return state
+
+
+async def _json(request: web.Request) -> dict:
+    if not request.can_read_body:
+        return {}
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Body must be JSON object")
+    return body
@@ -0,0 +1,42 @@
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.db.database import async_session
+from src.db.entities.user_token import UserToken
+
+
+class TokenAuthenticator:
+    """
+    Users of the API by their `UserToken` tokens.
+    Known tokens are cached for `cache_ttl` seconds, so streams and polling
+    don't query the database on every request. Unknown tokens aren't cached.
+    Parameters:
+    - session_factory - factory of async sessions
+    - cache_ttl - seconds a token is trusted without checking it again
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = async_session,
+        cache_ttl: float = 30.0,
+    ):
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._cache_ttl: float = cache_ttl
+        self._users: dict[str, tuple[int, float]] = {}
+
+    async def __call__(self, token: str) -> int | None:
+        """Id of the user with the token, None if the token is unknown."""
+        cached = self._users.get(token)
+        if cached is not None and time.monotonic() - cached[1] <= self._cache_ttl:
+            return cached[0]
+        async with self._session_factory() as session:
+            user_id = await session.scalar(
+                select(UserToken.user_id).where(UserToken.token == token).limit(1)
+            )
+        if user_id is None:
+            self._users.pop(token, None)
+            return None
+        self._users[token] = (user_id, time.monotonic())
+        return user_id
@@ -0,0 +1,397 @@
+import asyncio
+import logging
+import uuid
+from enum import Enum
+from typing import Any, AsyncIterator
+
+from openai import AsyncOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.agents.agent_typings import Document, DocumentName, DocumentsStore
+from src.core.clients.base_client import ClientWrapper
+from src.core.pipeline import AgentEvent, Pipeline
+from src.db.database import async_session
+from src.db.entities.running import RunningStatus
+from src.db.graph_loader import GraphLoader, GraphLoadingError, PipelinePlan
+from src.db.run_leases import heartbeat_runs, release_runs
+from src.db.run_recorder import RunRecorder
+
+
+class RunStatus(Enum):
+    """
+    Status of a run in the API.
+    Variants:
+    - queued - run waits for a free worker
+    - running - pipeline is running
+    - finished - pipeline finished
+    - failed - pipeline raised an exception
+    - cancelled - run was cancelled by the client
+    """
+
+    queued = "queued"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class RunQueueFullError(RuntimeError):
+    """Run can't be accepted because the queue is full."""
+
+
+class RunState:
+    """
+    Run submitted to the API and its event log.
+    Events are kept for the whole run, so subscribers connecting late
+    or reconnecting get all of them from the position they ask for.
+    Growing documents are published as deltas, complete ones as a whole.
+    Chat agents of the run ask questions by events and wait for replies.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        graph_id: int,
+        plan: PipelinePlan,
+        documents: dict[DocumentName, str],
+    ):
+        self.id: str = run_id
+        self.graph_id: int = graph_id
+        self.plan: PipelinePlan = plan
+        self.documents: dict[DocumentName, str] = documents
+        self.status: RunStatus = RunStatus.queued
+        self.error: str | None = None
+        self.events: list[dict[str, Any]] = []
+        self.documents_store: DocumentsStore | None = None
+        self.pipeline: Pipeline | None = None
+        self.task: asyncio.Task | None = None
+        self._waiters: list[asyncio.Future] = []
+        self._questions: dict[str, asyncio.Future] = {}
+        self._published_lengths: dict[DocumentName, int] = {}
+
+    @property
+    def done(self) -> bool:
+        return self.status in (
+            RunStatus.finished,
+            RunStatus.failed,
+            RunStatus.cancelled,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "run_id": self.id,
+            "graph_id": self.graph_id,
+            "status": self.status.value,
+            "error": self.error,
+            "questions": list(self._questions),
+            "documents": (
+                sorted(self.documents_store.documents)
+                if self.documents_store is not None
+                else []
+            ),
+        }
+
+    def publish(self, event_type: str, data: dict[str, Any]) -> None:
+        self.events.append({"id": len(self.events), "type": event_type, "data": data})
+        waiters, self._waiters = self._waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    async def stream(
+        self, cursor: int = 0, heartbeat: float | None = None
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        Events from position `cursor` until the run is done.
+        Yields None after `heartbeat` seconds without events.
+        """
+        while True:
+            while cursor < len(self.events):
+                yield self.events[cursor]
+                cursor += 1
+            if self.done:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await asyncio.wait_for(future, heartbeat)
+            except TimeoutError:
+                yield None
+
+    def set_status(self, status: RunStatus, error: str | None = None) -> None:
+        self.status = status
+        self.error = error
+        self.publish("status", {"status": status.value, "error": error})
+
+    async def request_user_message(self, message: str) -> str:
+        """User message request of chat agents answered by `reply`."""
+        question_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._questions[question_id] = future
+        self.publish("question", {"question_id": question_id, "text": message})
+        try:
+            return await future
+        finally:
+            self._questions.pop(question_id, None)
+
+    def reply(self, text: str, question_id: str | None = None) -> bool:
+        """
+        Answer the question, the oldest one without `question_id`.
+        Returns False if there is no such question.
+        """
+        if question_id is None:
+            question_id = next(iter(self._questions), None)
+        future = self._questions.get(question_id)
+        if future is None or future.done():
+            return False
+        future.set_result(text)
+        self.publish("reply", {"question_id": question_id, "text": text})
+        return True
+
+    def on_agent_event(self, event: AgentEvent) -> None:
+        self.publish(
+            "agent",
+            {"name": event.name, "kind": event.kind.value, "time": event.time},
+        )
+
+    def on_document(self, document: Document) -> None:
+        if document.complete:
+            self._published_lengths.pop(document.name, None)
+            self.publish(
+                "document", {"name": document.name, "content": document.content}
+            )
+            return
+        published = self._published_lengths.get(document.name, 0)
+        self._published_lengths[document.name] = len(document.content)
+        self.publish(
+            "document_delta",
+            {"name": document.name, "text": document.content[published:]},
+        )
+
+
+class RunManager:
+    """
+    Runs of stored graphs executed by a fixed number of worker tasks.
+    Submitted runs wait in a bounded queue, `submit` fails when it is full,
+    so clients get backpressure instead of unbounded latency.
+    Runs are recorded to the database if `recorder` is set, then their ids
+    are ids of `Running` rows. The rows are leased by the manager like by
+    workers of `src.worker`, so workers don't claim them while the manager
+    is alive, and unfinished runs are returned to the queue on `close`.
+    Finished runs are kept for `retention` seconds.
+    Parameters:
+    - loader - loader of pipeline plans
+    - client - client for AI agents
+    - recorder - recorder of runs and documents
+    - session_factory - factory of async sessions for leases of recorded runs
+    - heartbeat_interval - seconds between lease extensions of recorded runs
+    - max_concurrent_runs - number of workers, runs waiting for user replies
+      keep their worker
+    - max_queued_runs - size of the queue
+    - retention - seconds finished runs are kept
+    - pipeline_kwargs - arguments of pipelines, e.g. `timeout` or `checkpoint_store`
+    """
+
+    def __init__(
+        self,
+        loader: GraphLoader,
+        client: AsyncOpenAI | ClientWrapper,
+        recorder: RunRecorder | None = None,
+        session_factory: async_sessionmaker[AsyncSession] = async_session,
+        heartbeat_interval: float = 10.0,
+        max_concurrent_runs: int = 256,
+        max_queued_runs: int = 1024,
+        retention: float = 3600.0,
+        **pipeline_kwargs,
+    ):
+        self._loader: GraphLoader = loader
+        self._client: AsyncOpenAI | ClientWrapper = client
+        self._recorder: RunRecorder | None = recorder
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._heartbeat_interval: float = heartbeat_interval
+        self._worker_id: str = f"api:{uuid.uuid4().hex}"
+        self._max_concurrent_runs: int = max_concurrent_runs
+        self._max_queued_runs: int = max_queued_runs
+        self._retention: float = retention
+        self._pipeline_kwargs: dict[str, Any] = pipeline_kwargs
+        self._queue: asyncio.Queue[RunState] = asyncio.Queue()
+        self._reserved: int = 0
+        self._workers: list[asyncio.Task] = []
+        self._runs: dict[str, RunState] = {}
+        self._lost: set[str] = set()
+        self._heartbeat_task: asyncio.Task | None = None
+        self._closing: bool = False
+
+    async def start(self) -> None:
+        self._closing = False
+        if self._recorder is not None:
+            self._recorder.start()
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self._max_concurrent_runs)
+        ]
+
+    async def close(self) -> None:
+        """Cancel workers and runs, write recorded data, release unfinished runs."""
+        self._closing = True
+        unfinished = []
+        if self._recorder is not None:
+            unfinished = [
+                int(state.id)
+                for state in self._runs.values()
+                if not state.done and state.id not in self._lost
+            ]
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._recorder is not None:
+            await self._recorder.close()
+            async with self._session_factory.begin() as session:
+                await release_runs(session, self._worker_id, unfinished)
+
+    def get(self, run_id: str) -> RunState | None:
+        return self._runs.get(run_id)
+
+    async def submit(
+        self,
+        graph_id: int,
+        documents: dict[DocumentName, str] | None = None,
+        version: int | None = None,
+        user_id: int | None = None,
+    ) -> RunState:
+        """
+        Queue a run of the graph with initial documents.
+        Raises `RunQueueFullError` if the queue is full, `GraphLoadingError`
+        if the graph can't be loaded or, with `user_id`, belongs to another user
+        and `PipelineCompilationError` if the documents don't cover inputs
+        of the graph.
+        """
+        if self._queue.qsize() + self._reserved >= self._max_queued_runs:
+            raise RunQueueFullError(f"{self._max_queued_runs} runs are queued")
+        self._reserved += 1
+        try:
+            plan = await self._loader.load(graph_id, version)
+            if user_id is not None and plan.user_id != user_id:
+                raise GraphLoadingError(f"Graph {graph_id} doesn't exist")
+            state = RunState(uuid.uuid4().hex, graph_id, plan, documents or {})
+            state.pipeline = self._create_pipeline(state)
+            state.pipeline.graph.check_inputs(state.documents)
+            if self._recorder is not None:
+                state.id = str(
+                    await self._recorder.create_running(
+                        graph_id, documents, worker_id=self._worker_id
+                    )
+                )
+        finally:
+            self._reserved -= 1
+        self._runs[state.id] = state
+        self._queue.put_nowait(state)
+        state.publish("status", {"status": state.status.value, "error": None})
+        return state
+
+    def cancel(self, state: RunState) -> None:
+        if state.task is not None:
+            state.task.cancel()
+        elif not state.done:
+            state.set_status(RunStatus.cancelled)
+            if self._recorder is not None and state.id not in self._lost:
+                self._recorder.set_status(
+                    int(state.id), RunningStatus.FAILED, self._worker_id
+                )
+            self._forget_later(state)
+
+    async def _work(self) -> None:
+        while True:
+            state = await self._queue.get()
+            if state.done:
+                continue
+            state.task = asyncio.create_task(self._execute(state))
+            try:
+                await asyncio.wait({state.task})
+            finally:
+                if not state.task.done():
+                    state.task.cancel()
+                self._forget_later(state)
+
+    def _create_pipeline(self, state: RunState) -> Pipeline:
+        return state.plan.create_pipeline(
+            self._client,
+            state.request_user_message,
+            DocumentsStore(
+                {
+                    name: Document(name, content)
+                    for name, content in state.documents.items()
+                }
+            ),
+            **self._pipeline_kwargs,
+        )
+
+    async def _execute(self, state: RunState) -> None:
+        try:
+            pipeline, state.pipeline = state.pipeline, None
+            state.documents_store = pipeline.documents_store
+            pipeline.subscribe(state.on_agent_event)
+            pipeline.documents_store.subscribe(state.on_document)
+            state.set_status(RunStatus.running)
+            if self._recorder is not None:
+                await self._recorder.record(
+                    pipeline,
+                    int(state.id),
+                    state.plan.templates,
+                    worker_id=self._worker_id,
+                    run_id=state.id,
+                )
+            else:
+                await pipeline.run(run_id=state.id)
+        except asyncio.CancelledError:
+            state.set_status(RunStatus.cancelled)
+            if (
+                self._recorder is not None
+                and not self._closing
+                and state.id not in self._lost
+            ):
+                self._recorder.set_status(
+                    int(state.id), RunningStatus.FAILED, self._worker_id
+                )
+            raise
+        except Exception as error:
+            logging.exception(f"Run {state.id} failed")
+            state.set_status(RunStatus.failed, str(error))
+            if self._recorder is not None and state.id not in self._lost:
+                self._recorder.set_status(
+                    int(state.id), RunningStatus.FAILED, self._worker_id
+                )
+        else:
+            state.set_status(RunStatus.finished)
+
+    async def _heartbeat(self) -> None:
+        """Extend leases of unfinished runs, cancel runs reclaimed by workers."""
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            unfinished = {
+                int(state.id): state
+                for state in self._runs.values()
+                if not state.done and state.id not in self._lost
+            }
+            try:
+                async with self._session_factory.begin() as session:
+                    owned = await heartbeat_runs(session, self._worker_id, unfinished)
+            except Exception:
+                logging.exception("Heartbeat of API runs failed")
+                continue
+            for running_id, state in unfinished.items():
+                if running_id not in owned:
+                    logging.warning(f"Run {state.id} was reclaimed, cancelling it")
+                    self._lost.add(state.id)
+                    self.cancel(state)
+
+    def _forget_later(self, state: RunState) -> None:
+        asyncio.get_running_loop().call_later(self._retention, self._forget, state.id)
+
+    def _forget(self, run_id: str) -> None:
+        self._runs.pop(run_id, None)
+        self._lost.discard(run_id)
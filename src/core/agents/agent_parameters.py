@@ -1,18 +1,116 @@
 import asyncio
 import os
-from dataclasses import dataclass, fields
+import queue
+import threading
+import uuid
+from dataclasses import dataclass, field, fields
 from typing import Any, Callable, Coroutine
 
 from src.core.agents.agent_typings import DocumentName, GenerationSettings
+from src.core.agents.chat_history import FullHistory, HistoryPolicy
+from src.core.agents.file_watcher import DirectoryWatcher
+from src.core.clients.request_policy import RequestPolicy
+from src.core.clients.response_cache import CachePolicy
+from src.core.executors import ExecutionMode
 
 
 class SimpliestUserMessageRequest:
+    """
+    Console input with builtin `input()`.
+    Blocks the event loop while the user types, use `AsyncConsoleUserMessageRequest`
+    if anything else runs in the process.
+    """
+
     async def __call__(self, message: str) -> str:
         print(message)
         return input(">>> ")
 
 
+class _ConsoleReader:
+    """
+    Daemon thread reading stdin line by line.
+    Requests are served one after another, so questions of concurrent
+    pipelines are never interleaved with each other.
+    """
+
+    def __init__(self):
+        self._requests: queue.Queue[
+            tuple[str, str, asyncio.AbstractEventLoop, asyncio.Future]
+        ] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def request(self, message: str, prompt: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._read, name="console-reader", daemon=True
+                )
+                self._thread.start()
+        self._requests.put((message, prompt, loop, future))
+        return future
+
+    def _read(self) -> None:
+        try:
+            while True:
+                message, prompt, loop, future = self._requests.get()
+                if future.cancelled():
+                    continue
+                try:
+                    print(message)
+                    answer = input(prompt)
+                except (EOFError, OSError) as error:
+                    callback, value = _set_exception, error
+                else:
+                    callback, value = _set_result, answer
+                try:
+                    loop.call_soon_threadsafe(callback, future, value)
+                except RuntimeError:
+                    # the loop was closed while the user was typing
+                    continue
+        finally:
+            with self._lock:
+                self._thread = None
+
+
+def _set_result(future: asyncio.Future, result: str) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: BaseException) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+_console_reader = _ConsoleReader()
+
+
+class AsyncConsoleUserMessageRequest:
+    """
+    Console input that doesn't block the event loop.
+    Stdin is read by one shared daemon thread, so other agents and pipelines
+    keep working while the user types.
+    Parameters:
+    - prompt - prompt printed before the user answer
+    """
+
+    def __init__(self, prompt: str = ">>> "):
+        self.prompt: str = prompt
+
+    async def __call__(self, message: str) -> str:
+        return await _console_reader.request(message, self.prompt)
+
+
 class FromFileUserMessageRequest:
+    """
+    Writes the question to `<filename>.answer` and waits for the user
+    answer in `filename`. The answer file is removed after reading,
+    so the next question never gets a stale answer.
+    """
+
     def __init__(self, filename: str):
         self.filename = filename
         self.answer_filename = f"{filename}.answer"
@@ -21,11 +119,60 @@ class FromFileUserMessageRequest:
         with open(f"{self.answer_filename}", "w") as file:
             file.write(message)
 
-        while not os.path.exists(self.filename):
-            await asyncio.sleep(0.3)
+        watcher = DirectoryWatcher.for_directory(os.path.dirname(self.filename) or ".")
+        path = await watcher.wait_for(os.path.basename(self.filename))
+        with open(path, "r") as file:
+            answer = file.read()
+        os.remove(path)
+        return answer
+
+
+class FileChannelUserMessageRequest:
+    """
+    File channel for many sessions in one directory.
+    Every question gets a sequence number: it is written to
+    `<session>.<number>.question.md` and the answer is expected in
+    `<session>.<number>.answer.md`. Write answers to a temporary file and
+    rename it, or close it after one write, so that a partial answer isn't read.
+    Answered files are removed or moved into `archive` subdirectory.
+    Parameters:
+    - directory - directory shared by all sessions
+    - session - session identifier, random if None
+    - archive - keep answered files in `<directory>/archive`
+    """
+
+    def __init__(
+        self, directory: str, session: str | None = None, archive: bool = False
+    ):
+        self.directory: str = directory
+        self.session: str = session or uuid.uuid4().hex[:12]
+        self.archive: bool = archive
+        self._sequence: int = 0
+        self._watcher: DirectoryWatcher = DirectoryWatcher.for_directory(directory)
+
+    async def __call__(self, message: str) -> str:
+        self._sequence += 1
+        prefix = f"{self.session}.{self._sequence:06d}"
+        question = os.path.join(self.directory, f"{prefix}.question.md")
+        with open(f"{question}.tmp", "w") as file:
+            file.write(message)
+        os.replace(f"{question}.tmp", question)
+
+        answer = await self._watcher.wait_for(f"{prefix}.answer.md")
+        with open(answer, "r") as file:
+            text = file.read()
+        self._rotate(question, str(answer))
+        return text
 
-        with open(self.filename, "r") as file:
-            return file.read()
+    def _rotate(self, *paths: str) -> None:
+        if self.archive:
+            archive = os.path.join(self.directory, "archive")
+            os.makedirs(archive, exist_ok=True)
+        for path in paths:
+            if self.archive:
+                os.replace(path, os.path.join(archive, os.path.basename(path)))
+            else:
+                os.remove(path)
 
 
 @dataclass
@@ -35,6 +182,7 @@ class AgentParameters:
     logging_info: tuple[str | None, str | None]
     output_document_filename: str | None
     required_documents: list[DocumentName]
+    timeout: float | None = field(default=None, kw_only=True)
 
     def to_dict(self) -> dict[str, Any]:
         return {field.name: getattr(self, field.name) for field in fields(self)}
@@ -44,6 +192,12 @@ class AgentParameters:
 class AIAgentParameters(AgentParameters):
     system_prompt: str
     settings: GenerationSettings
+    stream: bool = field(default=False, kw_only=True)
+    cache_policy: CachePolicy = field(default=CachePolicy.deterministic, kw_only=True)
+    history_policy: HistoryPolicy = field(default_factory=FullHistory, kw_only=True)
+    token_budget: int | None = field(default=None, kw_only=True)
+    request_policy: RequestPolicy | None = field(default=None, kw_only=True)
+    coalesce: bool = field(default=False, kw_only=True)
 
 
 @dataclass
@@ -65,3 +219,4 @@ class ChatAgentParameters(AIAgentParameters):
 @dataclass
 class HardCodeAgentParameters(AgentParameters):
     hard_code_logic: Callable[[str], str]
+    execution_mode: ExecutionMode = field(default=ExecutionMode.inline, kw_only=True)
@@ -1,4 +1,6 @@
 import logging
+import time
+from typing import Any
 
 from openai import AsyncOpenAI
 
@@ -10,8 +12,17 @@ from src.core.agents.agent_typings import (
     Message,
     ModelName,
     Role,
+    StreamingStats,
 )
 from src.core.agents.base_agent import BaseAgent
+from src.core.agents.chat_history import (
+    FullHistory,
+    HistoryPolicy,
+    default_token_budget,
+)
+from src.core.clients.base_client import close_stream
+
+PARTIAL_DOCUMENT_INTERVAL = 0.2
 
 
 class AIAgent(BaseAgent):
@@ -27,9 +38,18 @@ class AIAgent(BaseAgent):
         output_document_name: DocumentName | None = None,
         logging_info: tuple[str | None, str | None] = (None, None),
         output_document_filename: str | None = None,
+        stream: bool = False,
+        history_policy: HistoryPolicy | None = None,
+        token_budget: int | None = None,
         **kwargs,
     ):
-        """Agent based on LLM."""
+        """
+        Agent based on LLM.
+        With `stream` the answer is received token by token and published
+        to the documents store as an incomplete document while it grows.
+        `history_policy` chooses messages sent to the model within `token_budget`,
+        which is the context window of the model without `max_tokens` by default.
+        """
         super().__init__(
             name=name,
             documents_store=documents_store,
@@ -44,6 +64,12 @@ class AIAgent(BaseAgent):
         role = Role.system if settings.model != ModelName.o1_mini else Role.user
         self._chat: list[Message] = [Message(role, system_prompt)]
         self._settings: GenerationSettings = settings
+        self._stream: bool = stream
+        self._history_policy: HistoryPolicy = history_policy or FullHistory()
+        self._token_budget: int = (
+            token_budget if token_budget is not None else default_token_budget(settings)
+        )
+        self._streaming_stats: list[StreamingStats] = []
 
     async def _run(self) -> None:
         """Run agent and return output document."""
@@ -72,21 +98,94 @@ class AIAgent(BaseAgent):
         self._documents_store.update(result)
         return result
 
+    def get_configuration(self) -> dict[str, Any]:
+        return {
+            **super().get_configuration(),
+            "system_prompt": self._system_prompt,
+            "settings": self._settings.to_dict(),
+        }
+
+    def get_state(self) -> dict[str, Any]:
+        return {"chat": [message.to_dict() for message in self._chat]}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        self._chat = [
+            Message(Role(message["role"]), message["content"])
+            for message in state["chat"]
+        ]
+
     async def send(self, message: str, role: Role = Role.user) -> str | None:
         """Sends message. Returns answer. Save both at chat history."""
         self._chat.append(Message(role, content=message))
 
-        completion = await self._client.chat.completions.create(
-            messages=map(Message.to_dict, self._chat),
-            **self._settings.to_dict(),
-        )
-        logging.debug(completion)
-        answer = completion.choices[0].message.content
+        history = await self._history_policy.prepare(self._chat, self._token_budget)
+        messages = [message.to_dict() for message in history]
+        if self._stream:
+            answer = await self._receive_stream(messages)
+        else:
+            completion = await self._client.chat.completions.create(
+                messages=messages,
+                **self._settings.to_dict(),
+            )
+            logging.debug(completion)
+            answer = completion.choices[0].message.content
 
         self._chat.append(Message(Role.assistant, content=answer))
 
         return answer
 
+    async def _receive_stream(self, messages: list[dict]) -> str:
+        """Receive answer by chunks, publishing partial document on the way."""
+        start = time.monotonic()
+        first_token_time = None
+        last_publish_time = start
+        parts: list[str] = []
+
+        stream = await self._client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            **self._settings.to_dict(),
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                now = time.monotonic()
+                if first_token_time is None:
+                    first_token_time = now
+                parts.append(chunk.choices[0].delta.content)
+                if now - last_publish_time >= PARTIAL_DOCUMENT_INTERVAL:
+                    last_publish_time = now
+                    self._publish_partial("".join(parts))
+        finally:
+            # frees the connection and the rate limiter slot if the agent is cancelled
+            await close_stream(stream)
+
+        stats = StreamingStats(
+            time_to_first_token=(
+                first_token_time - start if first_token_time is not None else None
+            ),
+            duration=time.monotonic() - start,
+            tokens=len(parts),
+        )
+        self._streaming_stats.append(stats)
+        logging.info(
+            f"{self._name}: first token in {stats.time_to_first_token or 0:.2f}s, "
+            f"{stats.tokens_per_second:.1f} tokens/s"
+        )
+        return "".join(parts)
+
+    def _publish_partial(self, content: str) -> None:
+        """Publish not finished answer as incomplete output document."""
+        self._documents_store.add(
+            Document(name=self._output_document_name, content=content, complete=False)
+        )
+
+    @property
+    def streaming_stats(self) -> list[StreamingStats]:
+        """Statistics of streamed completions."""
+        return self._streaming_stats
+
     def clear_chat(self) -> None:
         """Clear chat."""
         self._chat = [Message(Role.system, self._system_prompt)]
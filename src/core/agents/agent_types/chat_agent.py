@@ -8,8 +8,10 @@ from src.core.agents.agent_typings import (
     DocumentsStore,
     GenerationSettings,
     Role,
+    Transcript,
 )
 from src.core.agents.agent_types.ai_agent import AIAgent
+from src.core.agents.chat_history import HistoryPolicy
 
 
 class ChatAgent(AIAgent):
@@ -28,6 +30,9 @@ class ChatAgent(AIAgent):
         last_message_filename: str | None = None,
         chat_filename: str | None = None,
         stop_words: list[str] | None = None,
+        stream: bool = False,
+        history_policy: HistoryPolicy | None = None,
+        token_budget: int | None = None,
         **kwargs,
     ):
         """
@@ -44,9 +49,13 @@ class ChatAgent(AIAgent):
             settings=settings,
             logging_info=logging_info,
             output_document_filename=last_message_filename,
+            stream=stream,
+            history_policy=history_policy,
+            token_budget=token_budget,
         )
         self._chat_name: str = chat_name
         self._chat_filename: str | None = chat_filename
+        self._transcript: Transcript = Transcript(chat_filename)
         self._stop_words: list[str] | None = stop_words
         self._request_user_message: callable[[str], Coroutine[Any, Any, str]] = (
             request_user_message
@@ -71,16 +80,15 @@ class ChatAgent(AIAgent):
     def save_documents(self) -> DocumentsStore:
         """
         Save chat to documents store.
+        Transcript file is appended with new messages only.
         """
         super_result = super().save_documents()
 
-        result = "\n\n".join([str(message) for message in self._chat])
         result = DocumentsStore(
             {
                 self._chat_name: Document(
                     name=self._chat_name,
-                    content=result,
-                    filename=self._chat_filename,
+                    content=self._transcript.update(self._chat),
                 )
             }
         )
@@ -89,6 +97,9 @@ class ChatAgent(AIAgent):
 
         return super_result.update(result)
 
+    def get_configuration(self) -> dict[str, Any]:
+        return {**super().get_configuration(), "stop_words": self._stop_words}
+
     def stop_me(self) -> bool:
         """
         Check if message contains stop words.
@@ -98,4 +109,4 @@ class ChatAgent(AIAgent):
     @property
     def output_document_names(self) -> set[DocumentName]:
         """Output document names."""
-        return set([self._chat_name, self._last_message_name])
+        return set([self._chat_name, self._output_document_name])
@@ -1,3 +1,5 @@
+from typing import Any
+
 from openai import AsyncOpenAI
 
 from src.core.agents.agent_typings import (
@@ -9,6 +11,7 @@ from src.core.agents.agent_typings import (
     Role,
 )
 from src.core.agents.agent_types.ai_agent import AIAgent
+from src.core.agents.chat_history import HistoryPolicy
 
 
 class CriticAgent(AIAgent):
@@ -26,6 +29,9 @@ class CriticAgent(AIAgent):
         logging_info: tuple[str | None, str | None] = (None, None),
         output_document_filename: str | None = None,
         max_iterations: int = 10,
+        stream: bool = False,
+        history_policy: HistoryPolicy | None = None,
+        token_budget: int | None = None,
         **kwargs,
     ):
         """
@@ -42,6 +48,9 @@ class CriticAgent(AIAgent):
             settings=settings,
             logging_info=logging_info,
             output_document_filename=output_document_filename,
+            stream=stream,
+            history_policy=history_policy,
+            token_budget=token_budget,
         )
         self._criticized_agent: AIAgent = criticized_agent
         self._saving_critics: list[str] = []
@@ -86,6 +95,28 @@ class CriticAgent(AIAgent):
 
         return self.save_documents()
 
+    @property
+    def criticized_agent(self) -> AIAgent:
+        """Agent revising its answer by the critics."""
+        return self._criticized_agent
+
+    def get_configuration(self) -> dict[str, Any]:
+        return {
+            **super().get_configuration(),
+            "max_iterations": self._max_iterations,
+            "criticized_agent": self._criticized_agent.get_configuration(),
+        }
+
+    def get_state(self) -> dict[str, Any]:
+        return {**super().get_state(), "critics": self._saving_critics}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        super().set_state(state)
+        self._saving_critics = state["critics"]
+
+    def _publish_partial(self, content: str) -> None:
+        """Critics are published only when the whole iteration is finished."""
+
     def save_documents(self) -> DocumentsStore:
         """Save documents."""
         result = "\n\n".join(self._saving_critics)
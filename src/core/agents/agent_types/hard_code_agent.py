@@ -1,7 +1,10 @@
-from typing import Callable, TypeAlias
+from functools import partial
+from types import FunctionType, ModuleType
+from typing import Any, Callable, TypeAlias
 
 from src.core.agents.agent_typings import Document, DocumentName, DocumentsStore
 from src.core.agents.base_agent import BaseAgent
+from src.core.executors import ExecutionMode, executors
 
 HardCodeLogic: TypeAlias = Callable[[str], str]
 
@@ -17,9 +20,14 @@ class HardCodeAgent(BaseAgent):
         hard_code_logic: HardCodeLogic,
         logging_info: tuple[str | None, str | None] = (None, None),
         output_document_filename: str | None = None,
+        execution_mode: ExecutionMode = ExecutionMode.inline,
         **kwargs,
     ):
-        """Agent with hard-coded logic."""
+        """
+        Agent with hard-coded logic.
+        `execution_mode` chooses whether the logic runs on the event loop
+        or in a thread or process pool shared by all pipelines.
+        """
         super().__init__(
             name=name,
             documents_store=documents_store,
@@ -30,6 +38,7 @@ class HardCodeAgent(BaseAgent):
             output_document_filename=output_document_filename,
         )
         self._hard_code_logic: HardCodeLogic = hard_code_logic
+        self._execution_mode: ExecutionMode = execution_mode
         self._last_result: str | None = None
 
     async def _run(self) -> None:
@@ -38,7 +47,21 @@ class HardCodeAgent(BaseAgent):
             self._input_document_names
         )
         input_content = "\n".join([doc.content for doc in input_documents])
-        self._last_result = self._hard_code_logic(input_content)
+        self._last_result = await executors.run(
+            self._execution_mode, self._hard_code_logic, input_content
+        )
+
+    def get_configuration(self) -> dict[str, Any]:
+        return {
+            **super().get_configuration(),
+            "hard_code_logic": _logic_fingerprint(self._hard_code_logic),
+        }
+
+    def get_state(self) -> dict[str, Any]:
+        return {"last_result": self._last_result}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        self._last_result = state["last_result"]
 
     def save_documents(self) -> DocumentsStore:
         """Save documents."""
@@ -50,3 +73,45 @@ class HardCodeAgent(BaseAgent):
         store = DocumentsStore({self._output_document_name: document})
         self._documents_store.update(store)
         return store
+
+
+def _logic_fingerprint(logic: Any, seen: set[int] | None = None) -> Any:
+    """
+    JSON-compatible description of hard-coded logic for agent fingerprints:
+    code of functions with values of their closures and referenced globals,
+    wrapped functions, arguments and keywords of partials.
+    """
+    seen = set() if seen is None else seen
+    if id(logic) in seen:
+        return "<recursion>"
+    if isinstance(logic, partial):
+        seen.add(id(logic))
+        return {
+            "func": _logic_fingerprint(logic.func, seen),
+            "args": [_logic_fingerprint(arg, seen) for arg in logic.args],
+            "keywords": {
+                key: _logic_fingerprint(value, seen)
+                for key, value in sorted(logic.keywords.items())
+            },
+        }
+    if isinstance(logic, FunctionType):
+        seen.add(id(logic))
+        code = logic.__code__
+        return {
+            "function": f"{logic.__module__}.{logic.__qualname__}",
+            "code": [code.co_code.hex(), repr(code.co_consts)],
+            "closure": [
+                _logic_fingerprint(cell.cell_contents, seen)
+                for cell in logic.__closure__ or ()
+            ],
+            "globals": {
+                name: _logic_fingerprint(logic.__globals__[name], seen)
+                for name in code.co_names
+                if name in logic.__globals__
+                and not isinstance(logic.__globals__[name], ModuleType)
+            },
+            "defaults": [
+                _logic_fingerprint(value, seen) for value in logic.__defaults__ or ()
+            ],
+        }
+    return repr(logic)
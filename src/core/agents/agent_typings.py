@@ -1,9 +1,10 @@
-import os
+import asyncio
 from dataclasses import dataclass, fields
 from enum import Enum
-from typing import Any, Iterable, Self, TypeAlias
+from typing import Any, AsyncIterator, Callable, Iterable, Self, TypeAlias
 
 from src.core.consts import DATA_DIR
+from src.core.document_writer import document_writer
 
 
 class ModelName(Enum):
@@ -99,46 +100,217 @@ class Document:
     Parameters:
     - name - name of the document
     - content - content of the document
-    - filename - filename of the document
+    - filename - filename of the document, written in background by `document_writer`
+    - complete - False while the document is still being generated
     """
 
     name: DocumentName
     content: str
     filename: str | None = None
+    complete: bool = True
 
     def __post_init__(self):
         if self.filename is None:
             return
-        path = DATA_DIR / self.filename
-        os.makedirs(path.parent, exist_ok=True)
-        with path.open("w", encoding="utf-8") as f:
-            f.write(self.content)
+        document_writer.submit(DATA_DIR / self.filename, self.content)
 
     def __str__(self) -> str:
         return f"# {self.name}: \n{self.content}"
 
 
+class Transcript:
+    """
+    Chat rendered into one text incrementally.
+    Every message is rendered once and appended to the text instead of joining
+    the whole history again, the file is appended with new messages instead of
+    being rewritten.
+    Parameters:
+    - filename - filename of the transcript
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, filename: str | None = None):
+        self.filename: str | None = filename
+        self._parts: list[str] = []
+        self._content: str = ""
+        self._saved: int = 0
+
+    def update(self, chat: list[Message]) -> str:
+        """Render new messages of the chat, returns the whole transcript."""
+        if len(chat) < len(self._parts):
+            self._parts, self._content, self._saved = [], "", 0
+        new_parts = [str(message) for message in chat[len(self._parts) :]]
+        if new_parts:
+            if self._parts:
+                self._content += self.SEPARATOR
+            self._content += self.SEPARATOR.join(new_parts)
+            self._parts.extend(new_parts)
+        self._save()
+        return self._content
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    def _save(self) -> None:
+        if self.filename is None or self._saved == len(self._parts):
+            return
+        path = DATA_DIR / self.filename
+        if self._saved == 0:
+            document_writer.submit(path, self._content)
+        else:
+            new_parts = self._parts[self._saved :]
+            document_writer.append(
+                path, self.SEPARATOR + self.SEPARATOR.join(new_parts)
+            )
+        self._saved = len(self._parts)
+
+
+@dataclass
+class StreamingStats:
+    """
+    Statistics of one streamed completion.
+    Parameters:
+    - time_to_first_token - seconds from request to the first content chunk
+    - duration - seconds from request to the end of the stream
+    - tokens - number of received content chunks, about one token each
+    """
+
+    time_to_first_token: float | None
+    duration: float
+    tokens: int
+
+    @property
+    def tokens_per_second(self) -> float:
+        generation_time = self.duration - (self.time_to_first_token or 0.0)
+        return self.tokens / generation_time if generation_time > 0 else 0.0
+
+
+class _DocumentsWaiter:
+    """
+    Agent waiting for documents.
+    Parameters:
+    - missing - number of documents that are not in the store yet
+    - future - future resolved when all documents arrive
+    """
+
+    def __init__(self, missing: int, future: asyncio.Future):
+        self.missing: int = missing
+        self.future: asyncio.Future = future
+
+    def notify(self) -> None:
+        self.missing -= 1
+        if self.missing == 0 and not self.future.done():
+            self.future.set_result(None)
+
+
 class DocumentsStore:
     """
     Store of documents.
+    Wakes up agents waiting for documents as soon as the last of them is complete.
     """
 
     def __init__(self, documents: dict[DocumentName, Document] | None = None):
         self.documents: dict[DocumentName, Document] = documents or {}
+        self._waiters: dict[DocumentName, list[_DocumentsWaiter]] = {}
+        self._update_waiters: dict[DocumentName, list[asyncio.Future]] = {}
+        self._listeners: list[Callable[[Document], None]] = []
+
+    def subscribe(self, listener: Callable[[Document], None]) -> None:
+        """Call `listener` with every document added to the store."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Document], None]) -> None:
+        self._listeners.remove(listener)
 
     def update(self, documents: Self | dict[DocumentName, Document]) -> Self:
-        if isinstance(documents, dict):
-            self.documents.update(documents)
-        else:
-            self.documents.update(documents.documents)
+        if not isinstance(documents, dict):
+            documents = documents.documents
+        for document in documents.values():
+            self.add(document)
         return self
 
     def add(self, document: Document) -> None:
+        was_complete = self._is_complete(document.name)
         self.documents[document.name] = document
+        if document.complete and not was_complete:
+            self._notify(document.name)
+        for future in self._update_waiters.pop(document.name, []):
+            if not future.done():
+                future.set_result(None)
+        for listener in self._listeners:
+            listener(document)
 
     def get_documents(self, document_names: list[DocumentName]) -> list[Document]:
         return [self.documents[name] for name in document_names]
 
     def contains(self, document_names: Iterable[DocumentName]) -> bool:
-        document_names = set(document_names)
-        return document_names.issubset(set(self.documents.keys()))
+        return all(self._is_complete(name) for name in document_names)
+
+    async def wait_for(self, document_names: Iterable[DocumentName]) -> None:
+        """
+        Wait until all documents are in the store and complete.
+        """
+        missing = {name for name in document_names if not self._is_complete(name)}
+        if not missing:
+            return
+
+        waiter = _DocumentsWaiter(
+            len(missing), asyncio.get_running_loop().create_future()
+        )
+        for name in missing:
+            self._waiters.setdefault(name, []).append(waiter)
+
+        try:
+            await waiter.future
+        finally:
+            for name in missing:
+                waiters = self._waiters.get(name)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[name]
+
+    async def stream(self, document_name: DocumentName) -> AsyncIterator[Document]:
+        """
+        Yield versions of the document as they arrive until it is complete.
+        Versions replaced before the consumer got them are skipped.
+        """
+        last = None
+        while True:
+            document = self.documents.get(document_name)
+            if document is not None and document is not last:
+                last = document
+                yield document
+                if document.complete:
+                    return
+                continue
+
+            await self.wait_for_update([document_name])
+
+    async def wait_for_update(self, document_names: Iterable[DocumentName]) -> None:
+        """
+        Wait until any of the documents is added or replaced.
+        """
+        document_names = list(document_names)
+        future = asyncio.get_running_loop().create_future()
+        for document_name in document_names:
+            self._update_waiters.setdefault(document_name, []).append(future)
+        try:
+            await future
+        finally:
+            for document_name in document_names:
+                futures = self._update_waiters.get(document_name)
+                if futures is not None and future in futures:
+                    futures.remove(future)
+                    if not futures:
+                        del self._update_waiters[document_name]
+
+    def _is_complete(self, document_name: DocumentName) -> bool:
+        document = self.documents.get(document_name)
+        return document is not None and document.complete
+
+    def _notify(self, document_name: DocumentName) -> None:
+        for waiter in self._waiters.pop(document_name, []):
+            waiter.notify()
@@ -1,6 +1,6 @@
-import asyncio
 import logging
 from abc import abstractmethod
+from typing import Any
 
 from src.core.agents.agent_typings import DocumentName, DocumentsStore
 
@@ -30,11 +30,9 @@ class BaseAgent:
 
     async def run(self) -> DocumentsStore:
         """Run agent and return output document."""
-        while not (
-            self._documents_store.contains(self._input_document_names)
-            and self._documents_store.contains(self._required_documents)
-        ):
-            await asyncio.sleep(0.5)
+        await self._documents_store.wait_for(
+            [*self._input_document_names, *self._required_documents]
+        )
 
         if self._logging_info[0] is not None:
             logging.info(self._logging_info[0])
@@ -56,6 +54,17 @@ class BaseAgent:
         """Save documents."""
         raise NotImplementedError
 
+    def get_configuration(self) -> dict[str, Any]:
+        """Configuration affecting results of the agent, part of its fingerprint."""
+        return {"type": type(self).__name__}
+
+    def get_state(self) -> dict[str, Any]:
+        """State to restore the agent on resume, must be JSON serializable."""
+        return {}
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        """Restore state returned by `get_state`."""
+
     @property
     def name(self) -> str:
         """Agent name."""
@@ -66,6 +75,11 @@ class BaseAgent:
         """Input document names."""
         return set(self._input_document_names)
 
+    @property
+    def required_document_names(self) -> set[DocumentName]:
+        """Required document names."""
+        return set(self._required_documents)
+
     @property
     def output_document_names(self) -> set[DocumentName]:
         """Output document names."""
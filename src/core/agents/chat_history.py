@@ -0,0 +1,153 @@
+import logging
+from abc import abstractmethod
+
+from openai import AsyncOpenAI
+
+from src.core.agents.agent_typings import GenerationSettings, Message, ModelName, Role
+
+CONTEXT_WINDOWS: dict[ModelName, int] = {
+    ModelName.gpt_4o: 128_000,
+    ModelName.gpt_4o_mini: 128_000,
+    ModelName.o1_mini: 128_000,
+    ModelName.claude_3_sonnet: 200_000,
+    ModelName.claude_3_haiku: 200_000,
+}
+
+SUMMARY_PROMPT = """
+Summarize the conversation below. Keep every fact, requirement, decision and link,
+drop greetings and repetitions. Answer only with the summary.
+"""
+
+
+def count_tokens(messages: list[Message]) -> int:
+    """Rough estimation of tokens: 4 characters per token and 4 tokens per message."""
+    return sum(len(message.content or "") // 4 + 4 for message in messages)
+
+
+def default_token_budget(settings: GenerationSettings) -> int:
+    """Tokens left for the prompt in the context window of the model."""
+    return CONTEXT_WINDOWS[settings.model] - settings.max_tokens
+
+
+class HistoryPolicy:
+    """
+    Policy choosing which messages of the chat are sent to the model.
+    Chat itself is never changed, so transcripts stay complete.
+    The first message of the chat is the system prompt and is always sent.
+    """
+
+    @abstractmethod
+    async def prepare(self, chat: list[Message], budget: int) -> list[Message]:
+        """Messages to send within `budget` tokens."""
+        raise NotImplementedError
+
+
+class FullHistory(HistoryPolicy):
+    """Send the whole chat."""
+
+    async def prepare(self, chat: list[Message], budget: int) -> list[Message]:
+        return chat
+
+
+class SlidingWindowHistory(HistoryPolicy):
+    """
+    Send system prompt and the latest messages fitting the budget.
+    Parameters:
+    - max_messages - max number of messages after the system prompt, unlimited if None
+    """
+
+    def __init__(self, max_messages: int | None = None):
+        self._max_messages: int | None = max_messages
+
+    async def prepare(self, chat: list[Message], budget: int) -> list[Message]:
+        budget -= count_tokens(chat[:1])
+        return [chat[0], *_latest(chat[1:], budget, self._max_messages)]
+
+
+class PinnedDraftHistory(HistoryPolicy):
+    """
+    Send system prompt, the task, the latest draft and messages after it.
+    Suits agents revising their answer in a critic loop:
+    prompt size doesn't grow with iterations.
+    """
+
+    async def prepare(self, chat: list[Message], budget: int) -> list[Message]:
+        drafts = [i for i, message in enumerate(chat) if message.role == Role.assistant]
+        if len(chat) < 3 or not drafts:
+            return await SlidingWindowHistory().prepare(chat, budget)
+
+        pinned = [chat[0], chat[1]]
+        latest = chat[max(drafts[-1], 2) :]
+        return [*pinned, *_latest(latest, budget - count_tokens(pinned))]
+
+
+class SummarizingHistory(HistoryPolicy):
+    """
+    Replace old messages with their summary made by a cheaper model
+    when the chat doesn't fit the budget.
+    Summary is updated incrementally, so create one instance per agent.
+    Parameters:
+    - client - client for summarization requests
+    - settings - settings of the summarizing model
+    - keep_last - number of latest messages sent as is
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        settings: GenerationSettings,
+        keep_last: int = 4,
+    ):
+        self._client: AsyncOpenAI = client
+        self._settings: GenerationSettings = settings
+        self._keep_last: int = keep_last
+        self._summary: str = ""
+        self._summarized: int = 0
+
+    async def prepare(self, chat: list[Message], budget: int) -> list[Message]:
+        if count_tokens(chat) <= budget or len(chat) <= self._keep_last + 1:
+            return chat
+
+        old = chat[1 : -self._keep_last]
+        if len(old) < self._summarized:
+            self._summary, self._summarized = "", 0
+        if len(old) > self._summarized:
+            self._summary = await self._summarize(old[self._summarized :])
+            self._summarized = len(old)
+
+        summary = Message(
+            chat[0].role, f"Summary of the previous conversation:\n{self._summary}"
+        )
+        prepared = [chat[0], summary, *chat[-self._keep_last :]]
+        return await SlidingWindowHistory().prepare(prepared, budget)
+
+    async def _summarize(self, messages: list[Message]) -> str:
+        text = "\n\n".join(str(message) for message in messages)
+        if self._summary:
+            text = f"## Previous summary: \n{self._summary}\n\n{text}"
+        completion = await self._client.chat.completions.create(
+            messages=[
+                Message(Role.system, SUMMARY_PROMPT).to_dict(),
+                Message(Role.user, text).to_dict(),
+            ],
+            **self._settings.to_dict(),
+        )
+        logging.debug(completion)
+        return completion.choices[0].message.content
+
+
+def _latest(
+    messages: list[Message], budget: int, max_messages: int | None = None
+) -> list[Message]:
+    """Latest messages fitting the budget, at least the last one."""
+    result: list[Message] = []
+    total = 0
+    for message in reversed(messages):
+        if max_messages is not None and len(result) >= max_messages:
+            break
+        tokens = count_tokens([message])
+        if result and total + tokens > budget:
+            break
+        result.append(message)
+        total += tokens
+    return result[::-1]
@@ -0,0 +1,141 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class DirectoryWatcher:
+    """
+    Waits for files to appear in a directory.
+    On Linux it is notified by inotify when a file is closed after writing
+    or moved into the directory, elsewhere the directory is scanned once per
+    `poll_interval` for all waiters together.
+    Notifications are enabled only while somebody waits, so one watcher can
+    be shared by any number of sessions. Use `for_directory` to get it.
+    Parameters:
+    - directory - watched directory, created if missing
+    - poll_interval - seconds between scans when inotify is unavailable
+    """
+
+    _watchers: dict[Path, "DirectoryWatcher"] = {}
+
+    def __init__(self, directory: str | Path, poll_interval: float = 0.3):
+        self.directory: Path = Path(directory).resolve()
+        self._poll_interval: float = poll_interval
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._fd: int | None = None
+        self._poll_task: asyncio.Task | None = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def for_directory(cls, directory: str | Path) -> "DirectoryWatcher":
+        """Shared watcher of the directory."""
+        path = Path(directory).resolve()
+        if path not in cls._watchers:
+            cls._watchers[path] = cls(path)
+        return cls._watchers[path]
+
+    async def wait_for(self, name: str) -> Path:
+        """Wait until file `name` exists in the directory, returns its path."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.setdefault(name, []).append(future)
+        try:
+            self._start(loop)
+            if (self.directory / name).exists():
+                future.set_result(None)
+            await future
+        finally:
+            futures = self._waiters.get(name, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._waiters.pop(name, None)
+            if not self._waiters:
+                self._stop()
+        return self.directory / name
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._loop is not None:
+            return
+        self._loop = loop
+        self._fd = _inotify_watch(self.directory)
+        if self._fd is not None:
+            loop.add_reader(self._fd, self._on_inotify)
+        else:
+            self._poll_task = loop.create_task(self._poll())
+
+    def _stop(self) -> None:
+        if self._loop is None:
+            return
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        self._loop = None
+
+    def _on_inotify(self) -> None:
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self._scan()
+            elif name:
+                self._resolve(os.fsdecode(name))
+
+    async def _poll(self) -> None:
+        while True:
+            self._scan()
+            await asyncio.sleep(self._poll_interval)
+
+    def _scan(self) -> None:
+        try:
+            names = set(os.listdir(self.directory))
+        except FileNotFoundError:
+            return
+        for name in names & set(self._waiters):
+            self._resolve(name)
+
+    def _resolve(self, name: str) -> None:
+        for future in self._waiters.get(name, []):
+            if not future.done():
+                future.set_result(None)
+
+
+def _inotify_watch(directory: Path) -> int | None:
+    """Inotify descriptor watching the directory or None if it is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+    except (OSError, AttributeError) as error:
+        logging.warning(f"Inotify is unavailable, directory will be polled: {error}")
+        return None
+    return fd
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+from abc import abstractmethod
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Iterable
+
+from src.core.agents.agent_typings import Document, DocumentName
+
+
+class AgentStatus(Enum):
+    """
+    Status of an agent in a checkpointed run.
+    Variants:
+    - completed - agent finished, it is reused on resume while its fingerprint matches
+    - failed - agent raised an exception, it is run again on resume
+    """
+
+    completed = "completed"
+    failed = "failed"
+
+
+@dataclass
+class AgentCheckpoint:
+    """
+    Result of one agent in a checkpointed run.
+    Parameters:
+    - status - status of the agent
+    - fingerprint - hash of the agent configuration and documents it consumed
+    - states - states of the agent and agents it changed, e.g. criticized agent
+    - documents - documents of these agents after the agent finished,
+      see `dump_documents`
+    """
+
+    status: AgentStatus
+    fingerprint: str | None = None
+    states: dict[str, dict[str, Any]] = field(default_factory=dict)
+    documents: dict[DocumentName, dict[str, Any]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "status": self.status.value,
+            "fingerprint": self.fingerprint,
+            "states": self.states,
+            "documents": self.documents,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "AgentCheckpoint":
+        return cls(
+            status=AgentStatus(data["status"]),
+            fingerprint=data["fingerprint"],
+            states=data["states"],
+            documents=data["documents"],
+        )
+
+
+@dataclass
+class Checkpoint:
+    """
+    State of a pipeline run after some agents finished.
+    Parameters:
+    - run_id - identifier of the run
+    - documents - initial documents, see `dump_documents`
+    - agents - results of the finished agents
+    """
+
+    run_id: str
+    documents: dict[DocumentName, dict[str, Any]] = field(default_factory=dict)
+    agents: dict[str, AgentCheckpoint] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "documents": self.documents,
+            "agents": {name: agent.to_dict() for name, agent in self.agents.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Checkpoint":
+        return cls(
+            run_id=data["run_id"],
+            documents=data["documents"],
+            agents={
+                name: AgentCheckpoint.from_dict(agent)
+                for name, agent in data["agents"].items()
+            },
+        )
+
+
+def fingerprint(configuration: dict[str, Any], documents: list[Document]) -> str:
+    """Hash of agent configuration and contents of consumed documents."""
+    payload = {
+        "configuration": configuration,
+        "documents": {document.name: document.content for document in documents},
+    }
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """Storage of pipeline checkpoints, one checkpoint per run id."""
+
+    @abstractmethod
+    def load(self, run_id: str) -> Checkpoint | None:
+        """Latest checkpoint of the run or None if there is no one."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, checkpoint: Checkpoint) -> None:
+        """Replace checkpoint of the run."""
+        raise NotImplementedError
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Checkpoints as JSON files `<run_id>.json` in a directory.
+    Files are replaced atomically, so a crash while saving keeps
+    the previous checkpoint.
+    """
+
+    def __init__(self, directory: str | Path):
+        self._directory: Path = Path(directory)
+        os.makedirs(self._directory, exist_ok=True)
+
+    def load(self, run_id: str) -> Checkpoint | None:
+        path = self._directory / f"{run_id}.json"
+        if not path.exists():
+            return None
+        with path.open("r", encoding="utf-8") as file:
+            return Checkpoint.from_dict(json.load(file))
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        path = self._directory / f"{checkpoint.run_id}.json"
+        temporary = path.with_name(f".{path.name}.tmp")
+        with temporary.open("w", encoding="utf-8") as file:
+            json.dump(checkpoint.to_dict(), file, ensure_ascii=False)
+        os.replace(temporary, path)
+
+
+def dump_documents(documents: Iterable[Document]) -> dict[DocumentName, dict[str, Any]]:
+    """
+    Documents in checkpoint form. Documents are created back by `load_documents`
+    only when they are reused, so files of outdated documents aren't rewritten.
+    """
+    return {
+        document.name: {"content": document.content, "filename": document.filename}
+        for document in documents
+    }
+
+
+def load_documents(
+    data: dict[DocumentName, dict[str, Any]],
+) -> dict[DocumentName, Document]:
+    """Documents dumped by `dump_documents`."""
+    return {
+        name: Document(name, document["content"], document["filename"])
+        for name, document in data.items()
+    }
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+TRANSPORT_PARAMETERS = {"stream", "stream_options", "timeout"}
+
+
+class ClientWrapper:
+    """
+    Base class for wrappers around AsyncOpenAI client.
+    Wrapper exposes the same `chat.completions.create` method as the client,
+    so wrappers can be nested and passed to `Pipeline` instead of the client.
+    Wrappers answering by themselves are created with None client.
+    """
+
+    def __init__(self, client: "AsyncOpenAI | ClientWrapper | None"):
+        self._client: AsyncOpenAI | ClientWrapper | None = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def base_url(self) -> str:
+        """Base url of the wrapped client."""
+        return str(self._client.base_url)
+
+    async def create(self, **kwargs) -> Any:
+        """Create chat completion."""
+        return await self._client.chat.completions.create(**kwargs)
+
+
+class TokenCountingClient(ClientWrapper):
+    """
+    Client counting tokens of its requests.
+    Prompt tokens are estimated when the request is sent, so cancelled requests
+    are counted too. Completion tokens are taken from usage if the provider
+    returns it, otherwise they are estimated from the answer.
+    """
+
+    def __init__(self, client: "AsyncOpenAI | ClientWrapper"):
+        super().__init__(client)
+        self.tokens: int = 0
+
+    async def create(self, **kwargs) -> Any:
+        self.tokens += estimate_tokens(kwargs["messages"])
+        result = await self._client.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return WrappedStream(result, self._count_stream(result))
+        if result.usage is not None:
+            self.tokens += result.usage.completion_tokens
+        else:
+            self.tokens += _estimate_answer(result.choices[0].message.content)
+        return result
+
+    async def _count_stream(self, stream: AsyncIterator) -> AsyncIterator:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                self.tokens += _estimate_answer(chunk.choices[0].delta.content)
+            yield chunk
+
+
+class WrappedStream:
+    """
+    Stream of chunks produced by `chunks` from the wrapped `stream`.
+    Closing it closes the wrapped stream too, even if iteration hasn't started,
+    so connections and limiter slots held by inner streams are freed.
+    """
+
+    def __init__(self, stream: AsyncIterator, chunks: AsyncIterator):
+        self._stream: AsyncIterator = stream
+        self._chunks: AsyncIterator = chunks
+
+    def __aiter__(self) -> AsyncIterator:
+        return self._chunks
+
+    async def __aenter__(self) -> "WrappedStream":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        try:
+            await close_stream(self._chunks)
+        finally:
+            await close_stream(self._stream)
+
+
+async def close_stream(stream: Any) -> None:
+    """Close stream of chunks returned by a client if it can be closed."""
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is not None:
+        await close()
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """Rough estimation of prompt tokens: 4 characters per token."""
+    return sum(len(message["content"] or "") for message in messages) // 4 + 1
+
+
+def _estimate_answer(text: str | None) -> int:
+    return len(text or "") // 4 + 1
+
+
+def request_fingerprint(base_url: str, kwargs: dict[str, Any]) -> str:
+    """
+    Hash of the request payload.
+    Transport parameters are ignored and messages are normalized,
+    so the same request gets the same fingerprint streamed or not.
+    """
+    payload = {
+        key: value for key, value in kwargs.items() if key not in TRANSPORT_PARAMETERS
+    }
+    payload["messages"] = [
+        {
+            "role": message["role"],
+            "content": (message["content"] or "").replace("\r\n", "\n").strip(),
+        }
+        for message in kwargs["messages"]
+    ]
+    payload["base_url"] = base_url
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def completion_from_text(model: str, text: str) -> ChatCompletion:
+    """Build completion with one answer."""
+    return ChatCompletion.model_validate(
+        {
+            "id": f"chatcmpl-{hashlib.sha1(text.encode('utf-8')).hexdigest()[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": text},
+                }
+            ],
+        }
+    )
+
+
+def chunk_from_text(model: str, text: str) -> ChatCompletionChunk:
+    """Build stream chunk with a piece of answer."""
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-chunk",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": None,
+                    "delta": {"role": "assistant", "content": text},
+                }
+            ],
+        }
+    )
+
+
+async def stream_from_texts(model: str, texts: list[str]) -> AsyncIterator:
+    """Stream of chunks with given pieces of answer."""
+    for text in texts:
+        yield chunk_from_text(model, text)
@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from src.core.clients.base_client import (
+    ClientWrapper,
+    WrappedStream,
+    chunk_from_text,
+    completion_from_text,
+    request_fingerprint,
+)
+
+
+class CassetteError(LookupError):
+    """Request was not recorded in the cassette."""
+
+
+class ReplayMode(Enum):
+    """
+    How recorded answers are served.
+    Variants:
+    - instant - without any delay
+    - realtime - with recorded latency and chunk timings
+    """
+
+    instant = "instant"
+    realtime = "realtime"
+
+
+class RecordingClient(ClientWrapper):
+    """
+    Client that records every request and answer with timings into a cassette.
+    Cassette is a gzipped file with one JSON entry per line, entries are
+    appended in a thread as soon as the answer is received.
+    """
+
+    def __init__(self, client: AsyncOpenAI | ClientWrapper, path: str | Path):
+        super().__init__(client)
+        self._path: Path = Path(path)
+        self._lock: threading.Lock = threading.Lock()
+        os.makedirs(self._path.parent, exist_ok=True)
+
+    async def create(self, **kwargs):
+        start = time.monotonic()
+        result = await self._client.chat.completions.create(**kwargs)
+        entry = {
+            "key": request_fingerprint(self.base_url, kwargs),
+            "base_url": self.base_url,
+            "model": kwargs["model"],
+        }
+        if kwargs.get("stream"):
+            return WrappedStream(result, self._record_stream(entry, start, result))
+
+        entry["latency"] = time.monotonic() - start
+        entry["response"] = result.model_dump(mode="json", exclude_unset=True)
+        await asyncio.to_thread(self._write, entry)
+        return result
+
+    async def _record_stream(
+        self, entry: dict[str, Any], start: float, stream: AsyncIterator
+    ) -> AsyncIterator:
+        chunks = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                chunks.append(
+                    [time.monotonic() - start, chunk.choices[0].delta.content]
+                )
+            yield chunk
+        entry["latency"] = time.monotonic() - start
+        entry["chunks"] = chunks
+        await asyncio.to_thread(self._write, entry)
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock, gzip.open(self._path, "at", encoding="utf-8") as file:
+            file.write(line)
+
+
+class ReplayingClient(ClientWrapper):
+    """
+    Client that answers from a cassette without any provider.
+    Repeated requests get recorded answers in the recorded order,
+    the last answer is reused when they run out.
+    """
+
+    def __init__(self, path: str | Path, mode: ReplayMode = ReplayMode.instant):
+        self._entries: dict[str, deque[dict[str, Any]]] = {}
+        self._base_url: str = ""
+        self._mode: ReplayMode = mode
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], deque()).append(entry)
+                self._base_url = self._base_url or entry["base_url"]
+        super().__init__(None)
+
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    async def create(self, **kwargs):
+        key = request_fingerprint(self.base_url, kwargs)
+        entries = self._entries.get(key)
+        if not entries:
+            raise CassetteError(f"Request to {kwargs['model']} is not recorded: {key}")
+        entry = entries.popleft() if len(entries) > 1 else entries[0]
+
+        if kwargs.get("stream"):
+            return self._replay_stream(entry)
+
+        if self._mode == ReplayMode.realtime:
+            await asyncio.sleep(entry["latency"])
+        if "response" in entry:
+            return ChatCompletion.model_validate(entry["response"])
+        return completion_from_text(
+            entry["model"], "".join(text for _, text in entry["chunks"])
+        )
+
+    async def _replay_stream(self, entry: dict[str, Any]) -> AsyncIterator:
+        if "chunks" in entry:
+            chunks = entry["chunks"]
+        else:
+            message = entry["response"]["choices"][0]["message"]
+            chunks = [[entry["latency"], message["content"]]]
+
+        start = time.monotonic()
+        for offset, text in chunks:
+            if self._mode == ReplayMode.realtime:
+                await asyncio.sleep(max(0.0, offset - (time.monotonic() - start)))
+            yield chunk_from_text(entry["model"], text)
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from openai import AsyncOpenAI
+
+from src.core.clients.base_client import ClientWrapper, request_fingerprint
+from src.core.clients.deadline import request_deadline
+
+
+@dataclass
+class CoalescingStats:
+    """
+    Statistics of coalesced requests.
+    Parameters:
+    - sent - requests sent to the provider
+    - coalesced - requests answered by an identical request already in flight
+    """
+
+    sent: int = 0
+    coalesced: int = 0
+
+
+class RequestCoalescer:
+    """
+    Single-flight group of requests.
+    Concurrent requests with the same fingerprint share one call, which is
+    cancelled only when all requests waiting for it are cancelled. Requests
+    are shared only while in flight, nothing is kept after the answer.
+    The call runs without `request_deadline` of the request that started it,
+    every request waits for it within its own deadline and timeout.
+    One coalescer is shared by all pipelines by default, see `request_coalescer`.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[str, _Call] = {}
+        self.stats: CoalescingStats = CoalescingStats()
+
+    async def call(
+        self,
+        key: str,
+        send: Callable[[], Awaitable[Any]],
+        timeout: float | None = None,
+    ) -> Any:
+        """
+        Result of `send()` or of the call in flight with the same key.
+        Raises `TimeoutError` if it isn't received within `timeout`
+        or until `request_deadline` of the caller.
+        """
+        timeout = _time_left(timeout)
+        if timeout is not None and timeout <= 0:
+            raise TimeoutError("Deadline of the request is exceeded")
+        call = self._in_flight.get(key)
+        if call is None:
+            self.stats.sent += 1
+            context = contextvars.copy_context()
+            context.run(request_deadline.set, None)
+            call = _Call(asyncio.create_task(send(), context=context))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.stats.coalesced += 1
+            logging.debug(f"Request {key} is coalesced with the one in flight")
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: str, call: "_Call") -> None:
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+
+
+def _time_left(timeout: float | None) -> float | None:
+    """Seconds the caller can wait by its timeout and `request_deadline`."""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline - asyncio.get_running_loop().time()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class CoalescingClient(ClientWrapper):
+    """
+    Client sharing identical concurrent requests through a `RequestCoalescer`.
+    Requests are identical if their models, settings and normalized messages
+    are the same. All of them get the same completion object.
+    `timeout` of a request limits only its own wait for the shared call.
+    Streamed requests are sent as is.
+    """
+
+    def __init__(
+        self, client: AsyncOpenAI | ClientWrapper, coalescer: RequestCoalescer
+    ):
+        super().__init__(client)
+        self._coalescer: RequestCoalescer = coalescer
+
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return await self._client.chat.completions.create(**kwargs)
+        timeout = kwargs.pop("timeout", None)
+        key = request_fingerprint(self.base_url, kwargs)
+        return await self._coalescer.call(
+            key, lambda: self._client.chat.completions.create(**kwargs), timeout
+        )
+
+
+request_coalescer = RequestCoalescer()
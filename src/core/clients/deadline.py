@@ -0,0 +1,28 @@
+import asyncio
+from contextvars import ContextVar
+
+from src.core.clients.base_client import ClientWrapper
+
+request_deadline: ContextVar[float | None] = ContextVar(
+    "request_deadline", default=None
+)
+"""Event loop time when requests of the current agent must be finished."""
+
+
+class DeadlineClient(ClientWrapper):
+    """
+    Client passing time left until `request_deadline` as request timeout.
+    Requests after the deadline fail at once without reaching the provider.
+    """
+
+    async def create(self, **kwargs):
+        deadline = request_deadline.get()
+        if deadline is not None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise TimeoutError("Deadline of the request is exceeded")
+            timeout = kwargs.get("timeout")
+            kwargs["timeout"] = (
+                remaining if timeout is None else min(timeout, remaining)
+            )
+        return await self._client.chat.completions.create(**kwargs)
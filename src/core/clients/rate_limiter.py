@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable
+
+from openai import AsyncOpenAI, RateLimitError
+
+from src.core.clients.base_client import ClientWrapper, WrappedStream, estimate_tokens
+
+
+@dataclass
+class RateLimits:
+    """
+    Limits for one model of one client.
+    Parameters:
+    - requests_per_minute - max requests per minute, unlimited if None
+    - tokens_per_minute - max prompt and completion tokens per minute, unlimited if None
+    - max_in_flight - max simultaneous requests
+    - min_in_flight - concurrency never drops below this value on rate limiting
+    """
+
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+    max_in_flight: int = 16
+    min_in_flight: int = 1
+
+
+@dataclass
+class RateLimiterStats:
+    """
+    Statistics of one limiter.
+    Parameters:
+    - queue_depth - requests waiting for a slot right now
+    - in_flight - requests sent and not answered yet
+    - concurrency_limit - current adaptive limit of in-flight requests
+    - requests - total number of acquired slots
+    - rate_limited - number of 429 responses
+    - total_wait_time - total seconds requests spent in the queue
+    - max_wait_time - longest time one request spent in the queue
+    """
+
+    queue_depth: int = 0
+    in_flight: int = 0
+    concurrency_limit: float = 0.0
+    requests: int = 0
+    rate_limited: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+    @property
+    def average_wait_time(self) -> float:
+        return self.total_wait_time / self.requests if self.requests else 0.0
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: int | None):
+        self._rate: float | None = per_minute / 60 if per_minute else None
+        self._capacity: float = float(per_minute or 0)
+        self._tokens: float = self._capacity
+        self._updated: float = time.monotonic()
+
+    def delay(self, amount: int) -> float:
+        """Seconds to wait until `amount` can be consumed."""
+        if self._rate is None:
+            return 0.0
+        self._refill()
+        amount = min(amount, self._capacity)
+        return max(0.0, (amount - self._tokens) / self._rate)
+
+    def consume(self, amount: int) -> None:
+        if self._rate is not None:
+            self._tokens -= amount
+
+    def drain(self) -> None:
+        if self._rate is not None:
+            self._tokens = min(self._tokens, 0.0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+
+class _Limiter:
+    """Limiter of one model of one client."""
+
+    def __init__(self, limits: RateLimits):
+        self._limits: RateLimits = limits
+        self._requests: _TokenBucket = _TokenBucket(limits.requests_per_minute)
+        self._tokens: _TokenBucket = _TokenBucket(limits.tokens_per_minute)
+        self._paused_until: float = 0.0
+        self._queue: asyncio.Lock = asyncio.Lock()
+        self._released: asyncio.Event = asyncio.Event()
+        self.stats: RateLimiterStats = RateLimiterStats(
+            concurrency_limit=float(limits.max_in_flight)
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait for a slot. Requests are served in order of arrival."""
+        self.stats.queue_depth += 1
+        start = time.monotonic()
+        try:
+            async with self._queue:
+                while (delay := self._delay(tokens)) > 0:
+                    self._released.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._released.wait(),
+                            None if math.isinf(delay) else delay,
+                        )
+                    except TimeoutError:
+                        pass
+                self._requests.consume(1)
+                self._tokens.consume(tokens)
+                self.stats.in_flight += 1
+        finally:
+            self.stats.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.stats.requests += 1
+        self.stats.total_wait_time += waited
+        self.stats.max_wait_time = max(self.stats.max_wait_time, waited)
+
+    def release(self, reserved_tokens: int, used_tokens: int | None = None) -> None:
+        """Free slot. Correct token bucket by real usage if it is known."""
+        self.stats.in_flight -= 1
+        if used_tokens is not None:
+            self._tokens.consume(used_tokens - reserved_tokens)
+        self._released.set()
+
+    def on_success(self) -> None:
+        """Additive increase of concurrency."""
+        limit = self.stats.concurrency_limit
+        self.stats.concurrency_limit = min(
+            float(self._limits.max_in_flight), limit + 1 / max(limit, 1.0)
+        )
+
+    def on_rate_limited(self, retry_after: float | None) -> None:
+        """Multiplicative decrease of concurrency and pause until provider allows."""
+        self.stats.rate_limited += 1
+        self.stats.concurrency_limit = max(
+            float(self._limits.min_in_flight), self.stats.concurrency_limit / 2
+        )
+        self._requests.drain()
+        if retry_after is not None:
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + retry_after
+            )
+
+    def _delay(self, tokens: int) -> float:
+        if self.stats.in_flight >= max(1, int(self.stats.concurrency_limit)):
+            return math.inf
+        return max(
+            self._paused_until - time.monotonic(),
+            self._requests.delay(1),
+            self._tokens.delay(tokens),
+        )
+
+
+class RateLimiter:
+    """
+    Limiters for every model of every client.
+    One instance can be shared by several clients and pipelines.
+    Parameters:
+    - limits - limits by model name, e.g. `ModelName.gpt_4o.value`
+    - default_limits - limits for models not listed in `limits`
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, RateLimits] | None = None,
+        default_limits: RateLimits | None = None,
+    ):
+        self._limits: dict[str, RateLimits] = limits or {}
+        self._default_limits: RateLimits = default_limits or RateLimits()
+        self._limiters: dict[tuple[str, str], _Limiter] = {}
+
+    def limiter(self, base_url: str, model: str) -> _Limiter:
+        key = (base_url, model)
+        if key not in self._limiters:
+            self._limiters[key] = _Limiter(
+                self._limits.get(model, self._default_limits)
+            )
+        return self._limiters[key]
+
+    def stats(self) -> dict[tuple[str, str], RateLimiterStats]:
+        """Statistics by (base url, model)."""
+        return {key: limiter.stats for key, limiter in self._limiters.items()}
+
+
+class RateLimitedClient(ClientWrapper):
+    """
+    Client that limits requests per model and adapts concurrency to 429 responses.
+    Rate limited requests are queued again up to `max_rate_limit_retries` times,
+    so create the wrapped client with `max_retries=0` to keep retries in one place.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI | ClientWrapper,
+        rate_limiter: RateLimiter,
+        max_rate_limit_retries: int = 3,
+    ):
+        super().__init__(client)
+        self._rate_limiter: RateLimiter = rate_limiter
+        self._max_rate_limit_retries: int = max_rate_limit_retries
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    async def create(self, **kwargs):
+        limiter = self._rate_limiter.limiter(self.base_url, kwargs["model"])
+        tokens = estimate_tokens(kwargs["messages"]) + kwargs.get("max_tokens", 0)
+
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            try:
+                completion = await self._client.chat.completions.create(**kwargs)
+            except RateLimitError as error:
+                limiter.release(tokens)
+                limiter.on_rate_limited(_retry_after(error))
+                logging.warning(
+                    f"Rate limited by {self.base_url} for {kwargs['model']}, "
+                    f"concurrency limit is {limiter.stats.concurrency_limit:.1f}"
+                )
+                attempt += 1
+                if attempt > self._max_rate_limit_retries:
+                    raise
+                continue
+            except BaseException:
+                limiter.release(tokens)
+                raise
+
+            limiter.on_success()
+            if kwargs.get("stream"):
+                return _ReleasingStream(
+                    completion, _once(lambda: limiter.release(tokens))
+                )
+            usage = getattr(completion, "usage", None)
+            limiter.release(tokens, usage.total_tokens if usage else None)
+            return completion
+
+
+class _ReleasingStream(WrappedStream):
+    """
+    Stream of chunks that keeps the limiter slot until it is consumed or closed.
+    A stream dropped without both frees the slot when it is garbage collected.
+    """
+
+    def __init__(self, stream: AsyncIterator, release: Callable[[], None]):
+        super().__init__(stream, _release_after(stream, release))
+        self._release: Callable[[], None] = release
+
+    async def aclose(self) -> None:
+        try:
+            await super().aclose()
+        finally:
+            self._release()
+
+    def __del__(self) -> None:
+        self._release()
+
+
+async def _release_after(
+    stream: AsyncIterator, release: Callable[[], None]
+) -> AsyncIterator:
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        release()
+
+
+def _once(callback: Callable[[], None]) -> Callable[[], None]:
+    """Callback doing nothing after the first call."""
+    called = False
+
+    def call() -> None:
+        nonlocal called
+        if not called:
+            called = True
+            callback()
+
+    return call
+
+
+def _retry_after(error: RateLimitError) -> float | None:
+    """Seconds to wait from rate limit headers."""
+    headers = error.response.headers
+    for header, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        if header in headers:
+            try:
+                seconds = float(headers[header]) / scale
+            except ValueError:
+                continue
+            if math.isfinite(seconds) and seconds >= 0:
+                return seconds
+    for header in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if header in headers:
+            return _parse_duration(headers[header])
+    return None
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse durations like `1s`, `6m0s` or `250ms`."""
+    total = 0.0
+    number = ""
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == ".":
+            number += char
+        elif value.startswith("ms", i) and number:
+            total += float(number) / 1000
+            number = ""
+            i += 1
+        elif char in "hms" and number:
+            total += float(number) * {"h": 3600, "m": 60, "s": 1}[char]
+            number = ""
+        else:
+            return None
+        i += 1
+    return total if not number else None
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import openai
+from openai import AsyncOpenAI
+
+from src.core.agents.agent_typings import ModelName
+from src.core.clients.base_client import ClientWrapper
+
+# 429 responses are retried by `RateLimitedClient`, which also slows the model down
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+RETRYABLE_STATUSES = {408, 409}
+LATENCY_WINDOW = 1000
+
+
+@dataclass
+class RequestPolicyStats:
+    """
+    Statistics of requests sent with a policy.
+    Parameters:
+    - requests - number of requests
+    - retries - attempts repeated after retryable errors
+    - hedges - duplicate requests sent after the hedge delay
+    - hedge_wins - hedged requests answered by the duplicate first
+    - fallbacks - requests switched to the fallback model
+    - failures - requests failed after all attempts
+    - latencies - latencies of successful attempts of the recent requests,
+      without failed attempts and backoff delays
+    - model_latencies - the same latencies by models that answered,
+      hedge delays are quantiles of them
+    - primary_latencies - latencies of their first attempts, for attempts
+      cancelled by a winning duplicate it is the time until cancellation
+      unless the policy measures hedging
+    """
+
+    requests: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    fallbacks: int = 0
+    failures: int = 0
+    latencies: deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_WINDOW)
+    )
+    primary_latencies: deque[float] = field(
+        default_factory=lambda: deque(maxlen=LATENCY_WINDOW)
+    )
+    model_latencies: dict[str, deque[float]] = field(default_factory=dict)
+
+    def record_latency(self, model: str, latency: float) -> None:
+        self.latencies.append(latency)
+        self.model_latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(
+            latency
+        )
+
+    def tail_latency(self, quantile: float = 0.99) -> dict[str, float | None]:
+        """
+        Latency quantile with and without hedging.
+        Unless the policy measures hedging, first attempts cancelled by hedging
+        are counted with their time until cancellation, so `cut` is a lower bound.
+        """
+        hedged = _quantile(self.latencies, quantile)
+        primary = _quantile(self.primary_latencies, quantile)
+        return {
+            "hedged": hedged,
+            "primary": primary,
+            "cut": (
+                primary - hedged if hedged is not None and primary is not None else None
+            ),
+        }
+
+
+@dataclass
+class RequestPolicy:
+    """
+    How requests of AI agents are retried, hedged and redirected to another model.
+    One policy can be shared by many agents, its statistics are common.
+    Retries don't cover 429 responses, they are retried by `RateLimitedClient`.
+    Parameters:
+    - max_retries - attempts after the first one on retryable errors
+    - base_delay - delay before the first retry, doubled after each retry
+    - max_delay - max delay between retries, delays are random up to the limit
+    - hedge - send a duplicate of a slow request and take the first answer,
+      only for agents having the policy as their own `request_policy`,
+      a policy of the whole pipeline never hedges
+    - hedge_delay - seconds before the duplicate, `hedge_quantile` of recent
+      latencies of the model if None
+    - hedge_quantile - quantile of latencies used as the hedge delay
+    - hedge_min_samples - latencies needed before the quantile is used
+    - fallback_model - model for the remaining attempts after repeated failures
+    - fallback_after - failed attempts before switching to the fallback model
+    - measure_hedging - let first attempts beaten by duplicates finish in background
+      to measure exact tail latency cut, it costs their tokens
+    """
+
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    hedge: bool = False
+    hedge_delay: float | None = None
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    fallback_model: ModelName | None = None
+    fallback_after: int = 2
+    measure_hedging: bool = False
+    stats: RequestPolicyStats = field(default_factory=RequestPolicyStats, init=False)
+
+    def backoff(self, retry: int) -> float:
+        """Random delay before the retry with number `retry`, starting from 0."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+    def current_hedge_delay(self, model: str) -> float | None:
+        """Seconds before the duplicate request to the model, None if it isn't sent."""
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        latencies = self.stats.model_latencies.get(model, ())
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return _quantile(latencies, self.hedge_quantile)
+
+
+class PolicyClient(ClientWrapper):
+    """
+    Client sending requests by a `RequestPolicy`.
+    Streamed requests are retried only until the stream is opened
+    and are never hedged. Requests are hedged only with `hedge`.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI | ClientWrapper,
+        policy: RequestPolicy,
+        hedge: bool = True,
+    ):
+        super().__init__(client)
+        self._policy: RequestPolicy = policy
+        self._hedge: bool = hedge
+        self._measured: set[asyncio.Task] = set()
+
+    async def create(self, **kwargs):
+        policy, stats = self._policy, self._policy.stats
+        stats.requests += 1
+        failed_attempts = 0
+        while True:
+            try:
+                if kwargs.get("stream"):
+                    attempt_start = time.monotonic()
+                    result = await self._client.chat.completions.create(**kwargs)
+                    stats.record_latency(
+                        kwargs["model"], time.monotonic() - attempt_start
+                    )
+                else:
+                    result = await self._hedged(kwargs)
+            except Exception as error:
+                if not _is_retryable(error) or failed_attempts >= policy.max_retries:
+                    stats.failures += 1
+                    raise
+                failed_attempts += 1
+                stats.retries += 1
+                if (
+                    policy.fallback_model is not None
+                    and failed_attempts == policy.fallback_after
+                ):
+                    stats.fallbacks += 1
+                    logging.warning(
+                        f"Model {kwargs['model']} failed {failed_attempts} times, "
+                        f"falling back to {policy.fallback_model.value}"
+                    )
+                    kwargs = {**kwargs, "model": policy.fallback_model.value}
+                await asyncio.sleep(policy.backoff(failed_attempts - 1))
+                continue
+            return result
+
+    async def _hedged(self, kwargs: dict):
+        """
+        One attempt, duplicated if it is slower than the hedge delay.
+        Latency of a successful attempt is recorded from its start.
+        """
+        stats = self._policy.stats
+        attempt_start = time.monotonic()
+        primary = asyncio.create_task(self._client.chat.completions.create(**kwargs))
+        delay = (
+            self._policy.current_hedge_delay(kwargs["model"]) if self._hedge else None
+        )
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                stats.hedges += 1
+                duplicate = asyncio.create_task(
+                    self._client.chat.completions.create(**kwargs)
+                )
+                try:
+                    done, _ = await asyncio.wait(
+                        {primary, duplicate}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    winner = duplicate if primary not in done else primary
+                    if winner.exception() is not None:
+                        other = primary if winner is duplicate else duplicate
+                        await asyncio.wait({other})
+                        if other.exception() is None:
+                            winner = other
+                    if winner is duplicate:
+                        result = duplicate.result()
+                        stats.hedge_wins += 1
+                        stats.record_latency(
+                            kwargs["model"], time.monotonic() - attempt_start
+                        )
+                        if self._policy.measure_hedging and not primary.done():
+                            self._measured.add(primary)
+                            primary.add_done_callback(self._measured.discard)
+                            primary.add_done_callback(
+                                lambda task: _record_latency(task, attempt_start, stats)
+                            )
+                            primary = None
+                        else:
+                            stats.primary_latencies.append(
+                                time.monotonic() - attempt_start
+                            )
+                        return result
+                finally:
+                    _discard(duplicate)
+            result = primary.result()
+            latency = time.monotonic() - attempt_start
+            stats.record_latency(kwargs["model"], latency)
+            stats.primary_latencies.append(latency)
+            return result
+        finally:
+            if primary is not None:
+                _discard(primary)
+
+
+def _record_latency(
+    task: asyncio.Task, start: float, stats: RequestPolicyStats
+) -> None:
+    if not task.cancelled() and task.exception() is None:
+        stats.primary_latencies.append(time.monotonic() - start)
+
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancel the task and retrieve its exception so it isn't reported."""
+    task.cancel()
+    if task.done() and not task.cancelled():
+        task.exception()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return (
+        isinstance(error, openai.APIStatusError)
+        and error.status_code in RETRYABLE_STATUSES
+    )
+
+
+def _quantile(values: deque[float], quantile: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
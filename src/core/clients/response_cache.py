@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from src.core.clients.base_client import (
+    ClientWrapper,
+    WrappedStream,
+    completion_from_text,
+    request_fingerprint,
+    stream_from_texts,
+)
+
+
+class CachePolicy(Enum):
+    """
+    When agent answers are taken from the cache.
+    Variants:
+    - disabled - never
+    - deterministic - only when temperature is 0
+    - enabled - always, answers of repeated requests are reused
+    """
+
+    disabled = "disabled"
+    deterministic = "deterministic"
+    enabled = "enabled"
+
+
+class CacheStorage:
+    """Storage tier of the response cache."""
+
+    blocking: bool = True
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        """Get value or None if it is missing or expired."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Set value, evicting other values if needed."""
+        raise NotImplementedError
+
+
+class MemoryStorage(CacheStorage):
+    """In-memory storage evicting least recently used values."""
+
+    blocking: bool = False
+
+    def __init__(self, max_entries: int = 1024):
+        self._max_entries: int = max_entries
+        self._values: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        value = self._values.get(key)
+        if value is not None:
+            self._values.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self._max_entries:
+            self._values.popitem(last=False)
+
+
+class SQLiteStorage(CacheStorage):
+    """
+    On-disk storage in one SQLite file.
+    Values older than `ttl` seconds expire, least recently used values
+    are evicted when the total size exceeds `max_size` bytes.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_size: int = 512 * 1024 * 1024,
+        ttl: float | None = None,
+    ):
+        os.makedirs(Path(path).parent, exist_ok=True)
+        self._max_size: int = max_size
+        self._ttl: float | None = ttl
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._ttl is not None and now - row[1] > self._ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self._ttl is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self._ttl,)
+            )
+        total_size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total_size <= self._max_size:
+            return
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self._max_size:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+
+@dataclass
+class CacheStats:
+    """
+    Statistics of the response cache.
+    Parameters:
+    - hits - requests answered from the cache
+    - misses - requests sent to the provider and cached
+    - bypassed - requests not cached by agent policy
+    """
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of completions.
+    Storages are checked in order, values found in a later storage
+    are copied to the earlier ones.
+    """
+
+    def __init__(self, *storages: CacheStorage):
+        self._storages: tuple[CacheStorage, ...] = storages or (MemoryStorage(),)
+        self.stats: CacheStats = CacheStats()
+
+    async def get(self, key: str) -> ChatCompletion | None:
+        for i, storage in enumerate(self._storages):
+            value = await self._call(storage.get, key)
+            if value is not None:
+                for earlier in self._storages[:i]:
+                    await self._call(earlier.set, key, value)
+                return ChatCompletion.model_validate_json(value)
+        return None
+
+    async def set(self, key: str, completion: ChatCompletion) -> None:
+        value = completion.model_dump_json()
+        for storage in self._storages:
+            await self._call(storage.set, key, value)
+
+    @staticmethod
+    async def _call(method: Callable, *args) -> Any:
+        """Blocking storages are called in a thread."""
+        if method.__self__.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+
+class CachingClient(ClientWrapper):
+    """
+    Client that answers repeated requests from the response cache.
+    Streamed answers are cached too and replayed as a one-chunk stream.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI | ClientWrapper,
+        cache: ResponseCache,
+        policy: CachePolicy = CachePolicy.deterministic,
+    ):
+        super().__init__(client)
+        self._cache: ResponseCache = cache
+        self._policy: CachePolicy = policy
+
+    async def create(self, **kwargs):
+        if not self._is_cacheable(kwargs):
+            self._cache.stats.bypassed += 1
+            return await self._client.chat.completions.create(**kwargs)
+
+        key = request_fingerprint(self.base_url, kwargs)
+        completion = await self._cache.get(key)
+        if completion is not None:
+            self._cache.stats.hits += 1
+            logging.debug(f"Cache hit for {kwargs['model']}: {key}")
+            if kwargs.get("stream"):
+                return stream_from_texts(
+                    kwargs["model"], [completion.choices[0].message.content]
+                )
+            return completion
+
+        self._cache.stats.misses += 1
+        result = await self._client.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return WrappedStream(
+                result, self._cache_stream(key, kwargs["model"], result)
+            )
+        await self._cache.set(key, result)
+        return result
+
+    async def _cache_stream(
+        self, key: str, model: str, stream: AsyncIterator
+    ) -> AsyncIterator:
+        parts = []
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        await self._cache.set(key, completion_from_text(model, "".join(parts)))
+
+    def _is_cacheable(self, kwargs: dict) -> bool:
+        if self._policy == CachePolicy.enabled:
+            return True
+        if self._policy == CachePolicy.deterministic:
+            return kwargs.get("temperature", 1.0) == 0
+        return False
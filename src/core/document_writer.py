@@ -0,0 +1,169 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+
+class PendingWrites:
+    """
+    Writes scheduled while the group is set to `pending_writes`,
+    e.g. by one pipeline run, waited for by `DocumentWriter.drain`.
+    """
+
+    def __init__(self):
+        self.paths: set[Path] = set()
+        self.errors: list[Exception] = []
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+pending_writes: ContextVar[PendingWrites | None] = ContextVar(
+    "pending_writes", default=None
+)
+"""Group of writes scheduled in the current context."""
+
+
+class DocumentWriter:
+    """
+    Write-behind persistence of documents.
+    Files are written by a thread pool, so the event loop never waits for disk.
+    While a path waits to be written only its latest content is kept, and
+    writes of one path never overlap, so the file always ends with the latest
+    version. Rewritten files are replaced atomically, readers never see a partial
+    file. Appends to a pending path are merged with its pending content.
+    Writes scheduled while `pending_writes` is set are tracked in its group,
+    so one pipeline waits only for its own files.
+    Parameters:
+    - max_workers - number of writing threads
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="document-writer"
+        )
+        self._condition: threading.Condition = threading.Condition()
+        self._pending: dict[Path, tuple[str, str]] = {}
+        self._writing: set[Path] = set()
+        self._groups: dict[Path, set[PendingWrites]] = {}
+        self._errors: list[Exception] = []
+        self.written: int = 0
+        self.coalesced: int = 0
+
+    def submit(self, path: Path, content: str) -> None:
+        """Schedule writing of `content` to `path`."""
+        self._schedule(path, "w", content)
+
+    def append(self, path: Path, text: str) -> None:
+        """Schedule appending of `text` to `path`."""
+        self._schedule(path, "a", text)
+
+    def _schedule(self, path: Path, mode: str, content: str) -> None:
+        group = pending_writes.get()
+        with self._condition:
+            if group is not None:
+                group.paths.add(path)
+                self._groups.setdefault(path, set()).add(group)
+            pending = self._pending.get(path)
+            if pending is not None:
+                self.coalesced += 1
+                if mode == "a":
+                    mode, content = pending[0], pending[1] + content
+            busy = pending is not None or path in self._writing
+            self._pending[path] = (mode, content)
+        if not busy:
+            self._executor.submit(self._write, path)
+
+    def flush(self) -> None:
+        """
+        Wait until all scheduled files are written.
+        Raises the first error of writes not tracked by `pending_writes`.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._pending and not self._writing)
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    async def drain(self, group: PendingWrites) -> None:
+        """
+        Wait until files of the group are written without blocking the event loop.
+        Raises the first write error of the group.
+        """
+        with self._condition:
+            if group.paths:
+                future = asyncio.get_running_loop().create_future()
+                group._waiters.append((asyncio.get_running_loop(), future))
+            else:
+                future = None
+        if future is not None:
+            await future
+        with self._condition:
+            errors, group.errors = group.errors, []
+        if errors:
+            raise errors[0]
+
+    def _write(self, path: Path) -> None:
+        finished = False
+        try:
+            while True:
+                with self._condition:
+                    pending = self._pending.pop(path, None)
+                    if pending is None:
+                        self._finish(path)
+                        finished = True
+                        return
+                    self._writing.add(path)
+                try:
+                    os.makedirs(path.parent, exist_ok=True)
+                    mode, content = pending
+                    if mode == "a":
+                        with path.open("a", encoding="utf-8") as file:
+                            file.write(content)
+                    else:
+                        temporary = path.with_name(f".{path.name}.tmp")
+                        with temporary.open("w", encoding="utf-8") as file:
+                            file.write(content)
+                        os.replace(temporary, path)
+                except Exception as error:
+                    logging.exception(f"Failed to write {path}")
+                    with self._condition:
+                        groups = self._groups.get(path)
+                        if not groups:
+                            self._errors.append(error)
+                        for group in groups or ():
+                            group.errors.append(error)
+                else:
+                    with self._condition:
+                        self.written += 1
+        finally:
+            if not finished:
+                with self._condition:
+                    self._pending.pop(path, None)
+                    self._finish(path)
+
+    def _finish(self, path: Path) -> None:
+        """Mark the path written, called with `_condition` held."""
+        self._writing.discard(path)
+        for group in self._groups.pop(path, ()):
+            group.paths.discard(path)
+            if group.paths:
+                continue
+            waiters, group._waiters = group._waiters, []
+            for loop, future in waiters:
+                try:
+                    loop.call_soon_threadsafe(_resolve, future)
+                except RuntimeError:
+                    pass
+        self._condition.notify_all()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+document_writer = DocumentWriter()
+atexit.register(document_writer.flush)
@@ -0,0 +1,101 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable
+
+
+class ExecutionMode(Enum):
+    """
+    Where hard-coded logic of agents is executed.
+    Variants:
+    - inline - on the event loop, suits fast logic
+    - thread - in the shared thread pool, suits logic releasing the GIL, e.g. IO
+    - process - in the shared process pool, suits CPU-heavy logic,
+      the logic, its input and result must be picklable
+    """
+
+    inline = "inline"
+    thread = "thread"
+    process = "process"
+
+
+class Executors:
+    """
+    Pools shared by all pipelines of the process, created on first use.
+    Processes are spawned, so logic run in them must be importable by reference,
+    e.g. a module-level function, not a lambda or a closure.
+    Parameters:
+    - max_threads - size of the thread pool, default of `ThreadPoolExecutor` if None
+    - max_processes - size of the process pool, number of CPUs if None
+    """
+
+    def __init__(
+        self, max_threads: int | None = None, max_processes: int | None = None
+    ):
+        self._max_threads: int | None = max_threads
+        self._max_processes: int | None = max_processes
+        self._lock: threading.Lock = threading.Lock()
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+
+    def configure(
+        self, max_threads: int | None = None, max_processes: int | None = None
+    ) -> None:
+        """Resize pools. Running pools finish their queued tasks and are replaced."""
+        self.shutdown(wait=False, cancel_futures=False)
+        with self._lock:
+            self._max_threads = max_threads
+            self._max_processes = max_processes
+
+    async def run(self, mode: ExecutionMode, function: Callable, *args: Any) -> Any:
+        """
+        Result of `function(*args)` executed in `mode`.
+        Cancellation doesn't interrupt a function already running in a pool.
+        """
+        if mode == ExecutionMode.inline:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(mode), function, *args)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool | None = None) -> None:
+        """
+        Shut pools down, queued tasks are cancelled by default
+        if the shutdown doesn't wait for them.
+        """
+        cancel_futures = not wait if cancel_futures is None else cancel_futures
+        with self._lock:
+            pools = [self._threads, self._processes]
+            self._threads = self._processes = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _executor(self, mode: ExecutionMode) -> Executor:
+        with self._lock:
+            if mode == ExecutionMode.thread:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(
+                        max_workers=self._max_threads,
+                        thread_name_prefix="hard-code-agent",
+                    )
+                return self._threads
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self._max_processes or os.cpu_count(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._processes
+
+
+def check_picklable(function: Callable) -> None:
+    """Raises an error if the function can't be sent to a process of the pool."""
+    pickle.loads(pickle.dumps(function))
+
+
+executors = Executors()
+atexit.register(executors.shutdown)
@@ -1,4 +1,10 @@
 import asyncio
+import heapq
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from typing import Callable
 
 from openai import AsyncOpenAI
 
@@ -9,12 +15,159 @@ from src.core.agents.agent_parameters import (
     CriticAgentParameters,
     HardCodeAgentParameters,
 )
-from src.core.agents.agent_typings import DocumentsStore
+from src.core.agents.agent_typings import Document, DocumentName, DocumentsStore
 from src.core.agents.agent_types.ai_agent import AIAgent
 from src.core.agents.base_agent import BaseAgent
 from src.core.agents.agent_types.chat_agent import ChatAgent
 from src.core.agents.agent_types.critic_agent import CriticAgent
 from src.core.agents.agent_types.hard_code_agent import HardCodeAgent
+from src.core.checkpoint import (
+    AgentCheckpoint,
+    AgentStatus,
+    Checkpoint,
+    CheckpointStore,
+    dump_documents,
+    fingerprint,
+    load_documents,
+)
+from src.core.clients.base_client import TokenCountingClient
+from src.core.clients.coalescing import (
+    CoalescingClient,
+    RequestCoalescer,
+    request_coalescer,
+)
+from src.core.clients.deadline import DeadlineClient, request_deadline
+from src.core.clients.request_policy import PolicyClient, RequestPolicy
+from src.core.clients.response_cache import CachingClient, ResponseCache
+from src.core.document_writer import PendingWrites, document_writer, pending_writes
+from src.core.executors import ExecutionMode, check_picklable
+from src.core.pipeline_graph import PipelineCompilationError, PipelineGraph
+
+
+class PipelineRunError(RuntimeError):
+    """
+    Some agents failed in a pipeline run without `fail_fast`.
+    Parameters:
+    - failures - exceptions of the failed agents
+    - skipped - agents not run because they depend on the failed ones
+    """
+
+    def __init__(self, failures: dict[str, BaseException], skipped: set[str]):
+        super().__init__(
+            f"Agents failed: {', '.join(failures)}; "
+            f"skipped: {', '.join(sorted(skipped)) or 'none'}"
+        )
+        self.failures: dict[str, BaseException] = failures
+        self.skipped: set[str] = skipped
+
+
+@dataclass
+class AgentRunStats:
+    """
+    Timings of one agent in the last run, seconds from the run start.
+    Parameters:
+    - ready_at - all dependencies of the agent are finished
+    - started_at - agent got a concurrency slot and started
+    - finished_at - agent finished
+    - reused - agent result was taken from the checkpoint of a previous run
+    """
+
+    ready_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    reused: bool = False
+
+    @property
+    def wait_time(self) -> float:
+        """Time spent waiting for dependencies and a concurrency slot."""
+        return self.started_at if self.started_at is not None else 0.0
+
+    @property
+    def work_time(self) -> float:
+        """Time spent running."""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class AgentEventKind(Enum):
+    """
+    Kind of an agent event.
+    Variants:
+    - started - agent got a concurrency slot and started
+    - reused - agent result was taken from the checkpoint
+    - finished - agent finished
+    - failed - agent raised an exception
+    """
+
+    started = "started"
+    reused = "reused"
+    finished = "finished"
+    failed = "failed"
+
+
+@dataclass
+class AgentEvent:
+    """
+    Change of an agent state in a run.
+    Parameters:
+    - name - name of the agent
+    - kind - kind of the change
+    - time - seconds from the run start
+    """
+
+    name: str
+    kind: AgentEventKind
+    time: float
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Statistics of speculative runs of agents waiting for critics.
+    Parameters:
+    - hits - speculative results committed
+    - misses - speculative results discarded because the draft was revised
+    - restarts - speculative runs restarted on a revised draft
+    - wasted_tokens - tokens spent by discarded and restarted runs
+    """
+
+    hits: int = 0
+    misses: int = 0
+    restarts: int = 0
+    wasted_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Speculation:
+    """
+    Speculative run of an agent on drafts of the criticized documents.
+    Parameters:
+    - inputs - input documents of the agent
+    - snapshot - contents of the inputs the current run works on
+    - driver - task restarting the run when inputs are revised
+    - task - current run of the speculative agent
+    - agent - speculative agent working on a copy of the documents store
+    - client - client of the speculative agent counting its tokens,
+      None for hard-coded agents
+    """
+
+    inputs: list[DocumentName]
+    snapshot: dict[DocumentName, str] = field(default_factory=dict)
+    driver: asyncio.Task | None = None
+    task: asyncio.Task | None = None
+    agent: BaseAgent | None = None
+    client: TokenCountingClient | None = None
+
+    @property
+    def tokens(self) -> int:
+        """Tokens spent by the current run."""
+        return self.client.tokens if self.client is not None else 0
 
 
 class Pipeline:
@@ -22,56 +175,603 @@ class Pipeline:
         self,
         documents_store: DocumentsStore,
         client: AsyncOpenAI,
+        max_concurrency: int | None = None,
+        response_cache: ResponseCache | None = None,
+        request_policy: RequestPolicy | None = None,
+        coalescer: RequestCoalescer | None = None,
+        checkpoint_store: CheckpointStore | None = None,
+        speculative: bool = False,
+        timeout: float | None = None,
+        fail_fast: bool = True,
         **agents: AgentParameters,
     ):
-        """Pipeline to run sequence of agents."""
+        """
+        Pipeline to run graph of agents.
+        Agents are compiled into a graph by their documents and launched
+        as soon as all their dependencies are finished. Documents no agent
+        produces are inputs of the pipeline: they may be put into `documents_store`,
+        passed to `run` or restored from the checkpoint of the run.
+        At most `max_concurrency` agents run at once if it is set,
+        agents on the critical path get free slots first.
+        With `response_cache` AI agents reuse answers by their `cache_policy`.
+        Requests of AI agents are sent by their `request_policy`,
+        `request_policy` of the pipeline is used for agents without it,
+        but without hedging, agents opt in to it with their own policy.
+        Identical concurrent requests of agents with `coalesce` share one call
+        through `coalescer`, which is common for all pipelines by default.
+        With `checkpoint_store` every run is checkpointed after each finished agent
+        and can be continued incrementally.
+        With `speculative` AI and hard-coded agents waiting only for a critic
+        start on the current draft while the critic loop runs. The result is
+        committed if the draft is accepted and the run is restarted if it is revised.
+        Run takes at most `timeout` seconds and every agent at most its own
+        `timeout`, time left is passed to LLM requests as their timeout.
+        With `fail_fast` the first failure cancels the run, otherwise agents
+        not depending on the failed ones are finished first.
+        Hard-coded logic run in the process pool is checked to be picklable
+        when the pipeline is created.
+        """
         self._documents_store = documents_store
-        self._client = client
+        self._client = DeadlineClient(client)
+        self._max_concurrency = max_concurrency
+        self._response_cache = response_cache
+        self._request_policy = request_policy
+        self._coalescer = coalescer or request_coalescer
+        self._checkpoint_store = checkpoint_store
+        self._speculative = speculative
+        self._timeout = timeout
+        self._fail_fast = fail_fast
+        self._parameters: dict[str, AgentParameters] = agents
         self._agents = {}
+        self._stats: dict[str, AgentRunStats] = {}
+        self._speculation_stats: SpeculationStats = SpeculationStats()
+        self._run_id: str | None = None
+        self._listeners: list[Callable[[AgentEvent], None]] = []
 
         for name, agent_parameters in agents.items():
             self._agents[name] = self._create_agent(name, agent_parameters)
 
-    async def run(self) -> DocumentsStore:
-        """Run pipeline."""
-        await asyncio.gather(*[agent.run() for agent in self._agents.values()])
+        self._graph = PipelineGraph.compile(self._agents)
+        self._check_execution_modes()
+
+    @property
+    def graph(self) -> PipelineGraph:
+        """Compiled graph of agents."""
+        return self._graph
+
+    def subscribe(self, listener: Callable[[AgentEvent], None]) -> None:
+        """Call `listener` with every agent event of the runs."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[AgentEvent], None]) -> None:
+        self._listeners.remove(listener)
+
+    @property
+    def documents_store(self) -> DocumentsStore:
+        """Store of the pipeline documents."""
         return self._documents_store
 
-    def _create_agent(self, name: str, agent_parameters: AgentParameters) -> BaseAgent:
-        """Create agent by its parameters."""
+    @property
+    def stats(self) -> dict[str, AgentRunStats]:
+        """Timings of agents in the last run."""
+        return self._stats
+
+    @property
+    def speculation_stats(self) -> SpeculationStats:
+        """Speculation statistics of the last run."""
+        return self._speculation_stats
+
+    @property
+    def run_id(self) -> str | None:
+        """Identifier of the last run."""
+        return self._run_id
+
+    async def run(
+        self,
+        run_id: str | None = None,
+        documents: dict[DocumentName, Document] | None = None,
+        timeout: float | None = None,
+    ) -> DocumentsStore:
+        """
+        Run pipeline.
+        Run with `run_id` of a checkpointed run is incremental: agents with
+        the same fingerprint, i.e. configuration and consumed documents, are
+        reused with their documents and states, other agents run again.
+        `documents` replace documents of the previous run, e.g. edited by a user,
+        so only agents depending on them run again.
+        `timeout` replaces the timeout of the pipeline for this run.
+        Without `fail_fast` failures are raised as `PipelineRunError`
+        after all other agents finish.
+        Raises `PipelineCompilationError` before any agent starts
+        if some input of the pipeline isn't supplied.
+        """
+        start = time.monotonic()
+        timeout = timeout if timeout is not None else self._timeout
+        self._stats = {}
+        self._speculation_stats = SpeculationStats()
+        self._run_id = run_id or uuid.uuid4().hex
+        overrides = documents or {}
+        checkpoint = await self._restore_checkpoint(self._run_id, overrides)
+        self._graph.check_inputs(self._documents_store.documents)
+        reusable = dict(checkpoint.agents)
+        remaining = {
+            name: len(node.dependencies) for name, node in self._graph.nodes.items()
+        }
+        ready = [
+            (self._graph.sort_key(name), name)
+            for name, count in remaining.items()
+            if count == 0
+        ]
+        heapq.heapify(ready)
+        for _, name in ready:
+            self._stats[name] = AgentRunStats(ready_at=0.0)
+        running: dict[asyncio.Task, str] = {}
+        fingerprints: dict[str, str] = {}
+        finished: set[str] = set()
+        failures: dict[str, BaseException] = {}
+        speculations: dict[str, _Speculation] = {}
+
+        def finish(name: str) -> None:
+            finished.add(name)
+            for dependent in self._graph.nodes[name].dependents:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    self._stats[dependent] = AgentRunStats(
+                        ready_at=time.monotonic() - start
+                    )
+                    heapq.heappush(ready, (self._graph.sort_key(dependent), dependent))
+                speculate(dependent)
+
+        def speculate(name: str) -> None:
+            if not self._speculative or name in speculations or remaining[name] != 1:
+                return
+            (blocker,) = self._graph.nodes[name].dependencies - finished
+            if blocker in running.values() and self._can_speculate(name, blocker):
+                speculations[name] = self._start_speculation(name)
+
+        deadline = request_deadline.set(
+            asyncio.get_running_loop().time() + timeout if timeout is not None else None
+        )
+        writes = PendingWrites()
+        tracking = pending_writes.set(writes)
+        scope = asyncio.timeout(timeout)
+        try:
+            async with scope:
+                while ready or running:
+                    while ready and (
+                        self._max_concurrency is None
+                        or len(running) < self._max_concurrency
+                    ):
+                        _, name = heapq.heappop(ready)
+                        self._stats[name].started_at = time.monotonic() - start
+                        fingerprints[name] = self._fingerprint(name)
+                        previous = reusable.get(name)
+                        speculation = speculations.pop(name, None)
+                        if (
+                            previous is not None
+                            and previous.status == AgentStatus.completed
+                            and previous.fingerprint == fingerprints[name]
+                        ):
+                            if speculation is not None:
+                                self._discard_speculation(speculation)
+                            self._reuse(previous, overrides)
+                            self._stats[name].finished_at = self._stats[name].started_at
+                            self._stats[name].reused = True
+                            self._emit(name, AgentEventKind.reused, start)
+                            await self._save_checkpoint(
+                                checkpoint,
+                                name,
+                                fingerprints[name],
+                                AgentStatus.completed,
+                            )
+                            finish(name)
+                            continue
+                        task = None
+                        if speculation is not None:
+                            task = self._commit_speculation(name, speculation)
+                        if task is None:
+                            task = asyncio.create_task(
+                                self._run_agent(name, self._agents[name]), name=name
+                            )
+                        running[task] = name
+                        self._emit(name, AgentEventKind.started, start)
+                        for dependent in self._graph.nodes[name].dependents:
+                            speculate(dependent)
+
+                    if not running:
+                        continue
+                    done, _ = await asyncio.wait(
+                        running, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        name = running.pop(task)
+                        error = task.exception()
+                        if error is not None:
+                            await self._save_checkpoint(
+                                checkpoint, name, fingerprints[name], AgentStatus.failed
+                            )
+                            failures[name] = error
+                            self._emit(name, AgentEventKind.failed, start)
+                            for dependent in self._graph.descendants(name):
+                                if dependent in speculations:
+                                    self._discard_speculation(
+                                        speculations.pop(dependent)
+                                    )
+                            if self._fail_fast:
+                                task.result()
+                            continue
+                        self._stats[name].finished_at = time.monotonic() - start
+                        self._emit(name, AgentEventKind.finished, start)
+                        self._apply_overrides(name, overrides)
+                        await self._save_checkpoint(
+                            checkpoint, name, fingerprints[name], AgentStatus.completed
+                        )
+                        finish(name)
+            if failures:
+                skipped = set().union(
+                    *(self._graph.descendants(name) for name in failures)
+                )
+                raise PipelineRunError(failures, skipped)
+        except TimeoutError as error:
+            if scope.expired():
+                raise TimeoutError(
+                    f"Pipeline run '{self._run_id}' exceeded timeout of {timeout} s"
+                ) from error
+            raise
+        finally:
+            request_deadline.reset(deadline)
+            pending_writes.reset(tracking)
+            for speculation in speculations.values():
+                self._discard_speculation(speculation)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(
+                *running,
+                *(speculation.driver for speculation in speculations.values()),
+                return_exceptions=True,
+            )
+            await document_writer.drain(writes)
+
+        return self._documents_store
+
+    def _emit(self, name: str, kind: AgentEventKind, start: float) -> None:
+        event = AgentEvent(name, kind, time.monotonic() - start)
+        for listener in self._listeners:
+            listener(event)
+
+    async def _run_agent(self, name: str, agent: BaseAgent) -> None:
+        """Run the agent within its timeout and the deadline of the run."""
+        timeout = self._parameters[name].timeout
+        if timeout is not None:
+            deadline = asyncio.get_running_loop().time() + timeout
+            current = request_deadline.get()
+            request_deadline.set(
+                deadline if current is None else min(current, deadline)
+            )
+        scope = asyncio.timeout(timeout)
+        try:
+            async with scope:
+                await agent.run()
+        except TimeoutError as error:
+            if scope.expired():
+                raise TimeoutError(
+                    f"Agent '{name}' exceeded timeout of {timeout} s"
+                ) from error
+            raise
+
+    def _check_execution_modes(self) -> None:
+        """
+        Raises `PipelineCompilationError` if hard-coded logic run in the process pool
+        can't be sent to it.
+        """
+        for name, parameters in self._parameters.items():
+            if (
+                not isinstance(parameters, HardCodeAgentParameters)
+                or parameters.execution_mode != ExecutionMode.process
+            ):
+                continue
+            try:
+                check_picklable(parameters.hard_code_logic)
+            except Exception as error:
+                raise PipelineCompilationError(
+                    f"Logic of agent '{name}' can't be run in a process pool, "
+                    f"use a module-level function: {error}"
+                ) from error
+
+    def _can_speculate(self, name: str, blocker: str) -> bool:
+        """
+        Whether the agent can start before its last dependency finishes.
+        Only AI and hard-coded agents waiting for a critic are speculated,
+        and only if they don't read documents of the critic.
+        """
+        agent = self._agents[name]
+        return (
+            isinstance(self._agents[blocker], CriticAgent)
+            and isinstance(agent, (AIAgent, HardCodeAgent))
+            and not isinstance(agent, (ChatAgent, CriticAgent))
+            and not (
+                agent.input_document_names
+                & self._graph.nodes[blocker].produced_documents
+            )
+        )
+
+    def _start_speculation(self, name: str) -> _Speculation:
+        speculation = _Speculation(
+            inputs=sorted(self._agents[name].input_document_names)
+        )
+        speculation.driver = asyncio.create_task(
+            self._speculate(name, speculation), name=f"{name} (speculation)"
+        )
+        return speculation
+
+    async def _speculate(self, name: str, speculation: _Speculation) -> None:
+        """Run the agent on current drafts, restart it whenever they are revised."""
+        parameters = replace(
+            self._parameters[name],
+            logging_info=(None, None),
+            output_document_filename=None,
+        )
+        while True:
+            documents = self._documents_store.documents
+            speculation.snapshot = {
+                document_name: documents[document_name].content
+                for document_name in speculation.inputs
+            }
+            placeholders = {
+                document_name: Document(document_name, "")
+                for document_name in self._graph.nodes[name].consumed_documents
+                if not self._documents_store.contains([document_name])
+            }
+            speculation.client = (
+                TokenCountingClient(self._agent_client(parameters))
+                if isinstance(parameters, AIAgentParameters)
+                else None
+            )
+            speculation.agent = self._create_agent(
+                name,
+                parameters,
+                DocumentsStore({**documents, **placeholders}),
+                speculation.client,
+            )
+            speculation.task = asyncio.create_task(
+                self._run_agent(name, speculation.agent), name=f"{name} (speculative)"
+            )
+            await self._documents_store.wait_for_update(speculation.inputs)
+            self._speculation_stats.restarts += 1
+            self._speculation_stats.wasted_tokens += speculation.tokens
+            _discard(speculation.task)
+
+    def _commit_speculation(
+        self, name: str, speculation: _Speculation
+    ) -> asyncio.Task | None:
+        """
+        Task finishing the agent with the speculative result if its drafts
+        were accepted, None if the result is discarded or the speculative run
+        hasn't started yet.
+        """
+        speculation.driver.cancel()
+        if speculation.task is None:
+            return None
+        documents = self._documents_store.documents
+        accepted = all(
+            documents[document_name].content == content
+            for document_name, content in speculation.snapshot.items()
+        )
+        task = speculation.task
+        failed = task.done() and (task.cancelled() or task.exception() is not None)
+        if not accepted or failed:
+            self._discard_speculation(speculation)
+            return None
+
+        self._speculation_stats.hits += 1
+
+        async def commit() -> None:
+            await task
+            agent = self._agents[name]
+            agent.set_state(speculation.agent.get_state())
+            agent.save_documents()
+
+        return asyncio.create_task(commit(), name=name)
+
+    def _discard_speculation(self, speculation: _Speculation) -> None:
+        speculation.driver.cancel()
+        if speculation.task is not None:
+            self._speculation_stats.misses += 1
+            _discard(speculation.task)
+            self._speculation_stats.wasted_tokens += speculation.tokens
+
+    async def _restore_checkpoint(
+        self, run_id: str, overrides: dict[DocumentName, Document]
+    ) -> Checkpoint:
+        """
+        Load checkpoint of the run and restore initial documents from it.
+        Overrides of initial documents are applied at once.
+        """
+        checkpoint = None
+        if self._checkpoint_store is not None:
+            checkpoint = await asyncio.to_thread(self._checkpoint_store.load, run_id)
+        if checkpoint is None:
+            checkpoint = Checkpoint(run_id)
+
+        produced = {
+            document_name
+            for node in self._graph.nodes.values()
+            for document_name in node.produced_documents
+        }
+        documents = self._documents_store.documents
+        self._documents_store.update(
+            {
+                **{
+                    name: document
+                    for name, document in load_documents(checkpoint.documents).items()
+                    if name not in documents
+                },
+                **{
+                    name: document
+                    for name, document in overrides.items()
+                    if name not in produced
+                },
+            }
+        )
+        checkpoint.documents = dump_documents(
+            document
+            for name, document in documents.items()
+            if name not in produced and document.complete
+        )
+        return checkpoint
+
+    def _fingerprint(self, name: str) -> str:
+        """Fingerprint of the agent by its configuration and consumed documents."""
+        consumed = sorted(self._graph.nodes[name].consumed_documents)
+        documents = self._documents_store.documents
+        return fingerprint(
+            self._agents[name].get_configuration(),
+            [documents[document] for document in consumed if document in documents],
+        )
+
+    def _changed_agents(self, name: str) -> list[BaseAgent]:
+        """Agents whose state and documents are changed by the agent."""
+        agent = self._agents[name]
+        if isinstance(agent, CriticAgent):
+            return [agent, agent.criticized_agent]
+        return [agent]
+
+    def _reuse(
+        self,
+        agent_checkpoint: AgentCheckpoint,
+        overrides: dict[DocumentName, Document],
+    ) -> None:
+        """Restore states and documents of agents from the checkpoint."""
+        for name, state in agent_checkpoint.states.items():
+            if name in self._agents:
+                self._agents[name].set_state(state)
+        self._documents_store.update(load_documents(agent_checkpoint.documents))
+        self._documents_store.update(
+            {
+                name: document
+                for name, document in overrides.items()
+                if name in agent_checkpoint.documents
+            }
+        )
+
+    def _apply_overrides(
+        self, name: str, overrides: dict[DocumentName, Document]
+    ) -> None:
+        """Replace documents produced by the agent with overrides."""
+        produced = {
+            document_name
+            for agent in self._changed_agents(name)
+            for document_name in agent.output_document_names
+        }
+        self._documents_store.update(
+            {
+                document_name: document
+                for document_name, document in overrides.items()
+                if document_name in produced
+            }
+        )
+
+    async def _save_checkpoint(
+        self,
+        checkpoint: Checkpoint,
+        name: str,
+        agent_fingerprint: str,
+        status: AgentStatus,
+    ) -> None:
+        """Save status of the agent, states and documents if it is completed."""
+        if self._checkpoint_store is None:
+            return
+        agent_checkpoint = AgentCheckpoint(status, agent_fingerprint)
+        if status == AgentStatus.completed:
+            documents = self._documents_store.documents
+            for agent in self._changed_agents(name):
+                agent_checkpoint.states[agent.name] = agent.get_state()
+                agent_checkpoint.documents.update(
+                    dump_documents(
+                        documents[document_name]
+                        for document_name in agent.output_document_names
+                        if document_name in documents
+                    )
+                )
+        checkpoint.agents[name] = agent_checkpoint
+        snapshot = Checkpoint(
+            checkpoint.run_id, checkpoint.documents, dict(checkpoint.agents)
+        )
+        await asyncio.to_thread(self._checkpoint_store.save, snapshot)
+
+    def _create_agent(
+        self,
+        name: str,
+        agent_parameters: AgentParameters,
+        documents_store: DocumentsStore | None = None,
+        client: AsyncOpenAI | None = None,
+    ) -> BaseAgent:
+        """
+        Create agent by its parameters.
+        Agent works with the pipeline documents store and client by default.
+        """
+        if documents_store is None:
+            documents_store = self._documents_store
         if isinstance(agent_parameters, CriticAgentParameters):
-            criticized_agent = self._agents[agent_parameters.criticized_agent_name]
+            criticized_agent = self._agents.get(agent_parameters.criticized_agent_name)
+            if criticized_agent is None:
+                raise PipelineCompilationError(
+                    f"Critic '{name}' must be defined after criticized agent "
+                    f"'{agent_parameters.criticized_agent_name}'"
+                )
             kwargs = agent_parameters.to_dict()
             kwargs.pop("criticized_agent_name")
             return CriticAgent(
                 criticized_agent=criticized_agent,
-                client=self._client,
+                client=client or self._agent_client(agent_parameters),
                 name=name,
-                documents_store=self._documents_store,
+                documents_store=documents_store,
                 **kwargs,
             )
 
         if isinstance(agent_parameters, ChatAgentParameters):
             return ChatAgent(
-                client=self._client,
+                client=client or self._agent_client(agent_parameters),
                 name=name,
-                documents_store=self._documents_store,
+                documents_store=documents_store,
                 **agent_parameters.to_dict(),
             )
 
         if isinstance(agent_parameters, AIAgentParameters):
             return AIAgent(
-                client=self._client,
+                client=client or self._agent_client(agent_parameters),
                 name=name,
-                documents_store=self._documents_store,
+                documents_store=documents_store,
                 **agent_parameters.to_dict(),
             )
 
         if isinstance(agent_parameters, HardCodeAgentParameters):
             return HardCodeAgent(
                 name=name,
-                documents_store=self._documents_store,
+                documents_store=documents_store,
                 **agent_parameters.to_dict(),
             )
 
         raise ValueError(f"Unknown agent type: {type(agent_parameters)}")
+
+    def _agent_client(self, agent_parameters: AIAgentParameters) -> AsyncOpenAI:
+        """Client for AI agent with its own request policies."""
+        client = self._client
+        if agent_parameters.request_policy is not None:
+            client = PolicyClient(client, agent_parameters.request_policy)
+        elif self._request_policy is not None:
+            client = PolicyClient(client, self._request_policy, hedge=False)
+        if agent_parameters.coalesce:
+            client = CoalescingClient(client, self._coalescer)
+        if self._response_cache is None:
+            return client
+        return CachingClient(
+            client, self._response_cache, agent_parameters.cache_policy
+        )
+
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancel the task and retrieve its exception so it isn't reported."""
+    task.cancel()
+    if task.done() and not task.cancelled():
+        task.exception()
@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Self
+
+from src.core.agents.agent_typings import DocumentName
+from src.core.agents.base_agent import BaseAgent
+
+
+class PipelineCompilationError(ValueError):
+    """Pipeline can't be compiled into a runnable graph."""
+
+
+@dataclass
+class AgentNode:
+    """
+    Agent in the pipeline graph.
+    Parameters:
+    - name - name of the agent
+    - consumed_documents - input and required documents of the agent
+    - produced_documents - output documents of the agent
+    - dependencies - agents producing consumed documents
+    - dependents - agents consuming produced documents
+    - level - length of the longest path from any source agent
+    - priority - length of the longest path to any sink agent, including the agent itself
+    - on_critical_path - whether the agent lies on the longest path of the graph
+    """
+
+    name: str
+    consumed_documents: set[DocumentName]
+    produced_documents: set[DocumentName]
+    dependencies: set[str] = field(default_factory=set)
+    dependents: set[str] = field(default_factory=set)
+    level: int = 0
+    priority: int = 1
+    on_critical_path: bool = False
+
+
+class PipelineGraph:
+    """
+    Producer/consumer graph of pipeline agents.
+    Use `PipelineGraph.compile` to build a validated graph.
+    Parameters:
+    - nodes - agents by their names
+    - order - names of agents in topological order
+    - inputs - documents no agent produces by names of agents consuming them,
+      they must be supplied to the pipeline, see `check_inputs`
+    """
+
+    def __init__(
+        self,
+        nodes: dict[str, AgentNode],
+        order: list[str],
+        inputs: dict[DocumentName, list[str]] | None = None,
+    ):
+        self.nodes: dict[str, AgentNode] = nodes
+        self.order: list[str] = order
+        self.inputs: dict[DocumentName, list[str]] = inputs or {}
+        self._order_index: dict[str, int] = {name: i for i, name in enumerate(order)}
+
+    @classmethod
+    def compile(
+        cls,
+        agents: dict[str, BaseAgent],
+        available_documents: Iterable[DocumentName] | None = None,
+    ) -> Self:
+        """
+        Build graph of agents.
+        Raises `PipelineCompilationError` if some document is produced by several
+        agents, agents depend on each other cyclically or, if `available_documents`
+        are passed, some document is neither produced nor available.
+        Without `available_documents` inputs are checked later by `check_inputs`.
+        """
+        nodes = {
+            name: AgentNode(
+                name=name,
+                consumed_documents=(
+                    agent.input_document_names | agent.required_document_names
+                ),
+                produced_documents=agent.output_document_names,
+            )
+            for name, agent in agents.items()
+        }
+
+        producers: dict[DocumentName, str] = {}
+        for node in nodes.values():
+            for document_name in node.produced_documents:
+                if document_name in producers:
+                    raise PipelineCompilationError(
+                        f"Document '{document_name}' is produced by both "
+                        f"'{producers[document_name]}' and '{node.name}'"
+                    )
+                producers[document_name] = node.name
+
+        inputs: dict[DocumentName, list[str]] = {}
+        for node in nodes.values():
+            for document_name in sorted(node.consumed_documents):
+                if document_name in producers:
+                    producer = producers[document_name]
+                    node.dependencies.add(producer)
+                    nodes[producer].dependents.add(node.name)
+                else:
+                    inputs.setdefault(document_name, []).append(node.name)
+
+        order = cls._topological_order(nodes)
+        cls._compute_levels(nodes, order)
+        graph = cls(nodes, order, inputs)
+        if available_documents is not None:
+            graph.check_inputs(available_documents)
+        return graph
+
+    def check_inputs(self, available_documents: Iterable[DocumentName]) -> None:
+        """
+        Raises `PipelineCompilationError` if some document no agent produces
+        isn't available.
+        """
+        available_documents = set(available_documents)
+        for document_name, consumers in self.inputs.items():
+            if document_name not in available_documents:
+                raise PipelineCompilationError(
+                    f"Agent '{consumers[0]}' waits for document '{document_name}' "
+                    "that no agent produces and that isn't supplied"
+                )
+
+    @property
+    def levels(self) -> list[list[str]]:
+        """Agents grouped by their level."""
+        levels: list[list[str]] = []
+        for name in self.order:
+            level = self.nodes[name].level
+            while len(levels) <= level:
+                levels.append([])
+            levels[level].append(name)
+        return levels
+
+    @property
+    def critical_path(self) -> list[str]:
+        """Longest chain of dependent agents."""
+        if not self.nodes:
+            return []
+        current = max(self.order, key=self._path_key)
+        path = [current]
+        while self.nodes[current].dependents:
+            current = max(self.nodes[current].dependents, key=self._path_key)
+            path.append(current)
+        return path
+
+    def descendants(self, name: str) -> set[str]:
+        """Agents depending on the agent directly or transitively."""
+        result: set[str] = set()
+        stack = list(self.nodes[name].dependents)
+        while stack:
+            current = stack.pop()
+            if current not in result:
+                result.add(current)
+                stack.extend(self.nodes[current].dependents)
+        return result
+
+    def sort_key(self, name: str) -> tuple[int, int, int]:
+        """
+        Key to choose next agent to run with.
+        Critical path agents go first, then agents with longer tails.
+        """
+        node = self.nodes[name]
+        return (not node.on_critical_path, -node.priority, self._order_index[name])
+
+    def _path_key(self, name: str) -> tuple[int, int]:
+        return (self.nodes[name].priority, -self._order_index[name])
+
+    @staticmethod
+    def _topological_order(nodes: dict[str, AgentNode]) -> list[str]:
+        remaining = {name: len(node.dependencies) for name, node in nodes.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in sorted(nodes[name].dependents):
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) != len(nodes):
+            cycled = sorted(name for name, count in remaining.items() if count > 0)
+            raise PipelineCompilationError(
+                f"Agents depend on each other cyclically: {', '.join(cycled)}"
+            )
+        return order
+
+    @staticmethod
+    def _compute_levels(nodes: dict[str, AgentNode], order: list[str]) -> None:
+        for name in order:
+            node = nodes[name]
+            node.level = max(
+                (nodes[dependency].level + 1 for dependency in node.dependencies),
+                default=0,
+            )
+
+        for name in reversed(order):
+            node = nodes[name]
+            node.priority = 1 + max(
+                (nodes[dependent].priority for dependent in node.dependents),
+                default=0,
+            )
+
+        if not nodes:
+            return
+        longest = max(node.priority for node in nodes.values())
+        for name in order:
+            node = nodes[name]
+            node.on_critical_path = node.level + node.priority == longest
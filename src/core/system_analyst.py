@@ -1,4 +1,5 @@
 import os
+from typing import Any, Callable, Coroutine
 
 from openai import AsyncOpenAI
 
@@ -7,197 +8,232 @@ from src.core.agents.agent_parameters import (
     ChatAgentParameters,
     CriticAgentParameters,
     HardCodeAgentParameters,
-    SimpliestUserMessageRequest,
 )
 from src.core.agents.agent_typings import DocumentsStore, GenerationSettings, ModelName
+from src.core.checkpoint import CheckpointStore
+from src.core.clients.base_client import ClientWrapper
+from src.core.clients.rate_limiter import RateLimitedClient, RateLimiter, RateLimits
+from src.core.clients.request_policy import RequestPolicy
 from src.core.pipeline import Pipeline
 from src.core.prompts import english_prompts
 
-documents_store = DocumentsStore()
 
-client = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    base_url=os.getenv("OPENAI_URL"),
-)
+def create_client() -> RateLimitedClient:
+    """Rate limited client of the API set by `OPENAI_API_KEY` and `OPENAI_URL`."""
+    return RateLimitedClient(
+        AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_URL"),
+            max_retries=0,
+        ),
+        RateLimiter(default_limits=RateLimits(max_in_flight=8)),
+    )
 
 
-system_analyst = Pipeline(
-    documents_store=documents_store,
-    client=client,
-    interviewer=ChatAgentParameters(
-        logging_info=("Интервьюер начал интервью", "Интервьюер закончил интервью"),
-        system_prompt=english_prompts.interviewer,
-        settings=GenerationSettings(
-            model=ModelName.gpt_4o,
-            temperature=1.1,
-            max_tokens=4000,
-            frequency_penalty=0.2,
-            presence_penalty=0.1,
-        ),
-        request_user_message=SimpliestUserMessageRequest(),
-        chat_name="interviewer_chat",
-        last_message_name="interviewer_report",
-        chat_filename="1_system_analyst/1_interviewer_chat.md",
-        last_message_filename="1_system_analyst/2_interviewer_report.md",
-        stop_words=["REPORT", "ОТЧЕТ", "ОТЧЕТ", "ИТОГ"],
-        input_document_names=[],
-        required_documents=[],
-        output_document_name=None,
-        output_document_filename=None,
-    ),
-    interviewer_critic=CriticAgentParameters(
-        logging_info=(
-            "Интервьюер передал текущую версию отчета критику",
-            "Интервьюер исправил всё, о чём просил критик",
-        ),
-        criticized_agent_name="interviewer",
-        max_iterations=10,
-        system_prompt=english_prompts.critic_for_interviewer,
-        settings=GenerationSettings(model=ModelName.gpt_4o),
-        input_document_names=["interviewer_report"],
-        required_documents=[],
-        output_document_name="interviewer_critic_report",
-        output_document_filename="1_system_analyst/3_interviewer_critic_report.md",
-    ),
-    name_replacer=HardCodeAgentParameters(
-        hard_code_logic=lambda x: x.replace("assistant", "System Analyst").replace(
-            "user", "Customer"
-        ),
-        logging_info=(None, "Произведена замена имен"),
-        input_document_names=["interviewer_chat"],
-        required_documents=["interviewer_critic_report"],
-        output_document_name="name_replaced_chat",
-        output_document_filename="1_system_analyst/4_name_replaced_chat.md",
-    ),
-    chat_analyzer=AIAgentParameters(
-        logging_info=(
-            "Аналитик начал поиск потерянной информации на основе записи интервью",
-            "Аналитик закончил поиск потерянной информации на основе записи интервью",
-        ),
-        system_prompt=english_prompts.chat_analyzer,
-        settings=GenerationSettings(model=ModelName.claude_3_sonnet),
-        input_document_names=["name_replaced_chat"],
-        required_documents=[],
-        output_document_name="chat_analyzer_report",
-        output_document_filename="1_system_analyst/5_chat_analyzer_report.md",
-    ),
-    report_extractor=AIAgentParameters(
-        logging_info=(
-            "Экстрактор начал извлечение отчета из диалога",
-            "Экстрактор закончил извлечение отчета из диалога",
-        ),
-        system_prompt=english_prompts.report_extractor,
-        settings=GenerationSettings(
-            model=ModelName.claude_3_haiku, temperature=0.7, max_tokens=10000
-        ),
-        input_document_names=["interviewer_report", "chat_analyzer_report"],
-        required_documents=[],
-        output_document_name="merged_report",
-        output_document_filename="1_system_analyst/6_merged_report.md",
-    ),
-    translator=AIAgentParameters(
-        logging_info=(
-            "Переводчик начал перевод отчета",
-            "Переводчик закончил перевод отчета",
-        ),
-        system_prompt=english_prompts.translator,
-        settings=GenerationSettings(
-            model=ModelName.claude_3_sonnet, temperature=1.0, max_tokens=10000
-        ),
-        input_document_names=["merged_report"],
-        required_documents=[],
-        output_document_name="translated_report",
-        output_document_filename="1_system_analyst/7_translated_report.md",
-    ),
-    storyteller=AIAgentParameters(
-        logging_info=(
-            "Аналитик приступил к воспроизведению пользовательских историй",
-            "Аналитик закончил воспроизведение пользовательских историй",
-        ),
-        system_prompt=english_prompts.storyteller,
-        settings=GenerationSettings(
-            model=ModelName.claude_3_sonnet,
-            temperature=1.2,
-            max_tokens=20000,
-            frequency_penalty=0.2,
-            presence_penalty=0.1,
-        ),
-        input_document_names=["translated_report"],
-        required_documents=[],
-        output_document_name="testing_stories",
-        output_document_filename="1_system_analyst/8_testing_stories.md",
-    ),
-    use_cases_writer=AIAgentParameters(
-        logging_info=(
-            "Аналитик начал запись вариантов использования",
-            "Аналитик закончил запись вариантов использования",
-        ),
-        system_prompt=english_prompts.use_case_writer,
-        settings=GenerationSettings(
-            model=ModelName.o1_mini,
-            temperature=0.7,
-            max_tokens=20000,
-        ),
-        input_document_names=["translated_report"],
-        required_documents=[],
-        output_document_name="use_cases",
-        output_document_filename="1_system_analyst/9_use_cases.md",
-    ),
-    use_cases_critic=CriticAgentParameters(
-        criticized_agent_name="use_cases_writer",
-        max_iterations=5,
-        logging_info=(
-            "Аналитик передал текущую версию вариантов использования критику",
-            "Аналитик исправил всё, о чём просил критик",
-        ),
-        system_prompt=english_prompts.critic_for_use_case_writer,
-        settings=GenerationSettings(model=ModelName.gpt_4o),
-        input_document_names=["translated_report", "testing_stories", "use_cases"],
-        required_documents=[],
-        output_document_name="use_cases_critic_report",
-        output_document_filename="1_system_analyst/10_use_cases_critic_report.md",
-    ),
-    domain_modeller=AIAgentParameters(
-        logging_info=(
-            "Аналитик начал организацию модели предметной области",
-            "Аналитик закончил организацию модели предметной области",
-        ),
-        system_prompt=english_prompts.domain_modeller,
-        settings=GenerationSettings(model=ModelName.gpt_4o),
-        input_document_names=["translated_report", "use_cases"],
-        required_documents=["use_cases_critic_report"],
-        output_document_name="domain_model",
-        output_document_filename="1_system_analyst/11_domain_model.md",
-    ),
-    domain_model_critic=CriticAgentParameters(
-        criticized_agent_name="domain_modeller",
-        max_iterations=5,
-        logging_info=(
-            "Аналитик передал текущую версию модели предметной области критику",
-            "Аналитик исправил всё, о чём просил критик",
-        ),
-        system_prompt=english_prompts.critic_for_domain_modeller,
-        settings=GenerationSettings(model=ModelName.gpt_4o),
-        input_document_names=[
-            "translated_report",
-            "testing_stories",
-            "use_cases",
-            "domain_model",
-        ],
-        required_documents=[],
-        output_document_name="domain_model_critic_report",
-        output_document_filename="1_system_analyst/12_domain_model_critic_report.md",
-    ),
-    
-    result_writer=HardCodeAgentParameters(
-        hard_code_logic=lambda x: x,
-        logging_info=(
-            "Работа системного аналитика закончена",
-            None,
-        ),
-        input_document_names=[],
-        required_documents=["domain_model_critic_report"],
-        output_document_name=None,
-        output_document_filename=None,
-    ),
-)
+def create_system_analyst(
+    client: AsyncOpenAI | ClientWrapper,
+    request_user_message: Callable[[str], Coroutine[Any, Any, str]],
+    documents_store: DocumentsStore | None = None,
+    directory: str | None = "1_system_analyst",
+    checkpoint_store: CheckpointStore | None = None,
+    speculative: bool = False,
+    request_policy: RequestPolicy | None = None,
+) -> Pipeline:
+    """
+    Create system analyst pipeline.
+    Documents are saved to `directory` inside data directory, not saved if it is None.
+    """
+    return Pipeline(
+        documents_store=(
+            documents_store if documents_store is not None else DocumentsStore()
+        ),
+        client=client,
+        checkpoint_store=checkpoint_store,
+        speculative=speculative,
+        request_policy=request_policy,
+        interviewer=ChatAgentParameters(
+            logging_info=("Интервьюер начал интервью", "Интервьюер закончил интервью"),
+            system_prompt=english_prompts.interviewer,
+            settings=GenerationSettings(
+                model=ModelName.gpt_4o,
+                temperature=1.1,
+                max_tokens=4000,
+                frequency_penalty=0.2,
+                presence_penalty=0.1,
+            ),
+            request_user_message=request_user_message,
+            chat_name="interviewer_chat",
+            last_message_name="interviewer_report",
+            chat_filename=_filename(directory, "1_interviewer_chat.md"),
+            last_message_filename=_filename(directory, "2_interviewer_report.md"),
+            stop_words=["REPORT", "ОТЧЕТ", "ОТЧЕТ", "ИТОГ"],
+            input_document_names=[],
+            required_documents=[],
+            output_document_name=None,
+            output_document_filename=None,
+        ),
+        interviewer_critic=CriticAgentParameters(
+            logging_info=(
+                "Интервьюер передал текущую версию отчета критику",
+                "Интервьюер исправил всё, о чём просил критик",
+            ),
+            criticized_agent_name="interviewer",
+            max_iterations=10,
+            system_prompt=english_prompts.critic_for_interviewer,
+            settings=GenerationSettings(model=ModelName.gpt_4o),
+            input_document_names=["interviewer_report"],
+            required_documents=[],
+            output_document_name="interviewer_critic_report",
+            output_document_filename=_filename(
+                directory, "3_interviewer_critic_report.md"
+            ),
+        ),
+        name_replacer=HardCodeAgentParameters(
+            hard_code_logic=lambda x: x.replace("assistant", "System Analyst").replace(
+                "user", "Customer"
+            ),
+            logging_info=(None, "Произведена замена имен"),
+            input_document_names=["interviewer_chat"],
+            required_documents=["interviewer_critic_report"],
+            output_document_name="name_replaced_chat",
+            output_document_filename=_filename(directory, "4_name_replaced_chat.md"),
+        ),
+        chat_analyzer=AIAgentParameters(
+            logging_info=(
+                "Аналитик начал поиск потерянной информации на основе записи интервью",
+                "Аналитик закончил поиск потерянной информации на основе записи интервью",
+            ),
+            system_prompt=english_prompts.chat_analyzer,
+            settings=GenerationSettings(model=ModelName.claude_3_sonnet),
+            input_document_names=["name_replaced_chat"],
+            required_documents=[],
+            output_document_name="chat_analyzer_report",
+            output_document_filename=_filename(directory, "5_chat_analyzer_report.md"),
+        ),
+        report_extractor=AIAgentParameters(
+            logging_info=(
+                "Экстрактор начал извлечение отчета из диалога",
+                "Экстрактор закончил извлечение отчета из диалога",
+            ),
+            system_prompt=english_prompts.report_extractor,
+            settings=GenerationSettings(
+                model=ModelName.claude_3_haiku, temperature=0.7, max_tokens=10000
+            ),
+            input_document_names=["interviewer_report", "chat_analyzer_report"],
+            required_documents=[],
+            output_document_name="merged_report",
+            output_document_filename=_filename(directory, "6_merged_report.md"),
+        ),
+        translator=AIAgentParameters(
+            logging_info=(
+                "Переводчик начал перевод отчета",
+                "Переводчик закончил перевод отчета",
+            ),
+            system_prompt=english_prompts.translator,
+            settings=GenerationSettings(
+                model=ModelName.claude_3_sonnet, temperature=1.0, max_tokens=10000
+            ),
+            input_document_names=["merged_report"],
+            required_documents=[],
+            output_document_name="translated_report",
+            output_document_filename=_filename(directory, "7_translated_report.md"),
+        ),
+        storyteller=AIAgentParameters(
+            logging_info=(
+                "Аналитик приступил к воспроизведению пользовательских историй",
+                "Аналитик закончил воспроизведение пользовательских историй",
+            ),
+            system_prompt=english_prompts.storyteller,
+            settings=GenerationSettings(
+                model=ModelName.claude_3_sonnet,
+                temperature=1.2,
+                max_tokens=20000,
+                frequency_penalty=0.2,
+                presence_penalty=0.1,
+            ),
+            input_document_names=["translated_report"],
+            required_documents=[],
+            output_document_name="testing_stories",
+            output_document_filename=_filename(directory, "8_testing_stories.md"),
+        ),
+        use_cases_writer=AIAgentParameters(
+            logging_info=(
+                "Аналитик начал запись вариантов использования",
+                "Аналитик закончил запись вариантов использования",
+            ),
+            system_prompt=english_prompts.use_case_writer,
+            settings=GenerationSettings(
+                model=ModelName.o1_mini,
+                temperature=0.7,
+                max_tokens=20000,
+            ),
+            input_document_names=["translated_report"],
+            required_documents=[],
+            output_document_name="use_cases",
+            output_document_filename=_filename(directory, "9_use_cases.md"),
+        ),
+        use_cases_critic=CriticAgentParameters(
+            criticized_agent_name="use_cases_writer",
+            max_iterations=5,
+            logging_info=(
+                "Аналитик передал текущую версию вариантов использования критику",
+                "Аналитик исправил всё, о чём просил критик",
+            ),
+            system_prompt=english_prompts.critic_for_use_case_writer,
+            settings=GenerationSettings(model=ModelName.gpt_4o),
+            input_document_names=["translated_report", "testing_stories", "use_cases"],
+            required_documents=[],
+            output_document_name="use_cases_critic_report",
+            output_document_filename=_filename(
+                directory, "10_use_cases_critic_report.md"
+            ),
+        ),
+        domain_modeller=AIAgentParameters(
+            logging_info=(
+                "Аналитик начал организацию модели предметной области",
+                "Аналитик закончил организацию модели предметной области",
+            ),
+            system_prompt=english_prompts.domain_modeller,
+            settings=GenerationSettings(model=ModelName.gpt_4o),
+            input_document_names=["translated_report", "use_cases"],
+            required_documents=["use_cases_critic_report"],
+            output_document_name="domain_model",
+            output_document_filename=_filename(directory, "11_domain_model.md"),
+        ),
+        domain_model_critic=CriticAgentParameters(
+            criticized_agent_name="domain_modeller",
+            max_iterations=5,
+            logging_info=(
+                "Аналитик передал текущую версию модели предметной области критику",
+                "Аналитик исправил всё, о чём просил критик",
+            ),
+            system_prompt=english_prompts.critic_for_domain_modeller,
+            settings=GenerationSettings(model=ModelName.gpt_4o),
+            input_document_names=[
+                "translated_report",
+                "testing_stories",
+                "use_cases",
+                "domain_model",
+            ],
+            required_documents=[],
+            output_document_name="domain_model_critic_report",
+            output_document_filename=_filename(
+                directory, "12_domain_model_critic_report.md"
+            ),
+        ),
+        result_writer=HardCodeAgentParameters(
+            hard_code_logic=lambda x: x,
+            logging_info=(
+                "Работа системного аналитика закончена",
+                None,
+            ),
+            input_document_names=[],
+            required_documents=["domain_model_critic_report"],
+            output_document_name=None,
+            output_document_filename=None,
+        ),
+    )
+
+
+def _filename(directory: str | None, filename: str) -> str | None:
+    return f"{directory}/{filename}" if directory is not None else None
@@ -2,6 +2,7 @@
 import os
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 database = os.getenv("POSTGRES_DATABASE")
@@ -9,13 +10,31 @@ user = os.getenv("POSTGRES_USERNAME")
 password = os.getenv("POSTGRES_PASSWORD")
 host = os.getenv("POSTGRES_HOST")
 port = os.getenv("POSTGRES_PORT")
+echo = os.getenv("POSTGRES_ECHO", "false").lower() == "true"
 
 
 # Step 2: Set up the database URL
 connection_string = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
 
+async_connection_string = (
+    f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}"
+)
+
 # Step 3: Create a SQLAlchemy engine
-engine = create_engine(connection_string, echo=True)
+engine = create_engine(connection_string, echo=echo)
+
+# Async engine for the running pipelines. Connections are kept open
+# between flushes and checked before use, since a run can idle for long
+async_engine = create_async_engine(
+    async_connection_string,
+    echo=echo,
+    pool_size=int(os.getenv("POSTGRES_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("POSTGRES_MAX_OVERFLOW", "20")),
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+)
+async_session = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
 # Step 4: Define a base class
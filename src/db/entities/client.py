@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.database import Base
 
@@ -9,6 +9,8 @@ class Client(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     url: Mapped[str] = mapped_column(nullable=False)
 
+    ai_agents: Mapped[list["AIAgent"]] = relationship("AIAgent", back_populates="client")  # type: ignore
+
     def __repr__(self):
         return f"""
 Client(
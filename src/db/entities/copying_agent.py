@@ -10,7 +10,7 @@ class CopyingAgent(Agent):
     id: Mapped[int] = mapped_column(ForeignKey("Agent.id"), primary_key=True)
     base_agent_id: Mapped[int] = mapped_column(ForeignKey("Agent.id"), nullable=False)
 
-    base_agent: Mapped["Agent"] = relationship("Agent")  # type: ignore
+    base_agent: Mapped["Agent"] = relationship("Agent", foreign_keys=[base_agent_id])  # type: ignore
 
     __mapper_args__ = {
         "polymorphic_identity": "CopyingAgent",
@@ -10,7 +10,7 @@ class CriticAgent(AIAgent):
     id: Mapped[int] = mapped_column(ForeignKey("AIAgent.id"), primary_key=True)
     criticized_id: Mapped[int] = mapped_column(ForeignKey("AIAgent.id"), nullable=False)
 
-    criticized: Mapped["AIAgent"] = relationship("AIAgent")  # type: ignore
+    criticized: Mapped["AIAgent"] = relationship("AIAgent", foreign_keys=[criticized_id])  # type: ignore
 
     __mapper_args__ = {
         "polymorphic_identity": "CriticAgent",
@@ -15,5 +15,15 @@ class DocumentTemplate(Base):
     agent_id: Mapped[int] = mapped_column(ForeignKey("Agent.id"), nullable=False)
     agent: Mapped["Agent"] = relationship("Agent", back_populates="output_documents")  # type: ignore
 
+    documents: Mapped[list["Document"]] = relationship(  # type: ignore
+        "Document", back_populates="template"
+    )
+    input: Mapped[list["InputDocuments"]] = relationship(  # type: ignore
+        "InputDocuments", back_populates="document_template"
+    )
+    required: Mapped[list["RequiredDocument"]] = relationship(  # type: ignore
+        "RequiredDocument", back_populates="document_template"
+    )
+
     def __repr__(self):
         return f"DocumentTemplate(id={self.id}, name={self.name}, filename={self.filename}, description={self.description}, agent_id={self.agent_id})"
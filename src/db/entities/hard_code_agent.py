@@ -1,19 +1,19 @@
 from enum import Enum
 
-from sqlalchemy import JSON
+from sqlalchemy import JSON, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
-from src.db.database import Base
+from src.db.entities.agent import Agent
 
 
 class PredefinedType(Enum):
     replace_text = "replace_text"
 
 
-class HardCodeAgent(Base):
+class HardCodeAgent(Agent):
     __tablename__ = "HardCodeAgent"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(ForeignKey("Agent.id"), primary_key=True)
     predefined_type: Mapped[PredefinedType] = mapped_column(nullable=True)
     logic: Mapped[str] = mapped_column(nullable=True)
     arguments: Mapped[dict] = mapped_column(JSON, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.database import Base
 
@@ -10,5 +10,7 @@ class Prompt(Base):
     name: Mapped[str] = mapped_column(nullable=False)
     text: Mapped[str] = mapped_column(nullable=False)
 
+    ai_agents: Mapped[list["AIAgent"]] = relationship("AIAgent", back_populates="prompt")  # type: ignore
+
     def __repr__(self):
         return f"Prompt(id={self.id}, name={self.name}, text={self.text})"
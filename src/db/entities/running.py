@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import JSON, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.database import Base
@@ -16,12 +16,17 @@ class RunningStatus(Enum):
 
 class Running(Base):
     __tablename__ = "Running"
+    __table_args__ = (Index("Running_status_worker_id_idx", "status", "worker_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     graph_id: Mapped[int] = mapped_column(ForeignKey("Graph.id"))
     graph: Mapped["Graph"] = relationship("Graph", back_populates="running")  # type: ignore
     status: Mapped[RunningStatus] = mapped_column(nullable=False)
     creation_date: Mapped[datetime] = mapped_column(nullable=False)
+    input_documents: Mapped[dict] = mapped_column(JSON, nullable=True)
+    worker_id: Mapped[str] = mapped_column(nullable=True)
+    heartbeat_at: Mapped[datetime] = mapped_column(nullable=True)
+    attempts: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
 
     documents: Mapped[list["Document"]] = relationship("Document", back_populates="running")  # type: ignore
 
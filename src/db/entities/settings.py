@@ -15,6 +15,7 @@ class Settings(Base):
     presence_penalty: Mapped[float] = mapped_column(nullable=False, default=0.0)
 
     model: Mapped["Model"] = relationship("Model")  # type: ignore
+    ai_agents: Mapped[list["AIAgent"]] = relationship("AIAgent", back_populates="settings")  # type: ignore
 
     def __repr__(self):
         return f"""
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db.database import Base
 
@@ -10,5 +10,7 @@ class User(Base):
     login: Mapped[str]
     password_hash: Mapped[str]
 
+    graphs: Mapped[list["Graph"]] = relationship("Graph", back_populates="user")  # type: ignore
+
     def __repr__(self):
         return f"User(id={self.id}, login={self.login}, password_hash={self.password_hash})"
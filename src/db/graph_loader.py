@@ -0,0 +1,412 @@
+import asyncio
+import time
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Any, Callable, Coroutine
+
+from openai import AsyncOpenAI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import joinedload, selectinload, with_polymorphic
+
+from src.core.agents.agent_parameters import (
+    AgentParameters,
+    AIAgentParameters,
+    ChatAgentParameters,
+    CriticAgentParameters,
+    HardCodeAgentParameters,
+)
+from src.core.agents.agent_typings import (
+    DocumentName,
+    DocumentsStore,
+    GenerationSettings,
+    ModelName,
+)
+from src.core.clients.base_client import ClientWrapper
+from src.core.pipeline import Pipeline
+from src.db.database import async_session
+from src.db.entities.agent import Agent
+from src.db.entities.ai_agent import AIAgent
+from src.db.entities.chat_agent import ChatAgent
+from src.db.entities.copying_agent import CopyingAgent
+from src.db.entities.critic_agent import CriticAgent
+from src.db.entities.graph import Graph
+from src.db.entities.hard_code_agent import HardCodeAgent, PredefinedType
+from src.db.entities.input_documents import InputDocuments
+from src.db.entities.required_document import RequiredDocument
+from src.db.entities.settings import Settings
+
+
+class GraphLoadingError(ValueError):
+    """Stored graph can't be turned into a pipeline."""
+
+
+@dataclass
+class PipelinePlan:
+    """
+    Pipeline compiled from a stored graph, shared by all its runs.
+    Parameters:
+    - graph_id - id of the graph
+    - user_id - id of the owner of the graph
+    - version - version of the graph the plan is compiled from
+    - parameters - parameters of agents by their names, chat agents have no
+      `request_user_message` until a pipeline is created
+    - templates - ids of document templates by document names,
+      see `RunRecorder.record`
+    - base_versions - versions of other graphs copied agents are taken from,
+      by graph ids
+    """
+
+    graph_id: int
+    user_id: int
+    version: int
+    parameters: dict[str, AgentParameters]
+    templates: dict[DocumentName, int]
+    base_versions: dict[int, int] = field(default_factory=dict)
+
+    def create_pipeline(
+        self,
+        client: AsyncOpenAI | ClientWrapper,
+        request_user_message: Callable[[str], Coroutine[Any, Any, str]] | None = None,
+        documents_store: DocumentsStore | None = None,
+        **pipeline_kwargs,
+    ) -> Pipeline:
+        """
+        New pipeline of the plan. Chat agents ask the user with
+        `request_user_message`, other arguments are passed to `Pipeline`.
+        """
+        parameters = {}
+        for name, agent_parameters in self.parameters.items():
+            if isinstance(agent_parameters, ChatAgentParameters):
+                if request_user_message is None:
+                    raise ValueError(
+                        f"Chat agent '{name}' needs `request_user_message`"
+                    )
+                agent_parameters = replace(
+                    agent_parameters, request_user_message=request_user_message
+                )
+            parameters[name] = agent_parameters
+        return Pipeline(
+            documents_store=(
+                documents_store if documents_store is not None else DocumentsStore()
+            ),
+            client=client,
+            **pipeline_kwargs,
+            **parameters,
+        )
+
+
+class GraphLoader:
+    """
+    Loader of pipeline plans from `Graph` and `Agent` entities.
+    A graph is fetched in a constant number of queries: agents of all types
+    are loaded in one polymorphic query, their documents, prompts, settings
+    and stopwords are loaded eagerly. Only agents copied from other graphs
+    take one more query per level of copying.
+    Only the latest version of a graph can be loaded. Plans are cached
+    with versions of the graph and of graphs their copied agents come from,
+    so `Graph.version` must be incremented when the graph or its agents
+    are changed, and plans copying from a changed graph are compiled again.
+    A cached plan is used for `revalidate_after` seconds, then the versions
+    are checked with one query.
+    Parameters:
+    - session_factory - factory of async sessions
+    - revalidate_after - seconds a plan is used without checking its versions
+    - max_critic_iterations - max iterations of critic agents,
+      they are not stored in the graph
+    - logic_functions - functions stored hard-coded agents may use as
+      `logic` by names, `hard_code_functions` by default
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = async_session,
+        revalidate_after: float = 5.0,
+        max_critic_iterations: int = 10,
+        logic_functions: dict[str, Callable[..., str]] | None = None,
+    ):
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._revalidate_after: float = revalidate_after
+        self._max_critic_iterations: int = max_critic_iterations
+        self._logic_functions: dict[str, Callable[..., str]] = (
+            logic_functions if logic_functions is not None else hard_code_functions
+        )
+        self._plans: dict[int, tuple[PipelinePlan, float]] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    async def load(self, graph_id: int, version: int | None = None) -> PipelinePlan:
+        """
+        Plan of the latest version of the graph.
+        Raises `GraphLoadingError` if `version` is set and isn't the latest one.
+        """
+        plan = self._cached(graph_id, version)
+        if plan is not None:
+            return plan
+
+        lock = self._locks.setdefault(graph_id, asyncio.Lock())
+        async with lock:
+            plan = self._cached(graph_id, version)
+            if plan is not None:
+                return plan
+            async with self._session_factory() as session:
+                cached = self._plans.get(graph_id)
+                plan = cached[0] if cached is not None else None
+                versions = await _graph_versions(
+                    session, [graph_id, *(plan.base_versions if plan else ())]
+                )
+                if graph_id not in versions:
+                    raise GraphLoadingError(f"Graph {graph_id} doesn't exist")
+                if version is not None and versions[graph_id] != version:
+                    raise GraphLoadingError(
+                        f"Graph {graph_id} has version {versions[graph_id]}, "
+                        f"version {version} can't be loaded"
+                    )
+                if plan is None or not _is_current(plan, versions):
+                    graph = await self._fetch(session, graph_id)
+                    plan = await self._compile(session, graph)
+            self._plans[graph_id] = (plan, time.monotonic())
+            return plan
+
+    def invalidate(self, graph_id: int) -> None:
+        """Forget the cached plan of the graph."""
+        self._plans.pop(graph_id, None)
+
+    def _cached(self, graph_id: int, version: int | None) -> PipelinePlan | None:
+        cached = self._plans.get(graph_id)
+        if cached is None or time.monotonic() - cached[1] > self._revalidate_after:
+            return None
+        plan = cached[0]
+        if version is not None and plan.version != version:
+            return None
+        return plan
+
+    async def _fetch(self, session: AsyncSession, graph_id: int) -> Graph:
+        agents = with_polymorphic(Agent, "*")
+        graph = await session.scalar(
+            select(Graph)
+            .where(Graph.id == graph_id)
+            .options(
+                selectinload(Graph.agents.of_type(agents)).options(
+                    *_agent_options(agents)
+                )
+            )
+        )
+        if graph is None:
+            raise GraphLoadingError(f"Graph {graph_id} doesn't exist")
+        return graph
+
+    async def _compile(self, session: AsyncSession, graph: Graph) -> PipelinePlan:
+        agents = {agent.id: agent for agent in graph.agents}
+        await self._load_base_agents(session, agents)
+        base_graph_ids = {agent.graph_id for agent in agents.values()} - {graph.id}
+        base_versions = (
+            await _graph_versions(session, base_graph_ids) if base_graph_ids else {}
+        )
+        names = {agent.id: agent.name for agent in graph.agents}
+
+        parameters = {}
+        for agent in graph.agents:
+            behaviour = _resolve_copy(agent, agents)
+            parameters[agent.name] = self._parameters(agent, behaviour, names)
+
+        templates = {
+            template.name: template.id
+            for agent in graph.agents
+            for template in agent.output_documents
+        }
+        return PipelinePlan(
+            graph.id, graph.user_id, graph.version, parameters, templates, base_versions
+        )
+
+    async def _load_base_agents(
+        self, session: AsyncSession, agents: dict[int, Agent]
+    ) -> None:
+        """Load agents copied from other graphs, one query per level of copying."""
+        while True:
+            missing = {
+                agent.base_agent_id
+                for agent in agents.values()
+                if isinstance(agent, CopyingAgent) and agent.base_agent_id not in agents
+            }
+            if not missing:
+                return
+            polymorphic = with_polymorphic(Agent, "*")
+            result = await session.scalars(
+                select(polymorphic)
+                .where(polymorphic.id.in_(missing))
+                .options(*_agent_options(polymorphic))
+            )
+            for agent in result:
+                agents[agent.id] = agent
+            if missing - agents.keys():
+                raise GraphLoadingError(
+                    f"Copied agents {sorted(missing - agents.keys())} don't exist"
+                )
+
+    def _parameters(
+        self, agent: Agent, behaviour: Agent, names: dict[int, str]
+    ) -> AgentParameters:
+        """Parameters of `agent` behaving like `behaviour`, the agent itself or its copy."""
+        outputs = sorted(agent.output_documents, key=lambda template: template.id)
+        common = {
+            "logging_info": (
+                agent.start_log_message or behaviour.start_log_message,
+                agent.finish_log_message or behaviour.finish_log_message,
+            ),
+            "input_document_names": _template_names(agent.input_documents),
+            "required_documents": _template_names(agent.required_documents),
+            "output_document_name": outputs[0].name if outputs else None,
+            "output_document_filename": outputs[0].filename if outputs else None,
+        }
+
+        if isinstance(behaviour, HardCodeAgent):
+            if not outputs:
+                raise GraphLoadingError(
+                    f"Hard-coded agent '{agent.name}' has no output document"
+                )
+            return HardCodeAgentParameters(
+                hard_code_logic=_hard_code_logic(behaviour, self._logic_functions),
+                **common,
+            )
+
+        if not isinstance(behaviour, AIAgent):
+            raise GraphLoadingError(
+                f"Agent '{agent.name}' has unsupported type '{behaviour.agent_type}'"
+            )
+        ai = {
+            "system_prompt": behaviour.prompt.text,
+            "settings": _generation_settings(behaviour.settings),
+        }
+
+        if isinstance(behaviour, ChatAgent):
+            if len(outputs) < 2:
+                raise GraphLoadingError(
+                    f"Chat agent '{agent.name}' needs chat and last message documents"
+                )
+            return ChatAgentParameters(
+                request_user_message=None,
+                chat_name=outputs[0].name,
+                last_message_name=outputs[1].name,
+                chat_filename=outputs[0].filename,
+                last_message_filename=outputs[1].filename,
+                stop_words=[stopword.word for stopword in behaviour.stopwords] or None,
+                **{
+                    **common,
+                    "output_document_name": None,
+                    "output_document_filename": None,
+                },
+                **ai,
+            )
+
+        if isinstance(behaviour, CriticAgent):
+            if behaviour.criticized_id not in names:
+                raise GraphLoadingError(
+                    f"Agent criticized by '{agent.name}' isn't in the graph"
+                )
+            return CriticAgentParameters(
+                criticized_agent_name=names[behaviour.criticized_id],
+                max_iterations=self._max_critic_iterations,
+                **common,
+                **ai,
+            )
+
+        return AIAgentParameters(**common, **ai)
+
+
+def replace_text(text: str, replacements: dict[str, str]) -> str:
+    """Logic of `PredefinedType.replace_text`: replace keys with values in order."""
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    return text
+
+
+hard_code_functions: dict[str, Callable[..., str]] = {"replace_text": replace_text}
+"""
+Functions stored hard-coded agents may use as `logic`, by names.
+Only registered functions can be called by stored graphs, register module-level
+functions, so agents using them can run in a process pool.
+"""
+
+
+async def _graph_versions(session: AsyncSession, graph_ids) -> dict[int, int]:
+    result = await session.execute(
+        select(Graph.id, Graph.version).where(Graph.id.in_(list(graph_ids)))
+    )
+    return dict(result.all())
+
+
+def _is_current(plan: PipelinePlan, versions: dict[int, int]) -> bool:
+    """Whether the plan is compiled from the current versions of its graphs."""
+    return versions.get(plan.graph_id) == plan.version and all(
+        versions.get(graph_id) == version
+        for graph_id, version in plan.base_versions.items()
+    )
+
+
+def _agent_options(agents) -> tuple:
+    """Eager loading of everything needed to compile agents of all types."""
+    return (
+        selectinload(agents.output_documents),
+        selectinload(agents.input_documents).joinedload(
+            InputDocuments.document_template
+        ),
+        selectinload(agents.required_documents).joinedload(
+            RequiredDocument.document_template
+        ),
+        joinedload(agents.AIAgent.prompt),
+        joinedload(agents.AIAgent.settings).joinedload(Settings.model),
+        selectinload(agents.ChatAgent.stopwords),
+    )
+
+
+def _resolve_copy(agent: Agent, agents: dict[int, Agent]) -> Agent:
+    """Agent whose behaviour is copied through the chain of copying agents."""
+    seen = {agent.id}
+    while isinstance(agent, CopyingAgent):
+        agent = agents[agent.base_agent_id]
+        if agent.id in seen:
+            raise GraphLoadingError(f"Copying agents form a cycle: {sorted(seen)}")
+        seen.add(agent.id)
+    return agent
+
+
+def _template_names(links: list[InputDocuments | RequiredDocument]) -> list[str]:
+    return [
+        link.document_template.name
+        for link in sorted(links, key=lambda link: link.document_template_id)
+    ]
+
+
+def _generation_settings(settings: Settings) -> GenerationSettings:
+    model = f"{settings.model.owner}/{settings.model.name}"
+    try:
+        model_name = ModelName(model)
+    except ValueError as error:
+        raise GraphLoadingError(f"Unknown model '{model}'") from error
+    return GenerationSettings(
+        model=model_name,
+        temperature=settings.temperature,
+        n=settings.n,
+        frequency_penalty=settings.frequency_penalty,
+        presence_penalty=settings.presence_penalty,
+    )
+
+
+def _hard_code_logic(
+    agent: HardCodeAgent, functions: dict[str, Callable[..., str]]
+) -> Callable[[str], str]:
+    """
+    Logic of a stored hard-coded agent: predefined logic or a function
+    registered in `functions` by name, both called with `arguments`.
+    """
+    arguments = agent.arguments or {}
+    if agent.predefined_type == PredefinedType.replace_text:
+        return partial(replace_text, replacements=arguments)
+    if agent.logic:
+        function = functions.get(agent.logic)
+        if function is None:
+            raise GraphLoadingError(
+                f"Logic '{agent.logic}' of agent '{agent.name}' isn't registered"
+            )
+        return partial(function, **arguments)
+    raise GraphLoadingError(f"Hard-coded agent '{agent.name}' has no logic")
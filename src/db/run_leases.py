@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.entities.running import Running, RunningStatus
+
+
+@dataclass
+class ClaimedRun:
+    """
+    Run claimed by a worker.
+    Parameters:
+    - running_id - id of the `Running` row
+    - graph_id - id of the graph to run
+    - documents - initial documents, contents by names
+    - attempts - number of times the run was claimed, including this one
+    """
+
+    running_id: int
+    graph_id: int
+    documents: dict[str, str]
+    attempts: int
+
+
+async def claim_runs(
+    session: AsyncSession, worker_id: str, limit: int
+) -> list[ClaimedRun]:
+    """
+    Claim up to `limit` oldest pending runs nobody owns.
+    Rows are locked with skip-locked semantics, so concurrent workers
+    claim different runs without waiting for each other.
+    Leases are stamped and checked with the database clock, so clocks
+    and timezones of workers don't matter.
+    """
+    claimable = (
+        select(Running.id)
+        .where(Running.status == RunningStatus.PENDING, Running.worker_id.is_(None))
+        .order_by(Running.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        update(Running)
+        .where(Running.id.in_(claimable))
+        .values(
+            status=RunningStatus.RUNNING,
+            worker_id=worker_id,
+            heartbeat_at=func.now(),
+            attempts=Running.attempts + 1,
+        )
+        .returning(
+            Running.id, Running.graph_id, Running.input_documents, Running.attempts
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return [
+        ClaimedRun(running_id, graph_id, documents or {}, attempts)
+        for running_id, graph_id, documents, attempts in result.all()
+    ]
+
+
+async def heartbeat_runs(
+    session: AsyncSession, worker_id: str, running_ids: Iterable[int]
+) -> set[int]:
+    """Extend leases of the worker runs, returns ids of runs it still owns."""
+    running_ids = list(running_ids)
+    if not running_ids:
+        return set()
+    result = await session.execute(
+        update(Running)
+        .where(Running.id.in_(running_ids), Running.worker_id == worker_id)
+        .values(heartbeat_at=func.now())
+        .returning(Running.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars())
+
+
+async def release_runs(
+    session: AsyncSession, worker_id: str, running_ids: Iterable[int]
+) -> None:
+    """
+    Return unfinished runs of the worker to the queue.
+    The claim isn't counted as an attempt, so runs of stopped workers
+    aren't failed by `reclaim_orphans`.
+    """
+    running_ids = list(running_ids)
+    if not running_ids:
+        return
+    await session.execute(
+        update(Running)
+        .where(
+            Running.id.in_(running_ids),
+            Running.worker_id == worker_id,
+            Running.status.in_([RunningStatus.PENDING, RunningStatus.RUNNING]),
+        )
+        .values(
+            status=RunningStatus.PENDING,
+            worker_id=None,
+            attempts=case((Running.attempts > 0, Running.attempts - 1), else_=0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def reclaim_orphans(
+    session: AsyncSession, lease_timeout: float, max_attempts: int
+) -> dict[str, list[int]]:
+    """
+    Return runs of dead workers, whose leases weren't extended for
+    `lease_timeout` seconds, to the queue. Runs claimed `max_attempts` times
+    are failed instead, so a run crashing its workers doesn't loop forever.
+    """
+    expired = and_(
+        Running.worker_id.is_not(None),
+        Running.status.in_([RunningStatus.PENDING, RunningStatus.RUNNING]),
+        or_(
+            Running.heartbeat_at.is_(None),
+            Running.heartbeat_at < func.now() - timedelta(seconds=lease_timeout),
+        ),
+    )
+    failed = await session.execute(
+        update(Running)
+        .where(expired, Running.attempts >= max_attempts)
+        .values(status=RunningStatus.FAILED, worker_id=None)
+        .returning(Running.id)
+        .execution_options(synchronize_session=False)
+    )
+    requeued = await session.execute(
+        update(Running)
+        .where(expired)
+        .values(status=RunningStatus.PENDING, worker_id=None)
+        .returning(Running.id)
+        .execution_options(synchronize_session=False)
+    )
+    return {"failed": list(failed.scalars()), "requeued": list(requeued.scalars())}
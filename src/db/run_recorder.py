@@ -0,0 +1,260 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.agents.agent_typings import Document as CoreDocument
+from src.core.agents.agent_typings import DocumentName, DocumentsStore
+from src.core.pipeline import Pipeline
+from src.db.database import async_session
+from src.db.entities.document import Document
+from src.db.entities.running import Running, RunningStatus
+
+
+class RunRecorder:
+    """
+    Write-behind persistence of pipeline runs into `Running` and `Document` tables.
+    Agents never wait for the database: documents and statuses are buffered
+    and written by a background task once per `flush_interval` or when
+    `max_batch` documents are buffered, all of them in one transaction
+    with one multi-row insert. While a document waits to be written only
+    its latest version is kept, so critic loops rewriting a document produce
+    one row per flush. Failed flushes are logged and retried with newer data.
+    Writes made on behalf of a worker are fenced by its lease: they are dropped
+    if the run is owned by another worker by the time they are flushed.
+    Use as async context manager or call `start` and `close`.
+    Parameters:
+    - session_factory - factory of async sessions
+    - flush_interval - seconds between flushes
+    - max_batch - buffered documents forcing a flush
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = async_session,
+        flush_interval: float = 0.5,
+        max_batch: int = 500,
+    ):
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._flush_interval: float = flush_interval
+        self._max_batch: int = max_batch
+        self._documents: dict[tuple[int, int], tuple[str, datetime]] = {}
+        self._statuses: dict[int, RunningStatus] = {}
+        self._owners: dict[int, str] = {}
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.written: int = 0
+        self.coalesced: int = 0
+        self.fenced: int = 0
+
+    async def __aenter__(self) -> "RunRecorder":
+        self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """Start background flushes."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        """Stop background flushes and write everything buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def create_running(
+        self,
+        graph_id: int,
+        documents: dict[DocumentName, str] | None = None,
+        worker_id: str | None = None,
+    ) -> int:
+        """
+        Insert a pending run of the graph with initial documents, returns its id.
+        With `worker_id` the run is created claimed by the worker, otherwise
+        any worker can claim it, see `src.db.run_leases`.
+        """
+        async with self._session_factory.begin() as session:
+            return await session.scalar(
+                insert(Running)
+                .values(
+                    graph_id=graph_id,
+                    status=RunningStatus.PENDING,
+                    creation_date=datetime.now(),
+                    input_documents=documents,
+                    worker_id=worker_id,
+                    heartbeat_at=func.now() if worker_id is not None else None,
+                )
+                .returning(Running.id)
+            )
+
+    def set_status(
+        self, running_id: int, status: RunningStatus, worker_id: str | None = None
+    ) -> None:
+        """Schedule status change of the run, fenced by the lease of `worker_id`."""
+        self._statuses[running_id] = status
+        self._fence(running_id, worker_id)
+        self._wakeup.set()
+
+    def add_document(
+        self,
+        running_id: int,
+        template_id: int,
+        text: str,
+        worker_id: str | None = None,
+    ) -> None:
+        """Schedule insert of a document version, fenced by the lease of `worker_id`."""
+        self._fence(running_id, worker_id)
+        key = (running_id, template_id)
+        if key in self._documents:
+            self.coalesced += 1
+        self._documents[key] = (text, datetime.now())
+        if len(self._documents) >= self._max_batch:
+            self._wakeup.set()
+
+    async def record(
+        self,
+        pipeline: Pipeline,
+        running_id: int,
+        templates: dict[DocumentName, int],
+        worker_id: str | None = None,
+        **run_kwargs,
+    ) -> DocumentsStore:
+        """
+        Run the pipeline recording its status and complete documents.
+        Documents are matched with templates by name, documents without
+        a template aren't recorded. Arguments of `Pipeline.run` are passed as is.
+        With `worker_id` writes are fenced by the lease of the worker.
+        Status of a cancelled run isn't changed, the caller decides whether
+        the run failed or is returned to the queue.
+        """
+
+        def listener(document: CoreDocument) -> None:
+            if document.complete and document.name in templates:
+                self.add_document(
+                    running_id, templates[document.name], document.content, worker_id
+                )
+
+        self.start()
+        store = pipeline.documents_store
+        store.subscribe(listener)
+        self.set_status(running_id, RunningStatus.RUNNING, worker_id)
+        try:
+            result = await pipeline.run(**run_kwargs)
+        except Exception:
+            self.set_status(running_id, RunningStatus.FAILED, worker_id)
+            raise
+        finally:
+            store.unsubscribe(listener)
+        self.set_status(running_id, RunningStatus.FINISHED, worker_id)
+        return result
+
+    async def flush(self) -> None:
+        """Write everything buffered in one transaction."""
+        async with self._flush_lock:
+            documents, self._documents = self._documents, {}
+            statuses, self._statuses = self._statuses, {}
+            owners, self._owners = self._owners, {}
+            if not documents and not statuses:
+                return
+            try:
+                async with self._session_factory.begin() as session:
+                    written = await self._write(session, documents, statuses, owners)
+            except BaseException:
+                self._requeue(documents, statuses, owners)
+                raise
+            self.written += written
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Failed to record runs, retrying on next flush")
+
+    def _fence(self, running_id: int, worker_id: str | None) -> None:
+        if worker_id is not None:
+            self._owners[running_id] = worker_id
+
+    async def _write(
+        self,
+        session: AsyncSession,
+        documents: dict[tuple[int, int], tuple[str, datetime]],
+        statuses: dict[int, RunningStatus],
+        owners: dict[int, str],
+    ) -> int:
+        """Write the batch, returns the number of inserted documents."""
+        if owners:
+            # locked rows can't be reclaimed until the batch is written
+            result = await session.execute(
+                select(Running.id, Running.worker_id)
+                .where(Running.id.in_(list(owners)))
+                .with_for_update()
+            )
+            current = dict(result.all())
+            lost = {
+                running_id
+                for running_id, worker_id in owners.items()
+                if current.get(running_id) != worker_id
+            }
+            if lost:
+                logging.warning(
+                    f"Runs {sorted(lost)} are owned by other workers, "
+                    "their statuses and documents are dropped"
+                )
+                documents = {
+                    key: value for key, value in documents.items() if key[0] not in lost
+                }
+                statuses = {
+                    running_id: status
+                    for running_id, status in statuses.items()
+                    if running_id not in lost
+                }
+                self.fenced += len(lost)
+        if documents:
+            await session.execute(
+                insert(Document),
+                [
+                    {
+                        "running_id": running_id,
+                        "template_id": template_id,
+                        "text": text,
+                        "creation_date": creation_date,
+                    }
+                    for (running_id, template_id), (
+                        text,
+                        creation_date,
+                    ) in documents.items()
+                ],
+            )
+        by_status: dict[RunningStatus, list[int]] = {}
+        for running_id, status in statuses.items():
+            by_status.setdefault(status, []).append(running_id)
+        for status, running_ids in by_status.items():
+            await session.execute(
+                update(Running).where(Running.id.in_(running_ids)).values(status=status)
+            )
+        return len(documents)
+
+    def _requeue(
+        self,
+        documents: dict[tuple[int, int], tuple[str, datetime]],
+        statuses: dict[int, RunningStatus],
+        owners: dict[int, str],
+    ) -> None:
+        """Return failed batch to the buffer unless newer data is buffered."""
+        self._documents = {**documents, **self._documents}
+        self._statuses = {**statuses, **self._statuses}
+        self._owners = {**owners, **self._owners}
@@ -0,0 +1,24 @@
+import argparse
+import asyncio
+from logging import INFO, basicConfig
+
+from src.fake_openai.config import FakeServerConfig
+from src.fake_openai.server import FakeOpenAIServer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fake OpenAI-compatible server for load testing"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--config", help="path to JSON config of models behaviour")
+    args = parser.parse_args()
+
+    basicConfig(level=INFO)
+    config = FakeServerConfig.from_file(args.config) if args.config else None
+    asyncio.run(FakeOpenAIServer(config).serve_forever(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import math
+import random
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Self
+
+
+class Distribution(Enum):
+    """
+    Distribution of latency.
+    Variants:
+    - constant - always median
+    - exponential - exponential with given median
+    - lognormal - log-normal with given median and sigma
+    """
+
+    constant = "constant"
+    exponential = "exponential"
+    lognormal = "lognormal"
+
+
+@dataclass
+class Latency:
+    """
+    Latency before the first token.
+    Parameters:
+    - distribution - distribution of latency
+    - median - median latency in seconds
+    - sigma - spread of log-normal distribution
+    """
+
+    distribution: Distribution = Distribution.lognormal
+    median: float = 0.5
+    sigma: float = 0.5
+
+    def sample(self, generator: random.Random) -> float:
+        if self.distribution == Distribution.constant:
+            return self.median
+        if self.distribution == Distribution.exponential:
+            return generator.expovariate(math.log(2) / self.median)
+        return generator.lognormvariate(math.log(self.median), self.sigma)
+
+
+@dataclass
+class ScriptedResponse:
+    """
+    Answer for requests containing `match` in any message.
+    Parameters:
+    - match - substring to look for
+    - text - answer text
+    """
+
+    match: str
+    text: str
+
+
+@dataclass
+class ModelBehaviour:
+    """
+    Behaviour of one model.
+    Parameters:
+    - latency - latency before the first token
+    - tokens_per_second - generation speed after the first token
+    - responses - scripted answers, first matching is used; otherwise last user message is echoed
+    - rate_limit_rate - share of requests answered with 429
+    - server_error_rate - share of requests answered with 500
+    - retry_after - value of retry-after header of 429 responses
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    tokens_per_second: float = 50.0
+    responses: list[ScriptedResponse] = field(default_factory=list)
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    retry_after: float = 1.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        data = dict(data)
+        if "latency" in data:
+            latency = dict(data["latency"])
+            if "distribution" in latency:
+                latency["distribution"] = Distribution(latency["distribution"])
+            data["latency"] = Latency(**latency)
+        if "responses" in data:
+            data["responses"] = [
+                ScriptedResponse(**response) for response in data["responses"]
+            ]
+        return cls(**data)
+
+
+@dataclass
+class FakeServerConfig:
+    """
+    Configuration of the fake server.
+    Parameters:
+    - default - behaviour of models not listed in `models`
+    - models - behaviour by model name, e.g. "openai/gpt-4o"
+    - seed - seed of random generator, random if None
+    """
+
+    default: ModelBehaviour = field(default_factory=ModelBehaviour)
+    models: dict[str, ModelBehaviour] = field(default_factory=dict)
+    seed: int | None = None
+
+    def behaviour(self, model: str) -> ModelBehaviour:
+        return self.models.get(model, self.default)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> Self:
+        """
+        Load config from JSON file like:
+        {
+            "default": {"latency": {"median": 0.3}, "tokens_per_second": 80},
+            "models": {"openai/gpt-4o": {"rate_limit_rate": 0.05}},
+            "seed": 42
+        }
+        """
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(
+            default=ModelBehaviour.from_dict(data.get("default", {})),
+            models={
+                name: ModelBehaviour.from_dict(behaviour)
+                for name, behaviour in data.get("models", {}).items()
+            },
+            seed=data.get("seed"),
+        )
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Any
+
+from src.fake_openai.config import FakeServerConfig, ModelBehaviour
+
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for OpenAI-compatible chat completions endpoint.
+    Point `OPENAI_URL` to `http://<host>:<port>/v1` to use it.
+    Statistics of served requests are available at `GET /stats`.
+    """
+
+    def __init__(self, config: FakeServerConfig | None = None):
+        self._config: FakeServerConfig = config or FakeServerConfig()
+        self._random: random.Random = random.Random(self._config.seed)
+        self._server: asyncio.Server | None = None
+        self._connections: dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.stats: Counter[str] = Counter()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.Server:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def stop(self) -> None:
+        """Stop listening and close open connections."""
+        self._server.close()
+        connections = list(self._connections.items())
+        for writer, _ in connections:
+            writer.close()
+        await asyncio.gather(*(task for _, task in connections), return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        server = await self.start(host, port)
+        logging.info(f"Fake OpenAI server is listening on http://{host}:{port}/v1")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body = request
+                await self._route(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    @staticmethod
+    async def _read_request(
+        reader: asyncio.StreamReader,
+    ) -> tuple[str, str, bytes] | None:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        content_length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+        body = await reader.readexactly(content_length) if content_length else b""
+        return method, path.split("?", 1)[0], body
+
+    async def _route(
+        self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter
+    ) -> None:
+        if method == "GET" and path.rstrip("/").endswith("/stats"):
+            await self._send_json(writer, 200, dict(self.stats))
+        elif method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            await self._chat_completions(json.loads(body), writer)
+        else:
+            await self._send_error(writer, 404, f"Unknown endpoint {method} {path}")
+
+    async def _chat_completions(
+        self, payload: dict[str, Any], writer: asyncio.StreamWriter
+    ) -> None:
+        model = payload["model"]
+        behaviour = self._config.behaviour(model)
+        self.stats["requests"] += 1
+
+        chance = self._random.random()
+        if chance < behaviour.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            await self._send_error(
+                writer,
+                429,
+                "Rate limit reached",
+                {"retry-after": str(behaviour.retry_after)},
+            )
+            return
+        if chance < behaviour.rate_limit_rate + behaviour.server_error_rate:
+            self.stats["server_errors"] += 1
+            await self._send_error(writer, 500, "Internal server error")
+            return
+
+        text = self._answer(payload["messages"], behaviour)
+        tokens = TOKEN_PATTERN.findall(text) or [""]
+        token_delay = 1 / behaviour.tokens_per_second
+        await asyncio.sleep(behaviour.latency.sample(self._random))
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if payload.get("stream"):
+            await self._stream_answer(writer, completion_id, model, tokens, token_delay)
+        else:
+            await asyncio.sleep(token_delay * len(tokens))
+            prompt_tokens = sum(
+                len(message["content"] or "") // 4 for message in payload["messages"]
+            )
+            await self._send_json(
+                writer,
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": text},
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens),
+                    },
+                },
+            )
+        self.stats["completed"] += 1
+        self.stats["completion_tokens"] += len(tokens)
+
+    @staticmethod
+    def _answer(messages: list[dict[str, Any]], behaviour: ModelBehaviour) -> str:
+        """First matching scripted answer or the last user message."""
+        conversation = "\n".join(message["content"] or "" for message in messages)
+        for response in behaviour.responses:
+            if response.match in conversation:
+                return response.text
+        user_messages = [m["content"] for m in messages if m["role"] == "user"]
+        return user_messages[-1] if user_messages else ""
+
+    async def _stream_answer(
+        self,
+        writer: asyncio.StreamWriter,
+        completion_id: str,
+        model: str,
+        tokens: list[str],
+        token_delay: float,
+    ) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"\r\n"
+        )
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(token_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": token},
+                        "finish_reason": "stop" if i == len(tokens) - 1 else None,
+                    }
+                ],
+            }
+            self._write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        self._write_chunk(writer, b"")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    async def _send_error(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        message: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+        await self._send_json(
+            writer,
+            status,
+            {"error": {"message": message, "type": error_type, "code": status}},
+            headers,
+        )
+
+    @staticmethod
+    async def _send_json(
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: Any,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(data)}",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+
+_REASONS = {
+    200: "OK",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
@@ -1,12 +1,34 @@
-from src.core.system_analyst import SystemAnalyst
+import asyncio
+import sys
+from logging import INFO, basicConfig
 
-from logging import basicConfig, INFO
+from src.core.agents.agent_parameters import AsyncConsoleUserMessageRequest
+from src.core.checkpoint import FileCheckpointStore
+from src.core.clients.request_policy import RequestPolicy
+from src.core.consts import DATA_DIR
+from src.core.system_analyst import create_client, create_system_analyst
 
 
 def main():
-    basicConfig(level=INFO, force=True, filename="data/current.logs", filemode="w", encoding="utf-8")
-    system_analyst = SystemAnalyst()
-    system_analyst.run()
+    """Run system analyst, pass run id of an interrupted run to resume it."""
+    run_id = sys.argv[1] if len(sys.argv) > 1 else None
+    basicConfig(
+        level=INFO,
+        force=True,
+        filename="data/current.logs",
+        filemode="w",
+        encoding="utf-8",
+    )
+    system_analyst = create_system_analyst(
+        create_client(),
+        AsyncConsoleUserMessageRequest(),
+        checkpoint_store=FileCheckpointStore(DATA_DIR / "checkpoints"),
+        request_policy=RequestPolicy(),
+    )
+    try:
+        asyncio.run(system_analyst.run(run_id))
+    finally:
+        print(f"Run id: {system_analyst.run_id}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,37 @@
+import os
+from logging import INFO, basicConfig
+
+from aiohttp import web
+
+from src.api.app import create_app
+from src.api.auth import TokenAuthenticator
+from src.api.runs import RunManager
+from src.core.checkpoint import FileCheckpointStore
+from src.core.consts import DATA_DIR
+from src.core.system_analyst import create_client
+from src.db.graph_loader import GraphLoader
+from src.db.run_recorder import RunRecorder
+
+
+def main():
+    """Serve runs of stored graphs over HTTP."""
+    basicConfig(level=INFO, force=True)
+    manager = RunManager(
+        GraphLoader(),
+        create_client(),
+        RunRecorder(),
+        max_concurrent_runs=int(os.getenv("API_MAX_CONCURRENT_RUNS", "256")),
+        max_queued_runs=int(os.getenv("API_MAX_QUEUED_RUNS", "1024")),
+        checkpoint_store=FileCheckpointStore(
+            os.getenv("CHECKPOINT_DIR", DATA_DIR / "checkpoints")
+        ),
+    )
+    web.run_app(
+        create_app(manager, TokenAuthenticator()),
+        host=os.getenv("API_HOST", "127.0.0.1"),
+        port=int(os.getenv("API_PORT", "8080")),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from logging import INFO, basicConfig
+
+from src.core.checkpoint import FileCheckpointStore
+from src.core.consts import DATA_DIR
+from src.core.system_analyst import create_client
+from src.db.graph_loader import GraphLoader
+from src.db.run_recorder import RunRecorder
+from src.worker.run_worker import RunWorker
+
+
+async def work(max_concurrent_runs: int) -> None:
+    worker = RunWorker(
+        GraphLoader(),
+        create_client(),
+        RunRecorder(),
+        max_concurrent_runs=max_concurrent_runs,
+        lease_timeout=float(os.getenv("WORKER_LEASE_TIMEOUT", "60")),
+        checkpoint_store=FileCheckpointStore(
+            os.getenv("CHECKPOINT_DIR", DATA_DIR / "checkpoints")
+        ),
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    await worker.run()
+
+
+def run_process(max_concurrent_runs: int) -> None:
+    basicConfig(level=INFO, force=True)
+    asyncio.run(work(max_concurrent_runs))
+
+
+def main():
+    """Execute pending runs of stored graphs in a pool of worker processes."""
+    basicConfig(level=INFO, force=True)
+    processes = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+    max_concurrent_runs = int(os.getenv("WORKER_CONCURRENT_RUNS", "32"))
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_process, args=(max_concurrent_runs,))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def stop(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Callable, Coroutine
+
+from openai import AsyncOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.agents.agent_typings import Document, DocumentsStore
+from src.core.clients.base_client import ClientWrapper
+from src.db.database import async_session
+from src.db.entities.running import RunningStatus
+from src.db.graph_loader import GraphLoader
+from src.db.run_leases import (
+    ClaimedRun,
+    claim_runs,
+    heartbeat_runs,
+    reclaim_orphans,
+    release_runs,
+)
+from src.db.run_recorder import RunRecorder
+
+
+def default_worker_id() -> str:
+    """Unique id of a worker: host, process and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class RunWorker:
+    """
+    Worker executing pending runs from the `Running` table.
+    Any number of workers in any number of processes and nodes can share
+    the table: runs are claimed atomically, each worker runs at most
+    `max_concurrent_runs` of them and extends their leases every
+    `heartbeat_interval` seconds. Runs whose leases expire after
+    `lease_timeout` seconds, e.g. of a killed worker, are returned
+    to the queue by other workers and continue from their checkpoint
+    if `checkpoint_store` is passed to pipelines.
+    A run is failed after `max_attempts` claims.
+    Parameters:
+    - loader - loader of pipeline plans
+    - client - client for AI agents
+    - recorder - recorder of run statuses and documents
+    - session_factory - factory of async sessions
+    - worker_id - unique id of the worker, see `default_worker_id`
+    - max_concurrent_runs - max number of runs executed at once
+    - poll_interval - seconds between claims while there are no pending runs
+    - heartbeat_interval - seconds between lease extensions
+    - lease_timeout - seconds without heartbeats after which a run is reclaimed
+    - max_attempts - claims of a run before it is failed
+    - request_user_message - user message request of chat agents,
+      runs of graphs with chat agents fail without it
+    - pipeline_kwargs - arguments of pipelines, e.g. `timeout` or `checkpoint_store`
+    """
+
+    def __init__(
+        self,
+        loader: GraphLoader,
+        client: AsyncOpenAI | ClientWrapper,
+        recorder: RunRecorder,
+        session_factory: async_sessionmaker[AsyncSession] = async_session,
+        worker_id: str | None = None,
+        max_concurrent_runs: int = 32,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 10.0,
+        lease_timeout: float = 60.0,
+        max_attempts: int = 3,
+        request_user_message: Callable[[str], Coroutine[Any, Any, str]] | None = None,
+        **pipeline_kwargs,
+    ):
+        self.worker_id: str = worker_id or default_worker_id()
+        self._loader: GraphLoader = loader
+        self._client: AsyncOpenAI | ClientWrapper = client
+        self._recorder: RunRecorder = recorder
+        self._session_factory: async_sessionmaker[AsyncSession] = session_factory
+        self._max_concurrent_runs: int = max_concurrent_runs
+        self._poll_interval: float = poll_interval
+        self._heartbeat_interval: float = heartbeat_interval
+        self._lease_timeout: float = lease_timeout
+        self._max_attempts: int = max_attempts
+        self._request_user_message = request_user_message
+        self._pipeline_kwargs: dict[str, Any] = pipeline_kwargs
+        self._active: dict[int, asyncio.Task] = {}
+        self._lost: set[int] = set()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._stopping: bool = False
+        self.finished: int = 0
+        self.failed: int = 0
+
+    async def run(self) -> None:
+        """Claim and execute runs until `stop` is called, then release unfinished runs."""
+        self._recorder.start()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self._stopping:
+                free = self._max_concurrent_runs - len(self._active)
+                claimed = []
+                if free > 0:
+                    async with self._session_factory.begin() as session:
+                        claimed = await claim_runs(session, self.worker_id, free)
+                for run in claimed:
+                    task = asyncio.create_task(self._execute(run))
+                    self._active[run.running_id] = task
+                    task.add_done_callback(
+                        lambda _, running_id=run.running_id: self._on_done(running_id)
+                    )
+                if len(claimed) == free and free > 0:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+                except TimeoutError:
+                    pass
+        finally:
+            heartbeat.cancel()
+            await self._shutdown()
+
+    def stop(self) -> None:
+        """Stop claiming runs, `run` returns after releasing unfinished ones."""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def _execute(self, run: ClaimedRun) -> None:
+        running_id = run.running_id
+        try:
+            plan = await self._loader.load(run.graph_id)
+            pipeline = plan.create_pipeline(
+                self._client,
+                self._request_user_message,
+                DocumentsStore(
+                    {
+                        name: Document(name, content)
+                        for name, content in run.documents.items()
+                    }
+                ),
+                **self._pipeline_kwargs,
+            )
+        except Exception:
+            logging.exception(f"Run {running_id} can't be started")
+            self._recorder.set_status(running_id, RunningStatus.FAILED, self.worker_id)
+            self.failed += 1
+            return
+        try:
+            await self._recorder.record(
+                pipeline,
+                running_id,
+                plan.templates,
+                worker_id=self.worker_id,
+                run_id=str(running_id),
+            )
+        except Exception:
+            logging.exception(f"Run {running_id} failed")
+            self.failed += 1
+        else:
+            self.finished += 1
+
+    def _on_done(self, running_id: int) -> None:
+        self._active.pop(running_id, None)
+        self._lost.discard(running_id)
+        self._wakeup.set()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            running_ids = list(self._active)
+            try:
+                async with self._session_factory.begin() as session:
+                    owned = await heartbeat_runs(session, self.worker_id, running_ids)
+                    reclaimed = await reclaim_orphans(
+                        session, self._lease_timeout, self._max_attempts
+                    )
+            except Exception:
+                logging.exception(f"Heartbeat of worker {self.worker_id} failed")
+                continue
+            for running_id in running_ids:
+                task = self._active.get(running_id)
+                if task is not None and running_id not in owned:
+                    logging.warning(f"Run {running_id} was reclaimed, cancelling it")
+                    self._lost.add(running_id)
+                    task.cancel()
+            if reclaimed["requeued"] or reclaimed["failed"]:
+                logging.warning(
+                    f"Reclaimed orphaned runs: requeued {reclaimed['requeued']}, "
+                    f"failed {reclaimed['failed']}"
+                )
+                self._wakeup.set()
+
+    async def _shutdown(self) -> None:
+        """Cancel unfinished runs and return them to the queue."""
+        unfinished = [
+            running_id for running_id in self._active if running_id not in self._lost
+        ]
+        for task in self._active.values():
+            task.cancel()
+        await asyncio.gather(*self._active.values(), return_exceptions=True)
+        await self._recorder.close()
+        async with self._session_factory.begin() as session:
+            await release_runs(session, self.worker_id, unfinished)
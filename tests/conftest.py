@@ -1 +1,27 @@
+import os
+
 import pytest
+
+# database modules create engines at import, they don't connect until used
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Coroutine creating SQLite database with all tables, returns session factory."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from src.db import entities  # noqa: F401, tables are registered on import
+    from src.db.database import Base
+
+    async def create():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool
+        )
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    return create
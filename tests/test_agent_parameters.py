@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.core.agents.agent_parameters import (
+    AsyncConsoleUserMessageRequest,
+    FileChannelUserMessageRequest,
+    FromFileUserMessageRequest,
+)
+
+
+def test_console_input_does_not_block_event_loop(monkeypatch):
+    typed = threading.Event()
+    prompts = []
+
+    def slow_input(prompt: str) -> str:
+        prompts.append(prompt)
+        typed.wait(1)
+        return f"answer {len(prompts)}"
+
+    monkeypatch.setattr("builtins.input", slow_input)
+
+    async def main():
+        request = AsyncConsoleUserMessageRequest(prompt="? ")
+        answers = asyncio.gather(request("first"), request("second"))
+        await asyncio.sleep(0.05)
+        assert not answers.done()
+        typed.set()
+
+        assert await asyncio.wait_for(answers, 1) == ["answer 1", "answer 2"]
+        assert prompts == ["? ", "? "]
+
+    asyncio.run(main())
+
+
+def test_closed_stdin_fails_the_request(monkeypatch):
+    def closed_input(prompt: str) -> str:
+        raise EOFError
+
+    monkeypatch.setattr("builtins.input", closed_input)
+
+    async def main():
+        with pytest.raises(EOFError):
+            await asyncio.wait_for(AsyncConsoleUserMessageRequest()("question"), 1)
+
+    asyncio.run(main())
+
+
+def test_file_channel_sessions_get_their_own_answers(tmp_path):
+    async def answer(directory, session: str, text: str) -> None:
+        question = directory / f"{session}.000001.question.md"
+        while not question.exists():
+            await asyncio.sleep(0.01)
+        temporary = directory / f"{session}.tmp"
+        temporary.write_text(text, encoding="utf-8")
+        temporary.rename(directory / f"{session}.000001.answer.md")
+
+    async def main():
+        first = FileChannelUserMessageRequest(str(tmp_path), "first")
+        second = FileChannelUserMessageRequest(str(tmp_path), "second", archive=True)
+        answers = asyncio.gather(first("question 1"), second("question 2"))
+        await answer(tmp_path, "second", "answer 2")
+        await answer(tmp_path, "first", "answer 1")
+
+        assert await asyncio.wait_for(answers, 1) == ["answer 1", "answer 2"]
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["archive"]
+        assert sorted(path.name for path in (tmp_path / "archive").iterdir()) == [
+            "second.000001.answer.md",
+            "second.000001.question.md",
+        ]
+
+    asyncio.run(main())
+
+
+def test_answer_file_is_removed_after_reading(tmp_path):
+    async def main():
+        filename = tmp_path / "answer.md"
+        request = asyncio.create_task(FromFileUserMessageRequest(str(filename))("q"))
+        await asyncio.sleep(0.01)
+        assert (tmp_path / "answer.md.answer").read_text(encoding="utf-8") == "q"
+        filename.write_text("a", encoding="utf-8")
+
+        assert await asyncio.wait_for(request, 1) == "a"
+        assert not filename.exists()
+
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import asyncio
+
+from src.core.agents import agent_typings
+from src.core.agents.agent_typings import (
+    Document,
+    DocumentsStore,
+    Message,
+    Role,
+    Transcript,
+)
+from src.core.document_writer import document_writer
+
+
+def chat(size: int) -> list[Message]:
+    return [Message(Role.user, f"message {i}") for i in range(size)]
+
+
+def test_transcript_renders_only_new_messages():
+    messages = chat(3)
+    transcript = Transcript()
+
+    assert transcript.update(messages[:2]) == "\n\n".join(map(str, messages[:2]))
+    assert transcript.update(messages) == "\n\n".join(map(str, messages))
+    assert transcript.update(messages) == transcript.content
+
+
+def test_transcript_starts_over_when_chat_is_cleared():
+    transcript = Transcript()
+    transcript.update(chat(3))
+
+    assert transcript.update(chat(1)) == str(chat(1)[0])
+
+
+def test_transcript_file_is_appended_with_new_messages(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_typings, "DATA_DIR", tmp_path)
+    messages = chat(3)
+    transcript = Transcript("chat.md")
+
+    transcript.update(messages[:1])
+    document_writer.flush()
+    transcript.update(messages)
+    document_writer.flush()
+
+    assert (tmp_path / "chat.md").read_text(encoding="utf-8") == transcript.content
+
+
+def test_waiter_wakes_when_last_document_is_complete():
+    async def main():
+        store = DocumentsStore({"a": Document("a", "a")})
+        waiter = asyncio.create_task(store.wait_for(["a", "b", "c"]))
+        await asyncio.sleep(0)
+
+        store.add(Document("b", "b"))
+        store.add(Document("c", "partial", complete=False))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        store.add(Document("c", "c"))
+        await asyncio.wait_for(waiter, 1)
+        await asyncio.wait_for(store.wait_for(["a", "b", "c"]), 1)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_is_forgotten():
+    async def main():
+        store = DocumentsStore()
+        waiter = asyncio.create_task(store.wait_for(["a"]))
+        updates = asyncio.create_task(store.wait_for_update(["a"]))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        updates.cancel()
+        await asyncio.gather(waiter, updates, return_exceptions=True)
+        store.add(Document("a", "a"))
+
+        assert store._waiters == {} and store._update_waiters == {}
+
+    asyncio.run(main())
+
+
+def test_stream_yields_versions_until_document_is_complete():
+    async def main():
+        store = DocumentsStore()
+
+        async def generate():
+            for content in ("p", "pa", "par"):
+                store.add(Document("a", content, complete=False))
+                await asyncio.sleep(0)
+            store.add(Document("a", "part"))
+
+        writer = asyncio.create_task(generate())
+        versions = [
+            (document.content, document.complete)
+            async for document in store.stream("a")
+        ]
+        await writer
+
+        assert versions == [("p", False), ("pa", False), ("par", False), ("part", True)]
+
+    asyncio.run(main())
@@ -1 +1,89 @@
+import asyncio
+
 import pytest
+
+from src.core.agents.agent_types import ai_agent
+from src.core.agents.agent_types.ai_agent import AIAgent
+from src.core.agents.agent_typings import (
+    Document,
+    DocumentsStore,
+    GenerationSettings,
+    ModelName,
+)
+from src.core.clients.base_client import ClientWrapper, chunk_from_text
+
+
+class StreamingProvider(ClientWrapper):
+    def __init__(self, parts: list[str], hang: bool = False):
+        super().__init__(None)
+        self._parts: list[str] = parts
+        self._hang: bool = hang
+        self.closed: bool = False
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"]
+        return self._stream(kwargs["model"])
+
+    async def _stream(self, model: str):
+        try:
+            for part in self._parts:
+                yield chunk_from_text(model, part)
+                await asyncio.sleep(0)
+            if self._hang:
+                await asyncio.Event().wait()
+        finally:
+            self.closed = True
+
+
+def agent(client: ClientWrapper, store: DocumentsStore) -> AIAgent:
+    return AIAgent(
+        client=client,
+        name="writer",
+        system_prompt="You are writer",
+        settings=GenerationSettings(model=ModelName.gpt_4o),
+        documents_store=store,
+        input_document_names=["task"],
+        required_documents=[],
+        output_document_name="draft",
+        stream=True,
+    )
+
+
+def test_streamed_answer_is_published_while_it_grows(monkeypatch):
+    monkeypatch.setattr(ai_agent, "PARTIAL_DOCUMENT_INTERVAL", 0)
+
+    async def main():
+        store = DocumentsStore({"task": Document("task", "write")})
+        versions = []
+        store.subscribe(lambda document: versions.append(document))
+        writer = agent(StreamingProvider(["Hel", "lo", "!"]), store)
+
+        await writer.run()
+
+        assert [(v.content, v.complete) for v in versions] == [
+            ("Hel", False),
+            ("Hello", False),
+            ("Hello!", False),
+            ("Hello!", True),
+        ]
+        assert store.documents["draft"].complete
+        assert writer.streaming_stats[0].tokens == 3
+
+    asyncio.run(main())
+
+
+def test_stream_is_closed_when_agent_is_cancelled():
+    async def main():
+        store = DocumentsStore({"task": Document("task", "write")})
+        provider = StreamingProvider(["Hel"], hang=True)
+        run = asyncio.create_task(agent(provider, store).run())
+        await asyncio.sleep(0.01)
+
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+        assert provider.closed
+        assert "draft" not in store.documents or not store.documents["draft"].complete
+
+    asyncio.run(main())
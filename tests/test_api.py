@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.api.app import create_app
+from src.api.runs import RunManager, RunStatus
+from src.core.agents.agent_parameters import HardCodeAgentParameters
+from src.db.graph_loader import GraphLoadingError, PipelinePlan
+
+OWNER = {"Authorization": "Bearer owner"}
+STRANGER = {"Authorization": "Bearer stranger"}
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def fail(text: str) -> str:
+    raise ValueError("logic failed")
+
+
+class StubLoader:
+    def __init__(self, plan: PipelinePlan):
+        self.plan = plan
+
+    async def load(self, graph_id: int, version: int | None = None) -> PipelinePlan:
+        if graph_id != self.plan.graph_id:
+            raise GraphLoadingError(f"Graph {graph_id} doesn't exist")
+        return self.plan
+
+
+async def authenticate(token: str) -> int | None:
+    return {"owner": 1, "stranger": 2}.get(token)
+
+
+def plan(logic=upper) -> PipelinePlan:
+    return PipelinePlan(
+        graph_id=10,
+        user_id=1,
+        version=1,
+        parameters={
+            "writer": HardCodeAgentParameters(
+                input_document_names=["input"],
+                output_document_name="report",
+                logging_info=(None, None),
+                output_document_filename=None,
+                required_documents=[],
+                hard_code_logic=logic,
+            )
+        },
+        templates={},
+    )
+
+
+def serve(test, logic=upper):
+    async def main():
+        manager = RunManager(StubLoader(plan(logic)), client=None)
+        async with TestClient(TestServer(create_app(manager, authenticate))) as client:
+            await test(client, manager)
+
+    asyncio.run(main())
+
+
+async def wait_done(client: TestClient, run_id: str) -> list[dict]:
+    response = await client.get(f"/runs/{run_id}/events", headers=OWNER)
+    events = []
+    async for line in response.content:
+        if line.startswith(b"data: "):
+            events.append(json.loads(line[len(b"data: ") :]))
+    return events
+
+
+def test_requests_without_valid_token_are_rejected():
+    async def test(client, manager):
+        response = await client.post("/graphs/10/runs")
+        assert response.status == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+        response = await client.post(
+            "/graphs/10/runs", headers={"Authorization": "Bearer unknown"}
+        )
+        assert response.status == 401
+
+    serve(test)
+
+
+def test_run_is_streamed_until_finished():
+    async def test(client, manager):
+        response = await client.post(
+            "/graphs/10/runs", json={"documents": {"input": "text"}}, headers=OWNER
+        )
+        assert response.status == 202
+        run_id = (await response.json())["run_id"]
+
+        events = await wait_done(client, run_id)
+
+        assert {"name": "report", "content": "TEXT"} in events
+        assert events[-1] == {"status": "finished", "error": None}
+        response = await client.get(f"/runs/{run_id}/documents/report", headers=OWNER)
+        assert (await response.json())["content"] == "TEXT"
+
+    serve(test)
+
+
+def test_runs_of_other_users_are_hidden():
+    async def test(client, manager):
+        response = await client.post(
+            "/graphs/10/runs", json={"documents": {"input": "text"}}, headers=STRANGER
+        )
+        assert response.status == 404
+        response = await client.post(
+            "/graphs/10/runs", json={"documents": {"input": "text"}}, headers=OWNER
+        )
+        run_id = (await response.json())["run_id"]
+        response = await client.get(f"/runs/{run_id}", headers=STRANGER)
+        assert response.status == 404
+
+    serve(test)
+
+
+def test_invalid_input_is_rejected():
+    async def test(client, manager):
+        for body in (
+            {"documents": {"input": 1}},
+            {"documents": {"input": "text"}, "version": "1"},
+            {"documents": {"input": "text"}, "version": True},
+            {"documents": {"other": "text"}},
+        ):
+            response = await client.post("/graphs/10/runs", json=body, headers=OWNER)
+            assert response.status == 400, body
+        assert not manager._runs
+
+        response = await client.post(
+            "/graphs/10/runs", json={"documents": {"input": "text"}}, headers=OWNER
+        )
+        run_id = (await response.json())["run_id"]
+        response = await client.get(
+            f"/runs/{run_id}/events", headers={**OWNER, "Last-Event-ID": "x"}
+        )
+        assert response.status == 400
+
+    serve(test)
+
+
+def test_failed_run_closes_stream():
+    async def test(client, manager):
+        response = await client.post(
+            "/graphs/10/runs", json={"documents": {"input": "text"}}, headers=OWNER
+        )
+        run_id = (await response.json())["run_id"]
+
+        events = await wait_done(client, run_id)
+
+        assert events[-1] == {"status": "failed", "error": "logic failed"}
+        assert manager.get(run_id).status == RunStatus.failed
+
+    serve(test, fail)
+
+
+def test_chat_questions_are_answered_by_replies():
+    async def test(client, manager):
+        state = await manager.submit(10, {"input": "text"})
+        question = asyncio.create_task(state.request_user_message("name?"))
+        await asyncio.sleep(0)
+
+        response = await client.post(
+            f"/runs/{state.id}/replies", json={"text": "Ann"}, headers=OWNER
+        )
+
+        assert response.status == 200
+        assert await question == "Ann"
+        response = await client.post(
+            f"/runs/{state.id}/replies", json={"text": "Ann"}, headers=OWNER
+        )
+        assert response.status == 409
+
+    serve(test)
@@ -1 +1,33 @@
-import pytest
+import asyncio
+import time
+
+from src.core.agents.agent_types.hard_code_agent import HardCodeAgent
+from src.core.agents.agent_typings import Document, DocumentsStore
+
+
+def test_agent_starts_as_soon_as_its_documents_arrive():
+    async def main():
+        store = DocumentsStore()
+        agent = HardCodeAgent(
+            name="upper",
+            documents_store=store,
+            input_document_names=["text"],
+            required_documents=["approval"],
+            output_document_name="upper_text",
+            hard_code_logic=str.upper,
+        )
+        run = asyncio.create_task(agent.run())
+        await asyncio.sleep(0.01)
+        store.add(Document("text", "hello"))
+        await asyncio.sleep(0.01)
+        assert not run.done()
+
+        start = time.monotonic()
+        store.add(Document("approval", "ok"))
+        result = await asyncio.wait_for(run, 1)
+
+        assert time.monotonic() - start < 0.1
+        assert result.documents["upper_text"].content == "HELLO"
+        assert store.documents["upper_text"].content == "HELLO"
+
+    asyncio.run(main())
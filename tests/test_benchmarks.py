@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from openai import AsyncOpenAI
+
+from benchmarks import micro
+from benchmarks.common import percentile, summary
+from benchmarks.load_test import fake_config, run_level, saturation_level
+from src.fake_openai.server import FakeOpenAIServer
+
+
+def test_summary_of_values():
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentile(values, 0.5) == 51.0
+    assert summary(values)["p99"] == 100.0
+    assert summary([]) == {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_every_micro_benchmark_runs(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.core.agents.agent_typings.DATA_DIR", tmp_path)
+    smallest = {}
+    for benchmark in micro.BENCHMARKS:
+        # sizes of every benchmark are listed in ascending order
+        smallest.setdefault(benchmark.name, benchmark)
+
+    for benchmark in smallest.values():
+        result = micro.measure(benchmark.setup(benchmark.size), repeats=1, min_time=0)
+
+        assert result["calls"] == 1 and result["ns_per_call"]["p50"] > 0
+
+
+def test_regressions_are_found_against_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(
+        json.dumps(
+            {
+                "results": [
+                    {"name": "fast", "size": 10, "ns_per_call": {"p50": 100.0}},
+                    {"name": "slow", "size": 10, "ns_per_call": {"p50": 100.0}},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    def results(slow: float) -> list[dict]:
+        return [
+            {"name": "fast", "size": 10, "ns_per_call": {"p50": 90.0}},
+            {"name": "slow", "size": 10, "ns_per_call": {"p50": slow}},
+            {"name": "new", "size": 10, "ns_per_call": {"p50": 1.0}},
+        ]
+
+    assert micro.compare(results(110.0), str(baseline), threshold=1.2)
+    assert not micro.compare(results(130.0), str(baseline), threshold=1.2)
+
+
+def test_load_test_level_runs_system_analyst_against_fake_server():
+    async def main():
+        server = FakeOpenAIServer(fake_config(latency=0.001, tokens_per_second=10_000))
+        port = (await server.start(port=0)).sockets[0].getsockname()[1]
+        client = AsyncOpenAI(
+            api_key="fake", base_url=f"http://127.0.0.1:{port}/v1", max_retries=0
+        )
+        try:
+            return await run_level(
+                client, concurrency=2, runs=2, think_time=0.0, speculative=True
+            )
+        finally:
+            await client.close()
+            await server.stop()
+
+    level = asyncio.run(main())
+
+    assert (level["runs"], level["failures"]) == (2, 0)
+    assert level["runs_per_second"] > 0 and level["agents"]
+
+
+def test_saturation_is_found_when_throughput_stops_growing():
+    levels = [
+        {"concurrency": 1, "runs_per_second": 1.0},
+        {"concurrency": 2, "runs_per_second": 1.9},
+        {"concurrency": 4, "runs_per_second": 2.0},
+    ]
+
+    assert saturation_level(levels, min_gain=0.1) == 2
+    assert saturation_level(levels[:2], min_gain=0.1) is None
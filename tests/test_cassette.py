@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from src.core.clients.base_client import (
+    ClientWrapper,
+    completion_from_text,
+    stream_from_texts,
+)
+from src.core.clients.cassette import CassetteError, RecordingClient, ReplayingClient
+
+MODEL = "gpt-4o"
+
+
+class FakeProvider(ClientWrapper):
+    def __init__(self):
+        super().__init__(None)
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return "http://provider/v1/"
+
+    async def create(self, **kwargs):
+        self.requests += 1
+        answer = f"answer {self.requests}"
+        if kwargs.get("stream"):
+            return stream_from_texts(kwargs["model"], [answer[:3], answer[3:]])
+        return completion_from_text(kwargs["model"], answer)
+
+
+def request(content: str, **kwargs) -> dict:
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": content}],
+        **kwargs,
+    }
+
+
+def test_recorded_answers_are_replayed_in_order(tmp_path):
+    async def main():
+        recorder = RecordingClient(FakeProvider(), tmp_path / "cassette.jsonl.gz")
+        for _ in range(2):
+            await recorder.chat.completions.create(**request("hello"))
+        stream = await recorder.chat.completions.create(
+            **request("stream", stream=True)
+        )
+        async with stream:
+            assert [chunk.choices[0].delta.content async for chunk in stream] == [
+                "ans",
+                "wer 3",
+            ]
+
+        replay = ReplayingClient(tmp_path / "cassette.jsonl.gz")
+        answers = [
+            (await replay.chat.completions.create(**request("hello")))
+            .choices[0]
+            .message.content
+            for _ in range(3)
+        ]
+        assert answers == ["answer 1", "answer 2", "answer 2"]
+
+        streamed = await replay.chat.completions.create(
+            **request("stream", stream=True)
+        )
+        assert [chunk.choices[0].delta.content async for chunk in streamed] == [
+            "ans",
+            "wer 3",
+        ]
+        completion = await replay.chat.completions.create(**request("stream"))
+        assert completion.choices[0].message.content == "answer 3"
+
+    asyncio.run(main())
+
+
+def test_concurrent_answers_are_all_recorded(tmp_path):
+    async def main():
+        recorder = RecordingClient(FakeProvider(), tmp_path / "cassette.jsonl.gz")
+        await asyncio.gather(
+            *(recorder.chat.completions.create(**request(f"{i}")) for i in range(20))
+        )
+
+        replay = ReplayingClient(tmp_path / "cassette.jsonl.gz")
+        for i in range(20):
+            await replay.chat.completions.create(**request(f"{i}"))
+
+    asyncio.run(main())
+
+
+def test_request_missing_from_cassette_fails(tmp_path):
+    async def main():
+        recorder = RecordingClient(FakeProvider(), tmp_path / "cassette.jsonl.gz")
+        await recorder.chat.completions.create(**request("hello"))
+
+        replay = ReplayingClient(tmp_path / "cassette.jsonl.gz")
+        with pytest.raises(CassetteError):
+            await replay.chat.completions.create(**request("bye"))
+
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+
+from src.core.agents.agent_typings import GenerationSettings, Message, ModelName, Role
+from src.core.agents.chat_history import (
+    FullHistory,
+    PinnedDraftHistory,
+    SlidingWindowHistory,
+    SummarizingHistory,
+    count_tokens,
+)
+from src.core.clients.base_client import ClientWrapper, completion_from_text
+
+CHAT = [
+    Message(Role.system, "system"),
+    Message(Role.user, "task"),
+    Message(Role.assistant, "draft 1"),
+    Message(Role.user, "critic 1"),
+    Message(Role.assistant, "draft 2"),
+    Message(Role.user, "critic 2"),
+]
+
+
+def prepare(policy, chat=CHAT, budget=10_000) -> list[str]:
+    return [message.content for message in asyncio.run(policy.prepare(chat, budget))]
+
+
+def test_full_history_sends_everything():
+    assert prepare(FullHistory(), budget=0) == [message.content for message in CHAT]
+
+
+def test_sliding_window_keeps_system_prompt_and_latest_messages():
+    assert prepare(SlidingWindowHistory(max_messages=2)) == [
+        "system",
+        "draft 2",
+        "critic 2",
+    ]
+    budget = count_tokens(CHAT[:1]) + count_tokens(CHAT[-2:])
+    assert prepare(SlidingWindowHistory(), budget=budget) == [
+        "system",
+        "draft 2",
+        "critic 2",
+    ]
+    assert prepare(SlidingWindowHistory(), budget=0) == ["system", "critic 2"]
+
+
+def test_pinned_draft_keeps_task_and_latest_draft():
+    assert prepare(PinnedDraftHistory()) == ["system", "task", "draft 2", "critic 2"]
+    assert prepare(PinnedDraftHistory(), CHAT[:2]) == ["system", "task"]
+
+
+def test_summarizing_history_summarizes_old_messages_once():
+    class Summarizer(ClientWrapper):
+        def __init__(self):
+            super().__init__(None)
+            self.requests = []
+
+        async def create(self, **kwargs):
+            self.requests.append(kwargs["messages"][-1]["content"])
+            return completion_from_text(kwargs["model"], "summary")
+
+    async def main():
+        client = Summarizer()
+        policy = SummarizingHistory(
+            client, GenerationSettings(ModelName.gpt_4o_mini), keep_last=2
+        )
+
+        summary = Message(Role.system, "Summary of the previous conversation:\nsummary")
+        budget = count_tokens([CHAT[0], summary, *CHAT[-2:]])
+        assert budget < count_tokens(CHAT)
+
+        prepared = await policy.prepare(CHAT, budget)
+        again = await policy.prepare(CHAT, budget)
+
+        assert prepared == again
+        assert [message.content for message in prepared] == [
+            "system",
+            "Summary of the previous conversation:\nsummary",
+            "draft 2",
+            "critic 2",
+        ]
+        assert len(client.requests) == 1
+        assert "critic 1" in client.requests[0] and "draft 2" not in client.requests[0]
+        assert await policy.prepare(CHAT, budget=10_000) == CHAT
+
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from src.core.agents.agent_parameters import HardCodeAgentParameters
+from src.core.agents.agent_types.hard_code_agent import _logic_fingerprint
+from src.core.agents.agent_typings import Document, DocumentsStore
+from src.core.checkpoint import (
+    AgentCheckpoint,
+    AgentStatus,
+    Checkpoint,
+    FileCheckpointStore,
+)
+from src.core.pipeline import Pipeline
+
+
+class Switch:
+    fail: bool = False
+
+
+FLAKY = Switch()
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def flaky(text: str) -> str:
+    if FLAKY.fail:
+        raise RuntimeError("Flaky agent failed")
+    return f"{text}!"
+
+
+def suffix(text: str, end: str) -> str:
+    return text + end
+
+
+def agent(inputs: list[str], output: str, logic=upper) -> HardCodeAgentParameters:
+    return HardCodeAgentParameters(
+        input_document_names=inputs,
+        output_document_name=output,
+        logging_info=(None, None),
+        output_document_filename=None,
+        required_documents=[],
+        hard_code_logic=logic,
+    )
+
+
+def pipeline(
+    store: FileCheckpointStore, documents: dict[str, str] | None = None
+) -> Pipeline:
+    return Pipeline(
+        DocumentsStore(
+            {
+                name: Document(name, content)
+                for name, content in (documents or {}).items()
+            }
+        ),
+        client=None,
+        checkpoint_store=store,
+        first=agent(["input"], "draft"),
+        second=agent(["draft"], "report", flaky),
+    )
+
+
+def test_checkpoint_is_saved_and_loaded(tmp_path):
+    store = FileCheckpointStore(tmp_path)
+    checkpoint = Checkpoint(
+        "run",
+        {"input": {"content": "text", "filename": None}},
+        {"first": AgentCheckpoint(AgentStatus.completed, "hash", {"first": {}})},
+    )
+    store.save(checkpoint)
+
+    assert store.load("run") == checkpoint
+    assert store.load("other") is None
+    assert [path.name for path in tmp_path.iterdir()] == ["run.json"]
+
+
+def test_failed_run_is_resumed_from_checkpoint(tmp_path, monkeypatch):
+    store = FileCheckpointStore(tmp_path)
+    monkeypatch.setattr(FLAKY, "fail", True)
+    with pytest.raises(RuntimeError, match="Flaky agent failed"):
+        asyncio.run(pipeline(store, {"input": "text"}).run("run"))
+    assert store.load("run").agents["second"].status == AgentStatus.failed
+
+    monkeypatch.setattr(FLAKY, "fail", False)
+    resumed = pipeline(store)
+    documents = asyncio.run(resumed.run("run")).documents
+
+    assert documents["report"].content == "TEXT!"
+    assert resumed.stats["first"].reused and not resumed.stats["second"].reused
+    assert store.load("run").agents["second"].status == AgentStatus.completed
+
+
+def test_only_agents_depending_on_changed_documents_run_again(tmp_path):
+    def incremental() -> Pipeline:
+        return Pipeline(
+            DocumentsStore(),
+            client=None,
+            checkpoint_store=FileCheckpointStore(tmp_path),
+            first=agent(["input"], "draft"),
+            second=agent(["draft"], "report", flaky),
+            other=agent(["notes"], "summary"),
+        )
+
+    asyncio.run(
+        incremental().run(
+            "run", {"input": Document("input", "a"), "notes": Document("notes", "b")}
+        )
+    )
+
+    changed_input = incremental()
+    documents = asyncio.run(
+        changed_input.run("run", {"notes": Document("notes", "c")})
+    ).documents
+    assert documents["summary"].content == "C"
+    assert documents["report"].content == "A!"
+    assert {name for name, stats in changed_input.stats.items() if stats.reused} == {
+        "first",
+        "second",
+    }
+
+    edited_draft = incremental()
+    documents = asyncio.run(
+        edited_draft.run("run", {"draft": Document("draft", "edited")})
+    ).documents
+    assert documents["draft"].content == "edited"
+    assert documents["report"].content == "edited!"
+    assert {name for name, stats in edited_draft.stats.items() if stats.reused} == {
+        "first",
+        "other",
+    }
+
+
+def test_agent_runs_again_when_its_logic_changes(tmp_path):
+    def with_logic(logic) -> Pipeline:
+        return Pipeline(
+            DocumentsStore({"input": Document("input", "text")}),
+            client=None,
+            checkpoint_store=FileCheckpointStore(tmp_path),
+            first=agent(["input"], "draft", logic),
+        )
+
+    asyncio.run(with_logic(upper).run("run"))
+    changed = with_logic(str.lower)
+    documents = asyncio.run(changed.run("run")).documents
+
+    assert documents["draft"].content == "text"
+    assert not changed.stats["first"].reused
+
+
+def test_logic_fingerprint_covers_partial_arguments_and_globals(monkeypatch):
+    assert _logic_fingerprint(partial(suffix, end="!")) != _logic_fingerprint(
+        partial(suffix, end="?")
+    )
+    before = _logic_fingerprint(flaky)
+    monkeypatch.setattr(Switch, "__repr__", lambda self: "<changed>")
+    assert _logic_fingerprint(flaky) != before
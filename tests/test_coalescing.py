@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from src.core.clients.coalescing import RequestCoalescer
+from src.core.clients.deadline import request_deadline
+
+
+def with_deadline(seconds: float, coroutine):
+    async def run():
+        request_deadline.set(asyncio.get_running_loop().time() + seconds)
+        return await coroutine
+
+    return asyncio.create_task(run())
+
+
+def test_identical_requests_share_one_call():
+    async def main():
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def send():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(coalescer.call("key", send) for _ in range(3)))
+
+        assert results == ["answer"] * 3
+        assert (len(calls), coalescer.stats.sent, coalescer.stats.coalesced) == (
+            1,
+            1,
+            2,
+        )
+        assert await coalescer.call("key", send) == "answer"
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_followers_wait_within_their_own_deadlines():
+    async def main():
+        coalescer = RequestCoalescer()
+        seen_deadlines = []
+
+        async def send():
+            seen_deadlines.append(request_deadline.get())
+            await asyncio.sleep(0.1)
+            return "answer"
+
+        leader = with_deadline(0.02, coalescer.call("key", send))
+        await asyncio.sleep(0)
+        follower = with_deadline(1.0, coalescer.call("key", send))
+        patient = asyncio.create_task(coalescer.call("key", send, timeout=1.0))
+
+        with pytest.raises(TimeoutError):
+            await leader
+        assert await follower == "answer"
+        assert await patient == "answer"
+        assert seen_deadlines == [None]
+        assert coalescer.stats.sent == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_doesnt_cancel_followers():
+    async def main():
+        coalescer = RequestCoalescer()
+
+        async def send():
+            await asyncio.sleep(0.02)
+            return "answer"
+
+        leader = asyncio.create_task(coalescer.call("key", send))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(coalescer.call("key", send))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "answer"
+
+    asyncio.run(main())
+
+
+def test_call_is_cancelled_when_nobody_waits():
+    async def main():
+        coalescer = RequestCoalescer()
+        cancelled = asyncio.Event()
+
+        async def send():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            await coalescer.call("key", send, timeout=0.01)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        with pytest.raises(TimeoutError, match="exceeded"):
+            await with_deadline(-1, coalescer.call("key", send))
+
+    asyncio.run(main())
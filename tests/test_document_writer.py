@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from src.core.document_writer import DocumentWriter, PendingWrites, pending_writes
+
+
+def test_latest_content_and_appends_are_written(tmp_path):
+    writer = DocumentWriter()
+    path = tmp_path / "nested" / "document.md"
+
+    for version in range(10):
+        writer.submit(path, f"version {version}")
+    writer.append(path, " appended")
+    writer.flush()
+
+    assert path.read_text(encoding="utf-8") == "version 9 appended"
+    assert writer.written + writer.coalesced == 11
+    assert [file.name for file in path.parent.iterdir()] == ["document.md"]
+
+
+def test_run_waits_only_for_its_own_writes(tmp_path):
+    async def main():
+        writer = DocumentWriter()
+        writes = PendingWrites()
+        token = pending_writes.set(writes)
+        writer.submit(tmp_path / "own.md", "own")
+        pending_writes.reset(token)
+        writer.submit(tmp_path / "other.md", "other")
+
+        await asyncio.wait_for(writer.drain(writes), 1)
+
+        assert (tmp_path / "own.md").read_text(encoding="utf-8") == "own"
+        assert not writes.paths
+        writer.flush()
+
+    asyncio.run(main())
+
+
+def test_write_errors_are_raised_to_the_waiter(tmp_path):
+    async def main():
+        writer = DocumentWriter()
+        (tmp_path / "file").write_text("not a directory", encoding="utf-8")
+        writes = PendingWrites()
+        token = pending_writes.set(writes)
+        writer.submit(tmp_path / "file" / "document.md", "content")
+        pending_writes.reset(token)
+
+        with pytest.raises(OSError):
+            await asyncio.wait_for(writer.drain(writes), 1)
+
+        writer.submit(tmp_path / "file" / "untracked.md", "content")
+        with pytest.raises(OSError):
+            writer.flush()
+        writer.flush()
+
+    asyncio.run(main())
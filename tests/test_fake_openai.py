@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from src.fake_openai.config import (
+    Distribution,
+    FakeServerConfig,
+    Latency,
+    ModelBehaviour,
+    ScriptedResponse,
+)
+from src.fake_openai.server import FakeOpenAIServer
+
+MODEL = "openai/gpt-4o"
+
+
+def instant(**kwargs) -> ModelBehaviour:
+    return ModelBehaviour(
+        latency=Latency(Distribution.constant, 0.0),
+        tokens_per_second=10_000,
+        **kwargs,
+    )
+
+
+async def serve(config: FakeServerConfig) -> tuple[FakeOpenAIServer, AsyncOpenAI]:
+    server = FakeOpenAIServer(config)
+    listening = await server.start(port=0)
+    port = listening.sockets[0].getsockname()[1]
+    client = AsyncOpenAI(
+        base_url=f"http://127.0.0.1:{port}/v1", api_key="fake", max_retries=0
+    )
+    return server, client
+
+
+def test_scripted_and_echoed_answers():
+    async def main():
+        config = FakeServerConfig(
+            default=instant(responses=[ScriptedResponse("report", "REPORT done")])
+        )
+        server, client = await serve(config)
+        try:
+            echoed = await client.chat.completions.create(
+                model=MODEL, messages=[{"role": "user", "content": "hello there"}]
+            )
+            scripted = await client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": "write the report"}],
+                stream=True,
+            )
+            chunks = [chunk.choices[0].delta.content async for chunk in scripted]
+        finally:
+            await client.close()
+            await server.stop()
+
+        assert echoed.choices[0].message.content == "hello there"
+        assert echoed.usage.completion_tokens == 2
+        assert chunks == ["REPORT ", "done"]
+        assert server.stats["completed"] == 2
+
+    asyncio.run(main())
+
+
+def test_rate_limits_are_injected_with_retry_after():
+    async def main():
+        config = FakeServerConfig(
+            models={MODEL: instant(rate_limit_rate=1.0, retry_after=2.5)}
+        )
+        server, client = await serve(config)
+        try:
+            with pytest.raises(openai.RateLimitError) as error:
+                await client.chat.completions.create(
+                    model=MODEL, messages=[{"role": "user", "content": "hi"}]
+                )
+        finally:
+            await client.close()
+            await server.stop()
+
+        assert error.value.response.headers["retry-after"] == "2.5"
+        assert server.stats["rate_limited"] == 1
+
+    asyncio.run(main())
+
+
+def test_config_is_loaded_from_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(
+        json.dumps(
+            {
+                "default": {"latency": {"distribution": "constant", "median": 0.3}},
+                "models": {MODEL: {"responses": [{"match": "a", "text": "b"}]}},
+                "seed": 42,
+            }
+        ),
+        encoding="utf-8",
+    )
+    config = FakeServerConfig.from_file(path)
+
+    assert config.behaviour("other").latency == Latency(Distribution.constant, 0.3)
+    assert config.behaviour(MODEL).responses == [ScriptedResponse("a", "b")]
+    assert config.seed == 42
@@ -0,0 +1,40 @@
+import asyncio
+
+from src.core.agents import file_watcher
+from src.core.agents.file_watcher import DirectoryWatcher
+
+
+def wait_and_create(watcher: DirectoryWatcher, directory, name: str):
+    async def main():
+        waiter = asyncio.create_task(watcher.wait_for(name))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        (directory / name).write_text("content", encoding="utf-8")
+        return await asyncio.wait_for(waiter, 1)
+
+    return asyncio.run(main())
+
+
+def test_file_is_noticed_by_inotify(tmp_path):
+    watcher = DirectoryWatcher(tmp_path, poll_interval=60)
+
+    assert wait_and_create(watcher, tmp_path, "answer.md") == tmp_path / "answer.md"
+    assert watcher._fd is None and not watcher._waiters
+
+
+def test_file_is_noticed_by_polling_without_inotify(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_watcher, "_inotify_watch", lambda directory: None)
+    watcher = DirectoryWatcher(tmp_path, poll_interval=0.01)
+
+    assert wait_and_create(watcher, tmp_path, "answer.md") == tmp_path / "answer.md"
+    assert watcher._poll_task is None
+
+
+def test_existing_file_is_returned_at_once(tmp_path):
+    (tmp_path / "answer.md").write_text("content", encoding="utf-8")
+    watcher = DirectoryWatcher.for_directory(tmp_path)
+
+    path = asyncio.run(asyncio.wait_for(watcher.wait_for("answer.md"), 1))
+
+    assert path == tmp_path / "answer.md"
+    assert DirectoryWatcher.for_directory(str(tmp_path)) is watcher
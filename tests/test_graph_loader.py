@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, update
+
+from src.core.agents.agent_typings import DocumentsStore
+from src.db.entities.copying_agent import CopyingAgent
+from src.db.entities.document_template import DocumentTemplate
+from src.db.entities.graph import Graph
+from src.db.entities.hard_code_agent import HardCodeAgent, PredefinedType
+from src.db.entities.input_documents import InputDocuments
+from src.db.entities.user import User
+from src.db.graph_loader import GraphLoader, GraphLoadingError
+
+
+def mark(text: str, sign: str) -> str:
+    return text + sign
+
+
+async def create_graph(session_factory, copies: int = 1, logic: str = "mark") -> int:
+    """
+    Graph of `source` writing a mark, its `copies` adding marks one after another
+    and `replacer` replacing the marks.
+    """
+    async with session_factory.begin() as session:
+        graph = Graph(name="graph", user=User(login="user", password_hash="hash"))
+        source = HardCodeAgent(
+            name="source", graph=graph, logic=logic, arguments={"sign": "!"}
+        )
+        previous = DocumentTemplate(name="text", filename="text.md", agent=source)
+        agents = [source]
+        for i in range(copies):
+            copy = CopyingAgent(name=f"copy_{i}", graph=graph, base_agent=source)
+            agents.append(copy)
+            template = DocumentTemplate(
+                name=f"copy_{i}", filename=f"copy_{i}.md", agent=copy
+            )
+            session.add(InputDocuments(document_template=previous, agent=copy))
+            previous = template
+        replacer = HardCodeAgent(
+            name="replacer",
+            graph=graph,
+            predefined_type=PredefinedType.replace_text,
+            arguments={"!": "?"},
+        )
+        session.add_all(
+            [
+                *agents,
+                replacer,
+                DocumentTemplate(name="final", filename="final.md", agent=replacer),
+                InputDocuments(document_template=previous, agent=replacer),
+            ]
+        )
+        await session.flush()
+        return graph.id
+
+
+def count_queries(session_factory) -> list[str]:
+    statements = []
+    event.listen(
+        session_factory.kw["bind"].sync_engine,
+        "before_cursor_execute",
+        lambda connection, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_stored_graph_is_compiled_into_a_pipeline(database, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.agents.agent_typings.DATA_DIR", tmp_path)
+
+    async def main():
+        session_factory = await database()
+        graph_id = await create_graph(session_factory, copies=2)
+        loader = GraphLoader(session_factory, logic_functions={"mark": mark})
+
+        plan = await loader.load(graph_id)
+        documents = await plan.create_pipeline(client=None).run()
+
+        assert plan.parameters["copy_1"].input_document_names == ["copy_0"]
+        assert set(plan.templates) == {"text", "copy_0", "copy_1", "final"}
+        assert documents.documents["final"].content == "???"
+
+    asyncio.run(main())
+
+
+def test_graph_is_loaded_in_constant_number_of_queries(database):
+    async def main():
+        session_factory = await database()
+        small = await create_graph(session_factory, copies=1)
+        large = await create_graph(session_factory, copies=5)
+        statements = count_queries(session_factory)
+        loader = GraphLoader(session_factory, logic_functions={"mark": mark})
+
+        await loader.load(small)
+        small_queries = len(statements)
+        await loader.load(large)
+
+        assert len(statements) == 2 * small_queries
+
+    asyncio.run(main())
+
+
+def test_plans_are_cached_until_graph_version_changes(database):
+    async def main():
+        session_factory = await database()
+        graph_id = await create_graph(session_factory)
+        loader = GraphLoader(
+            session_factory, revalidate_after=0, logic_functions={"mark": mark}
+        )
+        plan = await loader.load(graph_id)
+        assert await loader.load(graph_id) is plan
+
+        async with session_factory.begin() as session:
+            await session.execute(
+                update(Graph).where(Graph.id == graph_id).values(version=2)
+            )
+        changed = await loader.load(graph_id)
+
+        assert changed is not plan and changed.version == 2
+        with pytest.raises(GraphLoadingError, match="version 1 can't be loaded"):
+            await loader.load(graph_id, version=1)
+        with pytest.raises(GraphLoadingError, match="doesn't exist"):
+            await loader.load(graph_id + 100)
+
+    asyncio.run(main())
+
+
+def test_unregistered_logic_is_rejected(database):
+    async def main():
+        session_factory = await database()
+        graph_id = await create_graph(session_factory, logic="os.system")
+
+        with pytest.raises(GraphLoadingError, match="isn't registered"):
+            await GraphLoader(session_factory).load(graph_id)
+
+    asyncio.run(main())
@@ -1 +1,77 @@
+import asyncio
+import os
+import threading
+import time
+
 import pytest
+
+from src.core.agents.agent_parameters import HardCodeAgentParameters
+from src.core.agents.agent_types.hard_code_agent import HardCodeAgent
+from src.core.agents.agent_typings import Document, DocumentsStore
+from src.core.executors import ExecutionMode, Executors
+from src.core.pipeline import Pipeline
+from src.core.pipeline_graph import PipelineCompilationError
+
+
+def thread_name(text: str) -> str:
+    return threading.current_thread().name
+
+
+def process_id(text: str) -> str:
+    return str(os.getpid())
+
+
+def run_agent(logic, mode: ExecutionMode) -> str:
+    store = DocumentsStore({"input": Document("input", "text")})
+    agent = HardCodeAgent(
+        name="agent",
+        documents_store=store,
+        input_document_names=["input"],
+        required_documents=[],
+        output_document_name="output",
+        hard_code_logic=logic,
+        execution_mode=mode,
+    )
+    return asyncio.run(agent.run()).documents["output"].content
+
+
+def test_logic_runs_where_execution_mode_says():
+    assert run_agent(thread_name, ExecutionMode.inline) == "MainThread"
+    assert run_agent(thread_name, ExecutionMode.thread).startswith("hard-code-agent")
+    assert run_agent(process_id, ExecutionMode.process) != str(os.getpid())
+
+
+def test_unpicklable_logic_is_rejected_for_process_pool():
+    with pytest.raises(PipelineCompilationError, match="use a module-level function"):
+        Pipeline(
+            DocumentsStore(),
+            client=None,
+            agent=HardCodeAgentParameters(
+                input_document_names=["input"],
+                output_document_name="output",
+                logging_info=(None, None),
+                output_document_filename=None,
+                required_documents=[],
+                hard_code_logic=lambda text: text,
+                execution_mode=ExecutionMode.process,
+            ),
+        )
+
+
+def test_queued_tasks_survive_reconfiguration():
+    async def main():
+        executors = Executors(max_threads=1)
+        try:
+            tasks = [
+                asyncio.create_task(
+                    executors.run(ExecutionMode.thread, time.sleep, 0.02)
+                )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.01)
+            executors.configure(max_threads=2)
+            await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        finally:
+            executors.shutdown()
+
+    asyncio.run(main())
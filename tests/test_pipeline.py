@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from src.core.agents.agent_parameters import AIAgentParameters, HardCodeAgentParameters
+from src.core.agents.agent_typings import (
+    Document,
+    DocumentsStore,
+    GenerationSettings,
+    ModelName,
+)
+from src.core.clients.base_client import ClientWrapper, completion_from_text
+from src.core.pipeline import Pipeline, PipelineRunError
+
+
+class SlowProvider(ClientWrapper):
+    """Answers after `delay` seconds, remembers timeouts of the requests."""
+
+    def __init__(self, delay: float):
+        super().__init__(None)
+        self._delay: float = delay
+        self.timeouts: list[float | None] = []
+
+    async def create(self, **kwargs):
+        self.timeouts.append(kwargs.get("timeout"))
+        await asyncio.sleep(self._delay)
+        return completion_from_text(kwargs["model"], "answer")
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def broken(text: str) -> str:
+    raise ValueError("Broken logic")
+
+
+def hard_code(inputs: list[str], output: str, logic=upper) -> HardCodeAgentParameters:
+    return HardCodeAgentParameters(
+        input_document_names=inputs,
+        output_document_name=output,
+        logging_info=(None, None),
+        output_document_filename=None,
+        required_documents=[],
+        hard_code_logic=logic,
+    )
+
+
+def ai(inputs: list[str], output: str, timeout: float | None = None):
+    return AIAgentParameters(
+        input_document_names=inputs,
+        output_document_name=output,
+        logging_info=(None, None),
+        output_document_filename=None,
+        required_documents=[],
+        system_prompt="writer",
+        settings=GenerationSettings(model=ModelName.gpt_4o),
+        timeout=timeout,
+    )
+
+
+def store() -> DocumentsStore:
+    return DocumentsStore({"input": Document("input", "text")})
+
+
+def test_time_left_is_passed_to_requests():
+    async def main():
+        provider = SlowProvider(0.0)
+        pipeline = Pipeline(
+            store(), provider, timeout=10, writer=ai(["input"], "draft", timeout=2)
+        )
+        await pipeline.run()
+
+        assert 1 < provider.timeouts[0] <= 2
+
+    asyncio.run(main())
+
+
+def test_run_and_agents_time_out():
+    async def main():
+        slow_agent = Pipeline(
+            store(), SlowProvider(1.0), writer=ai(["input"], "draft", timeout=0.05)
+        )
+        with pytest.raises(TimeoutError, match="Agent 'writer' exceeded timeout"):
+            await slow_agent.run()
+
+        slow_run = Pipeline(store(), SlowProvider(1.0), writer=ai(["input"], "draft"))
+        with pytest.raises(TimeoutError, match="exceeded timeout of 0.05 s"):
+            await slow_run.run(timeout=0.05)
+
+    asyncio.run(main())
+
+
+def test_failure_cancels_run_with_fail_fast():
+    async def main():
+        provider = SlowProvider(1.0)
+        pipeline = Pipeline(
+            store(),
+            provider,
+            broken=hard_code(["input"], "nothing", broken),
+            writer=ai(["input"], "draft"),
+        )
+        with pytest.raises(ValueError, match="Broken logic"):
+            await asyncio.wait_for(pipeline.run(), 0.5)
+        assert "draft" not in pipeline.documents_store.documents
+
+    asyncio.run(main())
+
+
+def test_independent_agents_finish_without_fail_fast():
+    async def main():
+        pipeline = Pipeline(
+            store(),
+            SlowProvider(0.01),
+            fail_fast=False,
+            broken=hard_code(["input"], "broken_output", broken),
+            dependent=hard_code(["broken_output"], "dependent_output"),
+            writer=ai(["input"], "draft"),
+        )
+        with pytest.raises(PipelineRunError) as error:
+            await pipeline.run()
+
+        assert list(error.value.failures) == ["broken"]
+        assert error.value.skipped == {"dependent"}
+        assert pipeline.documents_store.documents["draft"].content == "answer"
+
+    asyncio.run(main())
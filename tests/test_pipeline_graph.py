@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from src.core.agents.agent_parameters import HardCodeAgentParameters
+from src.core.agents.agent_typings import Document, DocumentsStore
+from src.core.pipeline import Pipeline
+from src.core.pipeline_graph import PipelineCompilationError
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def agent(inputs: list[str], output: str) -> HardCodeAgentParameters:
+    return HardCodeAgentParameters(
+        input_document_names=inputs,
+        output_document_name=output,
+        logging_info=(None, None),
+        output_document_filename=None,
+        required_documents=[],
+        hard_code_logic=upper,
+    )
+
+
+def pipeline(documents: dict[str, str] | None = None, **agents) -> Pipeline:
+    return Pipeline(
+        DocumentsStore(
+            {
+                name: Document(name, content)
+                for name, content in (documents or {}).items()
+            }
+        ),
+        client=None,
+        **agents,
+    )
+
+
+def test_graph_order_levels_and_critical_path():
+    graph = pipeline(
+        {"input": "text"},
+        short=agent(["input"], "summary"),
+        first=agent(["input"], "draft"),
+        second=agent(["draft"], "review"),
+        third=agent(["review", "summary"], "report"),
+    ).graph
+
+    assert graph.order.index("first") < graph.order.index("second")
+    assert graph.order.index("second") < graph.order.index("third")
+    assert graph.levels == [["short", "first"], ["second"], ["third"]]
+    assert graph.critical_path == ["first", "second", "third"]
+    assert not graph.nodes["short"].on_critical_path
+    assert graph.nodes["first"].priority == 3
+    assert graph.descendants("first") == {"second", "third"}
+    assert sorted(["short", "first"], key=graph.sort_key) == ["first", "short"]
+
+
+def test_duplicate_producers_are_rejected():
+    with pytest.raises(PipelineCompilationError, match="produced by both"):
+        pipeline(
+            {"input": "text"},
+            first=agent(["input"], "draft"),
+            second=agent(["input"], "draft"),
+        )
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(PipelineCompilationError, match="cyclically: first, second"):
+        pipeline(first=agent(["b"], "a"), second=agent(["a"], "b"))
+
+
+def test_missing_input_is_rejected_when_run_starts():
+    graph_pipeline = pipeline(first=agent(["input"], "draft"))
+
+    assert graph_pipeline.graph.inputs == {"input": ["first"]}
+    with pytest.raises(PipelineCompilationError, match="'input'"):
+        asyncio.run(graph_pipeline.run())
+
+
+def test_inputs_can_be_passed_to_run():
+    graph_pipeline = pipeline(
+        first=agent(["input"], "draft"), second=agent(["draft"], "report")
+    )
+
+    store = asyncio.run(
+        graph_pipeline.run(documents={"input": Document("input", "text")})
+    )
+
+    assert store.documents["report"].content == "TEXT"
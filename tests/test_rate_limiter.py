@@ -0,0 +1,178 @@
+import asyncio
+import gc
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from src.core.agents.agent_types.ai_agent import AIAgent
+from src.core.agents.agent_typings import DocumentsStore, GenerationSettings, ModelName
+from src.core.clients.base_client import (
+    ClientWrapper,
+    TokenCountingClient,
+    chunk_from_text,
+    completion_from_text,
+    stream_from_texts,
+)
+from src.core.clients.rate_limiter import (
+    RateLimitedClient,
+    RateLimiter,
+    RateLimits,
+    _retry_after,
+)
+
+MODEL = "openai/gpt-4o"
+
+
+class FakeClient(ClientWrapper):
+    def __init__(self, errors: list[Exception] | None = None, delay: float = 0.0):
+        super().__init__(None)
+        self.errors = errors or []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        return "http://fake"
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+        finally:
+            self.in_flight -= 1
+        if kwargs.get("stream"):
+            return stream_from_texts(kwargs["model"], ["a", "b"])
+        return completion_from_text(kwargs["model"], "answer")
+
+
+def rate_limit_error(headers: dict[str, str]) -> RateLimitError:
+    response = httpx.Response(
+        429, headers=headers, request=httpx.Request("POST", "http://fake")
+    )
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def request(**kwargs) -> dict:
+    return {"model": MODEL, "messages": [{"role": "user", "content": "hi"}], **kwargs}
+
+
+def test_in_flight_requests_are_limited():
+    async def main():
+        fake = FakeClient(delay=0.01)
+        client = RateLimitedClient(
+            fake, RateLimiter(default_limits=RateLimits(max_in_flight=2))
+        )
+
+        await asyncio.gather(*(client.create(**request()) for _ in range(6)))
+
+        stats = client.rate_limiter.stats()[("http://fake", MODEL)]
+        assert fake.max_in_flight == 2
+        assert (stats.requests, stats.in_flight, stats.queue_depth) == (6, 0, 0)
+
+    asyncio.run(main())
+
+
+def test_rate_limiting_halves_concurrency_and_retries():
+    async def main():
+        fake = FakeClient([rate_limit_error({"retry-after-ms": "10"})])
+        client = RateLimitedClient(
+            fake, RateLimiter(default_limits=RateLimits(max_in_flight=8))
+        )
+
+        completion = await client.create(**request())
+
+        stats = client.rate_limiter.stats()[("http://fake", MODEL)]
+        assert completion.choices[0].message.content == "answer"
+        assert stats.rate_limited == 1
+        assert 4 <= stats.concurrency_limit < 5
+        assert stats.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_rate_limit_error_is_raised_after_retries():
+    async def main():
+        fake = FakeClient([rate_limit_error({}) for _ in range(2)])
+        client = RateLimitedClient(fake, RateLimiter(), max_rate_limit_retries=1)
+
+        with pytest.raises(RateLimitError):
+            await client.create(**request())
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"retry-after": "2"}, 2.0),
+        ({"retry-after-ms": "soon", "retry-after": "3"}, 3.0),
+        ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, None),
+        ({"retry-after": "nan"}, None),
+        ({"x-ratelimit-reset-requests": "6m0s"}, 360.0),
+        ({}, None),
+    ],
+)
+def test_retry_after_headers(headers, expected):
+    assert _retry_after(rate_limit_error(headers)) == expected
+
+
+def test_stream_slot_is_released_when_stream_is_consumed_closed_or_dropped():
+    async def main():
+        client = RateLimitedClient(FakeClient(), RateLimiter())
+        stats = lambda: client.rate_limiter.stats()[("http://fake", MODEL)]
+
+        stream = await client.create(**request(stream=True))
+        assert stats().in_flight == 1
+        assert [chunk.choices[0].delta.content async for chunk in stream] == ["a", "b"]
+        assert stats().in_flight == 0
+
+        stream = await client.create(**request(stream=True))
+        await stream.aclose()
+        await stream.aclose()
+        assert stats().in_flight == 0
+
+        await client.create(**request(stream=True))
+        gc.collect()
+        assert stats().in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_streaming_agent_releases_slot():
+    class HangingClient(FakeClient):
+        async def create(self, **kwargs):
+            async def chunks():
+                yield chunk_from_text(kwargs["model"], "draft")
+                await asyncio.Event().wait()
+
+            return chunks()
+
+    async def main():
+        client = RateLimitedClient(HangingClient(), RateLimiter())
+        store = DocumentsStore()
+        agent = AIAgent(
+            client=TokenCountingClient(client),
+            name="writer",
+            system_prompt="Write",
+            settings=GenerationSettings(ModelName.gpt_4o),
+            documents_store=store,
+            input_document_names=[],
+            required_documents=[],
+            stream=True,
+        )
+        task = asyncio.create_task(agent.run())
+        await asyncio.sleep(0.01)
+        assert client.rate_limiter.stats()[("http://fake", MODEL)].in_flight == 1
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        assert client.rate_limiter.stats()[("http://fake", MODEL)].in_flight == 0
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from src.core.agents.agent_typings import ModelName
+from src.core.clients.base_client import ClientWrapper, completion_from_text
+from src.core.clients.request_policy import PolicyClient, RequestPolicy
+
+MODEL = ModelName.gpt_4o.value
+FALLBACK = ModelName.gpt_4o_mini
+
+
+class ScriptedClient(ClientWrapper):
+    """Answers after delays, raises scripted errors of every model in turn."""
+
+    def __init__(self, delays: list[float], errors: dict[str, list[Exception]]):
+        super().__init__(None)
+        self.delays = delays
+        self.errors = errors
+        self.models: list[str] = []
+
+    @property
+    def base_url(self) -> str:
+        return "http://fake"
+
+    async def create(self, **kwargs):
+        self.models.append(kwargs["model"])
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0.0)
+        errors = self.errors.get(kwargs["model"])
+        if errors:
+            raise errors.pop(0)
+        return completion_from_text(kwargs["model"], kwargs["model"])
+
+
+def server_error() -> openai.InternalServerError:
+    response = httpx.Response(500, request=httpx.Request("POST", "http://fake"))
+    return openai.InternalServerError("failed", response=response, body=None)
+
+
+def rate_limit_error() -> openai.RateLimitError:
+    response = httpx.Response(429, request=httpx.Request("POST", "http://fake"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def request() -> dict:
+    return {"model": MODEL, "messages": [{"role": "user", "content": "hi"}]}
+
+
+def test_failed_attempts_fall_back_and_record_only_successful_latency():
+    async def main():
+        policy = RequestPolicy(
+            base_delay=0.05, max_delay=0.05, fallback_model=FALLBACK, fallback_after=2
+        )
+        fake = ScriptedClient(
+            [0.05, 0.05, 0.0], {MODEL: [server_error(), server_error()]}
+        )
+
+        completion = await PolicyClient(fake, policy).create(**request())
+
+        assert completion.choices[0].message.content == FALLBACK.value
+        assert fake.models == [MODEL, MODEL, FALLBACK.value]
+        assert (policy.stats.retries, policy.stats.fallbacks) == (2, 1)
+        assert set(policy.stats.model_latencies) == {FALLBACK.value}
+        assert max(policy.stats.latencies) < 0.04
+
+    asyncio.run(main())
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    async def main():
+        policy = RequestPolicy(base_delay=0.0)
+        fake = ScriptedClient([], {MODEL: [rate_limit_error()]})
+
+        with pytest.raises(openai.RateLimitError):
+            await PolicyClient(fake, policy).create(**request())
+
+        assert (policy.stats.retries, policy.stats.failures) == (0, 1)
+        assert not policy.stats.latencies
+
+    asyncio.run(main())
+
+
+def test_slow_request_is_hedged_only_when_client_hedges():
+    async def main():
+        policy = RequestPolicy(hedge=True, hedge_delay=0.01)
+        fake = ScriptedClient([0.5, 0.0], {})
+
+        await PolicyClient(fake, policy).create(**request())
+
+        assert (policy.stats.hedges, policy.stats.hedge_wins) == (1, 1)
+        assert policy.stats.latencies[0] < 0.4
+
+        fake = ScriptedClient([0.05], {})
+        await PolicyClient(fake, policy, hedge=False).create(**request())
+
+        assert fake.models == [MODEL]
+        assert policy.stats.hedges == 1
+
+    asyncio.run(main())
+
+
+def test_hedge_delay_is_quantile_of_the_model_latencies():
+    policy = RequestPolicy(hedge=True, hedge_min_samples=3)
+    for latency in (1.0, 2.0):
+        policy.stats.record_latency(MODEL, latency)
+    policy.stats.record_latency(FALLBACK.value, 10.0)
+
+    assert policy.current_hedge_delay(MODEL) is None
+
+    policy.stats.record_latency(MODEL, 3.0)
+
+    assert policy.current_hedge_delay(MODEL) == 3.0
+    assert policy.current_hedge_delay(FALLBACK.value) is None
@@ -0,0 +1,129 @@
+import asyncio
+
+from src.core.clients.base_client import (
+    ClientWrapper,
+    completion_from_text,
+    stream_from_texts,
+)
+from src.core.clients.response_cache import (
+    CachePolicy,
+    CachingClient,
+    MemoryStorage,
+    ResponseCache,
+    SQLiteStorage,
+)
+
+MODEL = "gpt-4o"
+
+
+class FakeProvider(ClientWrapper):
+    def __init__(self):
+        super().__init__(None)
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return "http://provider/v1/"
+
+    async def create(self, **kwargs):
+        self.requests += 1
+        answer = f"answer {self.requests}"
+        if kwargs.get("stream"):
+            return stream_from_texts(kwargs["model"], [answer[:3], answer[3:]])
+        return completion_from_text(kwargs["model"], answer)
+
+
+def request(content: str, **kwargs) -> dict:
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": content}],
+        **kwargs,
+    }
+
+
+async def answer(client: CachingClient, **kwargs) -> str:
+    if kwargs.get("stream"):
+        stream = await client.chat.completions.create(**kwargs)
+        return "".join([chunk.choices[0].delta.content async for chunk in stream])
+    completion = await client.chat.completions.create(**kwargs)
+    return completion.choices[0].message.content
+
+
+def test_deterministic_requests_are_answered_from_cache():
+    async def main():
+        provider, cache = FakeProvider(), ResponseCache()
+        client = CachingClient(provider, cache)
+
+        assert await answer(client, **request("hi", temperature=0)) == "answer 1"
+        assert await answer(client, **request(" hi\r\n", temperature=0)) == "answer 1"
+        assert await answer(client, **request("hi", temperature=0.7)) == "answer 2"
+        assert await answer(client, **request("hi", temperature=0.7)) == "answer 3"
+        assert (cache.stats.hits, cache.stats.misses, cache.stats.bypassed) == (
+            1,
+            1,
+            2,
+        )
+
+    asyncio.run(main())
+
+
+def test_streamed_answers_are_cached_for_both_kinds_of_requests():
+    async def main():
+        provider, cache = FakeProvider(), ResponseCache()
+        client = CachingClient(provider, cache, CachePolicy.enabled)
+
+        assert await answer(client, **request("hi", stream=True)) == "answer 1"
+        assert await answer(client, **request("hi", stream=True)) == "answer 1"
+        assert await answer(client, **request("hi")) == "answer 1"
+        assert provider.requests == 1
+
+    asyncio.run(main())
+
+
+def test_memory_storage_evicts_least_recently_used():
+    storage = MemoryStorage(max_entries=2)
+    storage.set("a", "1")
+    storage.set("b", "2")
+    storage.get("a")
+    storage.set("c", "3")
+
+    assert (storage.get("a"), storage.get("b"), storage.get("c")) == ("1", None, "3")
+
+
+def test_sqlite_storage_evicts_by_size_and_ttl(tmp_path, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("src.core.clients.response_cache.time.time", lambda: now)
+    storage = SQLiteStorage(tmp_path / "cache.db", max_size=10, ttl=60)
+    storage.set("a", "12345")
+    now += 1
+    storage.set("b", "12345")
+    now += 1
+    storage.get("a")
+    storage.set("c", "12345")
+
+    assert (storage.get("a"), storage.get("b"), storage.get("c")) == (
+        "12345",
+        None,
+        "12345",
+    )
+    now += 61
+    assert storage.get("a") is None
+
+
+def test_values_found_in_later_storage_are_copied_to_earlier(tmp_path):
+    async def main():
+        disk = SQLiteStorage(tmp_path / "cache.db")
+        provider = FakeProvider()
+        await answer(
+            CachingClient(provider, ResponseCache(disk), CachePolicy.enabled),
+            **request("hi"),
+        )
+
+        memory = MemoryStorage()
+        client = CachingClient(
+            provider, ResponseCache(memory, disk), CachePolicy.enabled
+        )
+        assert await answer(client, **request("hi")) == "answer 1"
+        assert len(memory._values) == 1 and provider.requests == 1
+
+    asyncio.run(main())
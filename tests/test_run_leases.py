@@ -0,0 +1,120 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.api.runs import RunManager, RunStatus
+from src.db.entities import Document, Running
+from src.db.entities.running import RunningStatus
+from src.db.graph_loader import PipelinePlan
+from src.db.run_leases import (
+    claim_runs,
+    heartbeat_runs,
+    reclaim_orphans,
+    release_runs,
+)
+from src.db.run_recorder import RunRecorder
+
+
+async def running(session_factory, running_id: int) -> Running:
+    async with session_factory() as session:
+        return await session.get(Running, running_id)
+
+
+def test_runs_are_claimed_once_and_released_without_attempt(database):
+    async def main():
+        session_factory = await database()
+        recorder = RunRecorder(session_factory)
+        first = await recorder.create_running(1, {"input": "text"})
+        second = await recorder.create_running(1)
+        owned = await recorder.create_running(1, worker_id="api")
+
+        async with session_factory.begin() as session:
+            claimed = await claim_runs(session, "a", 10)
+        async with session_factory.begin() as session:
+            assert await claim_runs(session, "b", 10) == []
+
+        assert [run.running_id for run in claimed] == [first, second]
+        assert claimed[0].documents == {"input": "text"}
+        assert claimed[0].attempts == 1
+        async with session_factory.begin() as session:
+            assert await heartbeat_runs(session, "a", [first, owned]) == {first}
+            await release_runs(session, "a", [first])
+            await release_runs(session, "b", [second])
+        released = await running(session_factory, first)
+        assert released.status == RunningStatus.PENDING
+        assert released.worker_id is None
+        assert released.attempts == 0
+        assert (await running(session_factory, second)).worker_id == "a"
+
+    asyncio.run(main())
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def scalars(self):
+        return []
+
+
+def test_expired_leases_are_checked_with_database_clock():
+    session = RecordingSession()
+
+    result = asyncio.run(reclaim_orphans(session, 60, 3))
+
+    assert result == {"failed": [], "requeued": []}
+    failed, requeued = (
+        str(statement.compile(dialect=postgresql.asyncpg.dialect()))
+        for statement in session.statements
+    )
+    assert "now() - $" in failed and "attempts >= $" in failed
+    assert "now() - $" in requeued
+
+
+def test_writes_of_lost_runs_are_fenced(database):
+    async def main():
+        session_factory = await database()
+        recorder = RunRecorder(session_factory)
+        lost = await recorder.create_running(1, worker_id="a")
+        kept = await recorder.create_running(1, worker_id="a")
+        async with session_factory.begin() as session:
+            await release_runs(session, "a", [lost])
+            await claim_runs(session, "b", 1)
+
+        recorder.add_document(lost, 1, "stale", "a")
+        recorder.set_status(lost, RunningStatus.FINISHED, "a")
+        recorder.add_document(kept, 1, "draft", "a")
+        recorder.add_document(kept, 1, "final", "a")
+        recorder.set_status(kept, RunningStatus.FINISHED, "a")
+        await recorder.flush()
+
+        assert (recorder.fenced, recorder.written, recorder.coalesced) == (1, 1, 1)
+        assert (await running(session_factory, lost)).status == RunningStatus.RUNNING
+        assert (await running(session_factory, kept)).status == RunningStatus.FINISHED
+        async with session_factory() as session:
+            texts = (await session.scalars(select(Document.text))).all()
+        assert texts == ["final"]
+
+    asyncio.run(main())
+
+
+def test_manager_without_recorder_closes_with_queued_runs():
+    class Loader:
+        async def load(self, graph_id, version=None):
+            return PipelinePlan(graph_id, 1, 1, {}, {})
+
+    async def main():
+        manager = RunManager(Loader(), client=None, max_concurrent_runs=0)
+        await manager.start()
+        state = await manager.submit(1)
+
+        await manager.close()
+
+        assert state.status == RunStatus.queued
+
+    asyncio.run(main())
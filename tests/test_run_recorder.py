@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from src.core.agents.agent_parameters import HardCodeAgentParameters
+from src.core.agents.agent_typings import Document as CoreDocument
+from src.core.agents.agent_typings import DocumentsStore
+from src.core.pipeline import Pipeline
+from src.db.entities import Document, Running
+from src.db.entities.running import RunningStatus
+from src.db.run_recorder import RunRecorder
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def broken(text: str) -> str:
+    raise ValueError("Broken logic")
+
+
+def pipeline(logic) -> Pipeline:
+    return Pipeline(
+        DocumentsStore({"input": CoreDocument("input", "text")}),
+        client=None,
+        writer=HardCodeAgentParameters(
+            input_document_names=["input"],
+            output_document_name="draft",
+            logging_info=(None, None),
+            output_document_filename=None,
+            required_documents=[],
+            hard_code_logic=logic,
+        ),
+    )
+
+
+async def texts(session_factory) -> list[str]:
+    async with session_factory() as session:
+        return list((await session.scalars(select(Document.text))).all())
+
+
+async def status(session_factory, running_id: int) -> RunningStatus:
+    async with session_factory() as session:
+        return (await session.get(Running, running_id)).status
+
+
+def test_runs_are_recorded_with_their_documents(database):
+    async def main():
+        session_factory = await database()
+        async with RunRecorder(session_factory, flush_interval=60) as recorder:
+            finished = await recorder.create_running(1)
+            failed = await recorder.create_running(1)
+            await recorder.record(pipeline(upper), finished, {"draft": 1})
+            with pytest.raises(ValueError):
+                await recorder.record(pipeline(broken), failed, {"draft": 1})
+
+        assert await status(session_factory, finished) == RunningStatus.FINISHED
+        assert await status(session_factory, failed) == RunningStatus.FAILED
+        assert await texts(session_factory) == ["TEXT"]
+
+    asyncio.run(main())
+
+
+def test_full_batch_is_flushed_without_waiting_for_interval(database):
+    async def main():
+        session_factory = await database()
+        async with RunRecorder(
+            session_factory, flush_interval=60, max_batch=2
+        ) as recorder:
+            running_id = await recorder.create_running(1)
+            recorder.add_document(running_id, 1, "first")
+            recorder.add_document(running_id, 2, "second")
+            for _ in range(100):
+                if recorder.written:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert recorder.written == 2
+
+    asyncio.run(main())
+
+
+def test_failed_flush_keeps_newer_data(database):
+    class FailingOnce:
+        def __init__(self, session_factory):
+            self._session_factory = session_factory
+            self.failed = False
+
+        def begin(self):
+            if not self.failed:
+                self.failed = True
+                raise ConnectionError("Database is unavailable")
+            return self._session_factory.begin()
+
+    async def main():
+        session_factory = await database()
+        running_id = await RunRecorder(session_factory).create_running(1)
+        recorder = RunRecorder(FailingOnce(session_factory))
+        recorder.add_document(running_id, 1, "old")
+        recorder.add_document(running_id, 2, "kept")
+        with pytest.raises(ConnectionError):
+            await recorder.flush()
+        recorder.add_document(running_id, 1, "new")
+        await recorder.flush()
+
+        assert sorted(await texts(session_factory)) == ["kept", "new"]
+
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import asyncio
+
+from src.core.agents.agent_parameters import (
+    AIAgentParameters,
+    CriticAgentParameters,
+    HardCodeAgentParameters,
+)
+from src.core.agents.agent_typings import (
+    Document,
+    DocumentsStore,
+    GenerationSettings,
+    ModelName,
+)
+from src.core.clients.base_client import ClientWrapper, completion_from_text
+from src.core.pipeline import Pipeline
+
+
+class ScriptedProvider(ClientWrapper):
+    """Answers of every agent by its system prompt, critics answer slowly."""
+
+    def __init__(self, answers: dict[str, list[str]]):
+        super().__init__(None)
+        self._answers: dict[str, list[str]] = answers
+
+    @property
+    def base_url(self) -> str:
+        return "http://provider/v1/"
+
+    async def create(self, **kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        if prompt == "critic":
+            await asyncio.sleep(0.05)
+        return completion_from_text(kwargs["model"], self._answers[prompt].pop(0))
+
+
+def upper(text: str) -> str:
+    return text.upper()
+
+
+def pipeline(answers: dict[str, list[str]]) -> Pipeline:
+    settings = GenerationSettings(model=ModelName.gpt_4o)
+    common = {"logging_info": (None, None), "output_document_filename": None}
+    return Pipeline(
+        DocumentsStore({"task": Document("task", "write")}),
+        client=ScriptedProvider(answers),
+        speculative=True,
+        writer=AIAgentParameters(
+            input_document_names=["task"],
+            output_document_name="draft",
+            required_documents=[],
+            system_prompt="writer",
+            settings=settings,
+            **common,
+        ),
+        critic=CriticAgentParameters(
+            input_document_names=["draft"],
+            output_document_name="critic_report",
+            required_documents=[],
+            system_prompt="critic",
+            settings=settings,
+            criticized_agent_name="writer",
+            max_iterations=3,
+            **common,
+        ),
+        publisher=HardCodeAgentParameters(
+            input_document_names=["draft"],
+            output_document_name="published",
+            required_documents=["critic_report"],
+            hard_code_logic=upper,
+            **common,
+        ),
+    )
+
+
+def test_speculative_result_is_committed_when_draft_is_accepted():
+    async def main():
+        speculative = pipeline({"writer": ["draft 1"], "critic": ["OK"]})
+        documents = (await speculative.run()).documents
+
+        assert documents["published"].content == "DRAFT 1"
+        stats = speculative.speculation_stats
+        assert (stats.hits, stats.misses, stats.restarts) == (1, 0, 0)
+
+    asyncio.run(main())
+
+
+def test_speculation_is_restarted_when_draft_is_revised():
+    async def main():
+        speculative = pipeline(
+            {"writer": ["draft 1", "draft 2"], "critic": ["fix it", "OK"]}
+        )
+        documents = (await speculative.run()).documents
+
+        assert documents["published"].content == "DRAFT 2"
+        stats = speculative.speculation_stats
+        assert (stats.hits, stats.misses, stats.restarts) == (1, 0, 1)
+        assert stats.hit_rate == 1.0
+
+    asyncio.run(main())
@@ -1 +1,19 @@
-import pytest
+from src.core.agents.agent_parameters import AIAgentParameters
+from src.core.agents.chat_history import FullHistory
+from src.core.system_analyst import create_system_analyst
+
+
+async def no_answer(message: str) -> str:
+    return ""
+
+
+def test_ai_agents_keep_full_history():
+    pipeline = create_system_analyst(None, no_answer, directory=None)
+
+    histories = {
+        name: type(parameters.history_policy)
+        for name, parameters in pipeline._parameters.items()
+        if isinstance(parameters, AIAgentParameters)
+    }
+
+    assert histories and set(histories.values()) == {FullHistory}